@@ -0,0 +1,144 @@
+import numpy as np
+from selection_logic import RatingIndex
+from genre_index import GenreIndex
+from rating_store import RatingStore, STAT_COLS
+
+# Dashboard aggregates (ranked order, per-genre stats, totals).
+# compute_* rebuild them from scratch (what the dashboard used to do on every rerun);
+# DashboardAggregates keeps them materialized and patches them as each vote is applied.
+
+
+def _join_stats(movies_df, meta_df):
+    """Joins movie data with metadata, filling missing stats with 0 (integer)."""
+    joined = movies_df.join(meta_df, how='left')
+    for col in STAT_COLS:
+        if col not in joined.columns: joined[col] = 0
+        else: joined[col] = joined[col].fillna(0).astype(int)
+    return joined.astype({'Rating': 'int'})
+
+
+def compute_rankings(movies_df, meta_df):
+    """From-scratch rankings: movie data joined with metadata, sorted by Rating."""
+    return _join_stats(movies_df, meta_df).sort_values('Rating', ascending=False).reset_index(drop=True) # Drop old index
+
+
+def compute_genre_stats(movies_df):
+    """From-scratch per-genre Average Rating / Movie Count (sorted by average, then count)."""
+    movies_df_for_genre = movies_df.reset_index(drop=True)
+    movies_df_for_genre['Genres'] = movies_df_for_genre['Genres'].fillna('').astype(str)
+    # Explode genres for analysis
+    genres_expanded = movies_df_for_genre.assign(Genre=movies_df_for_genre['Genres'].str.split('|')).explode('Genre')
+    # Clean up the resulting 'Genre' column
+    genres_expanded['Genre'] = genres_expanded['Genre'].str.strip()
+    genres_expanded = genres_expanded[(genres_expanded['Genre'] != '') & (genres_expanded['Genre'] != 'Unknown')]
+    # Group by the new 'Genre' column and calculate stats
+    genre_stats = genres_expanded.groupby('Genre')['Rating'].agg(['mean', 'count'])
+    return _format_genre_stats(genre_stats)
+
+
+def _format_genre_stats(genre_stats):
+    genre_stats = genre_stats.sort_values(['mean', 'count'], ascending=False)
+    genre_stats = genre_stats.rename(columns={'mean': 'Average Rating', 'count': 'Movie Count'})
+    genre_stats['Average Rating'] = genre_stats['Average Rating'].round(0).astype(int)
+    genre_stats['Movie Count'] = genre_stats['Movie Count'].astype(int)
+    genre_stats.index.name = 'Genre'
+    return genre_stats
+
+
+class DashboardAggregates:
+    """
+    Materialized dashboard aggregates over a RatingStore, updated per vote.
+
+    Ratings and stats are read straight from the store's arrays; update() only
+    moves the voted movies in the sorted rating index and patches their genres'
+    running sums. The ranked table is re-gathered from the rating index only
+    when the dashboard is opened after ratings changed, never re-joined or re-sorted.
+
+    Args:
+        store (RatingStore): Rating state (shared with the caller, which applies votes to it).
+        catalog (pd.DataFrame): The movies_df columns other than Rating (Title, Genres, ...).
+        genre_index (GenreIndex, optional): Built from catalog if not given.
+    """
+
+    def __init__(self, store, catalog, genre_index=None):
+        self.store = store
+        self.catalog = catalog
+        self.rating_index = RatingIndex(store.titles, store.rating)
+        self.genre_index = genre_index if genre_index is not None else GenreIndex.from_frame(catalog)
+        self.genre_sums = self.genre_index.genre_sums(store.rating)
+        self._ranked = None
+        self._order = None
+        self._rank_of = None
+
+    @classmethod
+    def from_frames(cls, movies_df, meta_df, genre_index=None):
+        """Builds aggregates over a new RatingStore holding movies_df / meta_df's values."""
+        return cls(RatingStore.from_frames(movies_df, meta_df), movies_df.drop(columns='Rating'), genre_index)
+
+    def update(self, ids):
+        """Picks up the store's new ratings of the given movie ids (the two movies of a vote)."""
+        rating = self.store.rating
+        for i in ids:
+            old_rating = self.rating_index.ratings[i]
+            new_rating = int(rating[i])
+            if new_rating != old_rating:
+                np.add.at(self.genre_sums, self.genre_index.genres_of(i), new_rating - old_rating)
+                self.rating_index.update(self.store.titles[i], new_rating)
+        self._ranked = None
+
+    def ranked_view(self, subset=None):
+        """
+        Rankings table sorted by Rating (highest first), cached until the next update.
+        With a MovieSubset (e.g. GenreIndex.subset(['Drama'])), only its movies are returned;
+        the index still holds each movie's overall rank - 1.
+        """
+        if self._ranked is None:
+            self._order = np.array([i for _, i in reversed(self.rating_index.entries)], dtype=np.int64)
+            self._rank_of = np.empty_like(self._order)
+            self._rank_of[self._order] = np.arange(len(self._order))
+            self._ranked = self.store.joined_frame(self.catalog).take(self._order).reset_index(drop=True)
+        if subset is not None:
+            return self.ranked_rows(subset.ids)
+        return self._ranked
+
+    def ranked_rows(self, ids):
+        """Rankings rows of the given movie ids, in rank order (cost follows len(ids), not the catalog)."""
+        ranked = self.ranked_view()
+        return ranked.iloc[np.sort(self._rank_of[np.asarray(ids, dtype=np.int64)])]
+
+    def genre_stats(self):
+        """Per-genre Average Rating / Movie Count, from the running sums."""
+        return _format_genre_stats(self.genre_index.stats_from_sums(self.genre_sums))
+
+    def totals(self):
+        """Catalog-wide totals: movies, and fights (each fight adds one comparison to each movie)."""
+        return {'movies': len(self.store), 'fights': int(self.store.comparisons.sum()) // 2}
+
+    def check_consistency(self, movies_df, meta_df):
+        """
+        Compares the materialized aggregates with a from-scratch computation.
+
+        Returns:
+            list: Human-readable mismatches (empty if consistent).
+        """
+        problems = []
+        expected = compute_rankings(movies_df, meta_df)
+        ranked = self.ranked_view()
+        if len(expected) != len(ranked):
+            problems.append(f"Row count {len(ranked)} != {len(expected)}")
+            return problems
+        if ranked['Rating'].tolist() != expected['Rating'].tolist():
+            problems.append("Ranked rating order differs")
+        cols = ['Rating'] + STAT_COLS
+        ours = ranked.set_index('Title')[cols].sort_index()
+        theirs = expected.set_index('Title')[cols].sort_index()
+        mismatched = ours.index[(ours != theirs).any(axis=1)].tolist()
+        if mismatched:
+            problems.append(f"Stats differ for {len(mismatched)} movies (e.g. {mismatched[:3]})")
+        expected_genres = compute_genre_stats(movies_df).sort_index()
+        genre_stats = self.genre_stats().sort_index()
+        if not genre_stats.equals(expected_genres):
+            problems.append("Genre stats differ")
+        if self.totals()['fights'] != int(expected['Comparisons'].sum()) // 2:
+            problems.append("Total fights differ")
+        return problems
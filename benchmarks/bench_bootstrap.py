@@ -0,0 +1,46 @@
+"""
+Bootstrap ranking intervals: replicates per second in this process vs. the shared-memory pool.
+
+Times a few replicates of bootstrap_intervals on the fight logs of the benchmark data sets, run
+in this process (workers=1) and in process pools of the given sizes, checks the pools return
+exactly the serial intervals (each replicate has its own random stream), and projects the time
+of a full BOOTSTRAP_REPLICATES run. The pool only pays off with as many free CPU cores.
+
+Run from the repository root:
+    python -m benchmarks.bench_bootstrap [--sizes 1k 100k] [--replicates 8] [--workers 1 4]
+"""
+import argparse
+import os
+import time
+import config
+from bootstrap import bootstrap_intervals
+from replay import load_fight_log
+from benchmarks.synthetic import dataset
+from benchmarks.suite import SIZES
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time bootstrap ranking intervals.")
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['1k', '100k'])
+    parser.add_argument('--replicates', type=int, default=8, help="Replicates timed per case.")
+    parser.add_argument('--workers', nargs='+', type=int, default=sorted({1, 2, os.cpu_count() or 1}))
+    args = parser.parse_args()
+    print(f"{os.cpu_count()} CPU cores")
+
+    print(f"{'size':>6} {'titles':>10} {'fights':>11} {'workers':>8} {'per replicate':>14} "
+          f"{f'{config.BOOTSTRAP_REPLICATES} replicates':>16}")
+    for size in args.sizes:
+        n_titles, n_fights = SIZES[size]
+        paths = dataset(n_titles, n_fights)
+        fights = load_fight_log(paths['fights'])
+        serial = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            intervals = bootstrap_intervals(paths['fights'], replicates=args.replicates, workers=workers, fights=fights)
+            elapsed = time.perf_counter() - start
+            if serial is None:
+                serial = intervals
+            assert intervals.equals(serial)
+            per_replicate = elapsed / args.replicates
+            print(f"{size:>6} {n_titles:>10,} {n_fights:>11,} {workers:>8} {per_replicate:>12.3f} s "
+                  f"{per_replicate * config.BOOTSTRAP_REPLICATES / 60:>12.1f} min")
@@ -0,0 +1,66 @@
+"""
+Restoring "as of fight #k": from the nearest checkpoint vs. replaying the log from the start.
+
+Builds the checkpoints of a synthetic fight log, then times state_at(k) for fights spread over
+the log against a full replay of its first k fights (load_fight_log + replay_elo, the path
+utils/replay_elo.py takes). Also reports the checkpoints' build time and size on disk.
+
+Run from the repository root:
+    python -m benchmarks.bench_checkpoints [--size 100k] [--every 1000] [--full-every 50]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import numpy as np
+import config
+from checkpoints import Checkpoints
+from replay import load_fight_log, replay_elo
+from benchmarks.synthetic import dataset
+from benchmarks.suite import SIZES
+
+
+def full_replay(fights_csv, k):
+    titles, id_a, id_b, score_a = load_fight_log(fights_csv)
+    return titles, replay_elo(id_a[:k], id_b[:k], score_a[:k], len(titles))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time checkpoint restores against full replays.")
+    parser.add_argument('--size', choices=list(SIZES), default='100k')
+    parser.add_argument('--every', type=int, default=config.CHECKPOINT_EVERY)
+    parser.add_argument('--full-every', type=int, default=config.CHECKPOINT_FULL_EVERY)
+    parser.add_argument('--points', type=int, default=5, help="Restore points spread over the log.")
+    args = parser.parse_args()
+    config.FIGHTS_ARROW_MIRROR = False # The baseline parses the CSV, as without pyarrow
+
+    n_titles, n_fights = SIZES[args.size]
+    paths = dataset(n_titles, n_fights)
+    with tempfile.TemporaryDirectory() as tmp:
+        fights_csv = os.path.join(tmp, 'head_to_head.csv')
+        shutil.copyfile(paths['fights'], fights_csv)
+        checkpoints = Checkpoints(fights_csv, every=args.every, full_every=args.full_every)
+        start = time.perf_counter()
+        checkpoints.sync()
+        build = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(checkpoints.directory, name)) for name in os.listdir(checkpoints.directory))
+        print(f"{n_titles:,} titles, {n_fights:,} fights, a checkpoint every {args.every} fights "
+              f"(full every {args.full_every}): built in {build:.1f} s, {size / 2**20:.0f} MB on disk")
+
+        rng = np.random.default_rng(0)
+        points = sorted(rng.integers(n_fights // 10, n_fights, args.points))
+        restore_times, replay_times = [], []
+        print(f"{'fight #':>10} {'checkpoint':>12} {'full replay':>12}")
+        for k in points:
+            start = time.perf_counter()
+            state = checkpoints.state_at(int(k))
+            restore_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            titles, reference = full_replay(fights_csv, int(k))
+            replay_times.append(time.perf_counter() - start)
+            ratings, _ = state.frames(titles)
+            assert np.array_equal(ratings.to_numpy(), reference['Rating'])
+            print(f"{k:>10} {restore_times[-1]:>10.3f} s {replay_times[-1]:>10.2f} s")
+        print(f"median: checkpoint {statistics.median(restore_times):.3f} s, full replay {statistics.median(replay_times):.2f} s")
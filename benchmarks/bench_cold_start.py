@@ -0,0 +1,73 @@
+"""
+Cold start: parsing and cleaning the CSVs vs. reading their Parquet snapshots.
+
+Times load_movie_data + load_movie_metadata and a full RatingService start (loads plus index
+builds) both ways, and what writing the snapshots adds to the first (parsing) load.
+
+Run from the repository root:
+    python -m benchmarks.bench_cold_start [--sizes 100k 1m]
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+import config
+import snapshot
+from data_handler import load_movie_data, load_movie_metadata
+from rating_service import RatingService
+from storage import CsvStorage
+from benchmarks.synthetic import dataset
+from benchmarks.suite import SIZES
+
+
+def timed_run(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def load_both(movies_csv, meta_csv):
+    movies_df = load_movie_data(movies_csv)
+    return movies_df, load_movie_metadata(meta_csv, movies_df.index.tolist())
+
+
+def start_service(movies_csv, meta_csv, fights_csv):
+    service = RatingService(CsvStorage(movies_csv=movies_csv, meta_csv=meta_csv), fights_csv=fights_csv)
+    service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare cold-start load time with and without CSV snapshots.")
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['100k', '1m'])
+    args = parser.parse_args()
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    if not snapshot.enabled():
+        print("pyarrow is not installed or CSV_SNAPSHOTS is off; snapshots are disabled.")
+
+    print(f"{'titles':>10} {'':>16} {'CSV':>9} {'snapshot':>9} {'speedup':>8}")
+    for size in args.sizes:
+        n_titles, _ = SIZES[size]
+        paths = dataset(n_titles, n_titles) # Fight count does not matter here
+        with tempfile.TemporaryDirectory() as tmp:
+            movies_csv, meta_csv = os.path.join(tmp, 'movies.csv'), os.path.join(tmp, 'meta.csv')
+            shutil.copyfile(paths['movies'], movies_csv)
+            shutil.copyfile(paths['meta'], meta_csv)
+            fights_csv = os.path.join(tmp, 'fights.csv')
+
+            config.CSV_SNAPSHOTS = False
+            csv_load, (movies_df, meta_df) = timed_run(lambda: load_both(movies_csv, meta_csv))
+            csv_service, _ = timed_run(lambda: start_service(movies_csv, meta_csv, fights_csv))
+
+            config.CSV_SNAPSHOTS = True
+            first_load, _ = timed_run(lambda: load_both(movies_csv, meta_csv)) # Parses and writes the snapshots
+            snap_load, (snap_movies, snap_meta) = timed_run(lambda: load_both(movies_csv, meta_csv))
+            snap_service, _ = timed_run(lambda: start_service(movies_csv, meta_csv, fights_csv))
+            same = snap_movies.equals(movies_df) and snap_meta.equals(meta_df)
+            snapshot_mb = sum(os.path.getsize(snapshot.snapshot_path(p)) for p in (movies_csv, meta_csv)) / 2**20
+
+        print(f"{n_titles:>10} {'load CSVs':>16} {csv_load:>7.2f} s {snap_load:>7.2f} s {csv_load / snap_load:>7.1f}x")
+        print(f"{'':>10} {'RatingService()':>16} {csv_service:>7.2f} s {snap_service:>7.2f} s {csv_service / snap_service:>7.1f}x")
+        print(f"{'':>10} {'first load':>16} {csv_load:>7.2f} s {first_load:>7.2f} s  (snapshots {snapshot_mb:.0f} MB, "
+              f"identical frames: {same})")
@@ -0,0 +1,124 @@
+"""
+Read throughput: the CSV files vs. their Arrow IPC (columnar, memory-mapped) copies.
+
+For the fight log: loading it as replay input (id arrays), reading one column (Score A) and
+reading a 20-row page from the middle of the log, from head_to_head.csv and from its mirror
+(head_to_head.arrow). For the catalog: loading movies + metadata with CsvStorage (with and
+without the Parquet snapshots) vs. ArrowStorage. Also times building the mirror, and first checks
+that the mirror keeps titles spelled like null markers ('NA', 'NULL', 'nan', ...) as the CSV path does.
+
+Run from the repository root:
+    python -m benchmarks.bench_columnar [--sizes 100k 1m]
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+import pandas as pd
+import config
+import columnar
+from replay import load_fight_log
+from storage import ArrowStorage, CsvStorage
+from benchmarks.synthetic import dataset
+from benchmarks.suite import SIZES
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def load_tables(storage):
+    movies_df = storage.load_movies()
+    return movies_df, storage.load_metadata(movie_titles=movies_df.index.tolist())
+
+
+def csv_page(path, start, n):
+    return pd.read_csv(path, skiprows=range(1, start + 1), nrows=n, keep_default_na=False, na_values=[''])
+
+
+def check_null_titles():
+    """The mirror and the CSV path read titles such as 'NA' / 'NULL' alike; only empty fields are missing."""
+    with tempfile.TemporaryDirectory() as tmp:
+        fights_csv = os.path.join(tmp, 'head_to_head.csv')
+        with open(fights_csv, 'w', encoding='utf-8') as f:
+            f.write('Movie A,Movie B,Outcome,Score A\nNA,NULL,Even / Tie,0.5\nnan,N/A,A Much Better,1.0\n'
+                    ',Film,A Much Better,1.0\nFilm,"",Even / Tie,0.5\nFilm,NA,B Much Better,0.0\n')
+        config.FIGHTS_ARROW_MIRROR = False
+        reference = load_fight_log(fights_csv)
+        config.FIGHTS_ARROW_MIRROR = True
+        columnar.sync_fight_mirror(fights_csv)
+        fights = load_fight_log(fights_csv)
+        assert list(fights[0]) == list(reference[0]) and len(fights[1]) == len(reference[1]) == 3, (fights, reference)
+        assert all((a == b).all() for a, b in zip(fights[1:], reference[1:]))
+        assert columnar.read_fights(fights_csv)['Movie A'].tolist() == ['NA', 'nan', 'Film']
+
+
+def report(label, csv_s, arrow_s, rows, csv_bytes):
+    print(f"  {label:<30} {csv_s:>8.3f} s {arrow_s:>8.4f} s {csv_s / arrow_s:>8.0f}x"
+          f"   {rows / arrow_s:>13,.0f} rows/s  (CSV {csv_bytes / csv_s / 2**20:.0f} MB/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare CSV and Arrow IPC read throughput.")
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['100k', '1m'])
+    args = parser.parse_args()
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    if not columnar.available():
+        raise SystemExit("pyarrow is not installed.")
+    check_null_titles()
+
+    for size in args.sizes:
+        n_titles, n_fights = SIZES[size]
+        paths = dataset(n_titles, n_fights)
+        with tempfile.TemporaryDirectory() as tmp:
+            fights_csv = os.path.join(tmp, 'head_to_head.csv')
+            movies_csv, meta_csv = os.path.join(tmp, 'movies.csv'), os.path.join(tmp, 'meta.csv')
+            shutil.copyfile(paths['fights'], fights_csv)
+            shutil.copyfile(paths['movies'], movies_csv)
+            shutil.copyfile(paths['meta'], meta_csv)
+            fights_bytes = os.path.getsize(fights_csv)
+            print(f"[{size}] {n_titles:,} titles, {n_fights:,} fights ({fights_bytes / 2**20:.0f} MB log)")
+            print(f"  {'':<30} {'CSV':>10} {'Arrow':>10} {'speedup':>9}")
+
+            # --- Fight log ---
+            config.FIGHTS_ARROW_MIRROR = False
+            csv_ids, reference = best_of(lambda: load_fight_log(fights_csv), 1)
+            config.FIGHTS_ARROW_MIRROR = True
+            build, _ = best_of(lambda: columnar.sync_fight_mirror(fights_csv), 1)
+            arrow_ids, fights = best_of(lambda: load_fight_log(fights_csv))
+            remap = pd.Index(reference[0]).get_indexer(fights[0]) # Mirror id -> CSV-path id
+            assert (remap[fights[1]] == reference[1]).all() and (remap[fights[2]] == reference[2]).all()
+            assert (fights[3] == reference[3]).all()
+            report("fight log -> id arrays", csv_ids, arrow_ids, n_fights, fights_bytes)
+
+            csv_col, _ = best_of(lambda: pd.read_csv(fights_csv, usecols=['Score A'])['Score A'].to_numpy(), 1)
+            mirror_path = columnar.fight_mirror_path(fights_csv)
+            arrow_col, _ = best_of(lambda: columnar.read_table(mirror_path, ['Score A']).column('Score A').to_numpy())
+            report("one column (Score A)", csv_col, arrow_col, n_fights, fights_bytes)
+
+            middle = n_fights // 2
+            csv_rows, csv_result = best_of(lambda: csv_page(fights_csv, middle, 20), 1)
+            arrow_rows, arrow_result = best_of(lambda: columnar.read_fights(fights_csv, middle, middle + 20))
+            assert csv_result.equals(arrow_result)
+            report("20 rows from the middle", csv_rows, arrow_rows, 20, fights_bytes)
+            print(f"  building the mirror: {build:.2f} s ({os.path.getsize(mirror_path) / 2**20:.0f} MB)")
+
+            # --- Catalog ---
+            config.CSV_SNAPSHOTS = False
+            csv_load, _ = best_of(lambda: load_tables(CsvStorage(movies_csv, meta_csv)), 1)
+            config.CSV_SNAPSHOTS = True
+            load_tables(CsvStorage(movies_csv, meta_csv)) # Writes the snapshots
+            snapshot_load, _ = best_of(lambda: load_tables(CsvStorage(movies_csv, meta_csv)))
+            arrow = ArrowStorage(os.path.join(tmp, 'movies.arrow'), os.path.join(tmp, 'meta.arrow'), movies_csv, meta_csv)
+            arrow.import_csv()
+            arrow_load, _ = best_of(lambda: load_tables(arrow))
+            catalog_bytes = os.path.getsize(movies_csv) + os.path.getsize(meta_csv)
+            report("catalog + metadata", csv_load, arrow_load, n_titles, catalog_bytes)
+            print(f"  {'(Parquet snapshots)':<30} {snapshot_load:>19.4f} s")
@@ -0,0 +1,55 @@
+"""
+Dashboard refresh cost: from-scratch join/sort/explode/groupby vs. materialized DashboardAggregates.
+
+Run from the repository root:
+    python -m benchmarks.bench_dashboard
+"""
+import random
+import time
+import numpy as np
+import pandas as pd
+from aggregates import DashboardAggregates, compute_rankings, compute_genre_stats
+
+SIZES = [10_000, 100_000, 1_000_000]
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Drama', 'Fantasy', 'Horror', 'Romance', 'Sci-Fi', 'Thriller']
+
+
+def make_frames(n, seed=0):
+    rng = np.random.default_rng(seed)
+    titles = [f"Movie {i}" for i in range(n)]
+    genres = ['|'.join(rng.choice(GENRES, rng.integers(1, 4), replace=False)) for _ in range(n)]
+    movies_df = pd.DataFrame({
+        'Title': titles, 'Genres': genres, 'PosterURL': '', 'Rating': rng.integers(1000, 1400, n),
+    }).set_index('Title', drop=False)
+    meta_df = pd.DataFrame(rng.integers(0, 50, (n, 4)), index=titles, columns=['Comparisons', 'Wins', 'Losses', 'Draws'])
+    return movies_df, meta_df
+
+
+if __name__ == "__main__":
+    print(f"{'titles':>10} {'from scratch':>14} {'vote update':>13} {'refresh':>10} {'build once':>12}")
+    for n in SIZES:
+        movies_df, meta_df = make_frames(n)
+        start = time.perf_counter()
+        compute_rankings(movies_df, meta_df)
+        compute_genre_stats(movies_df)
+        scratch_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        aggregates = DashboardAggregates.from_frames(movies_df, meta_df)
+        build_s = time.perf_counter() - start
+
+        store = aggregates.store
+        start = time.perf_counter()
+        for _ in range(200):
+            pair = [random.randrange(n), random.randrange(n)]
+            store.rating[pair] += 7
+            store.comparisons[pair] += 1
+            aggregates.update(pair)
+        update_s = (time.perf_counter() - start) / 200
+
+        # A refresh after a vote: re-gather the ranked table once, then cached reruns are free
+        start = time.perf_counter()
+        aggregates.ranked_view()
+        aggregates.genre_stats()
+        refresh_s = time.perf_counter() - start
+        print(f"{n:>10} {scratch_s * 1e3:>11.1f} ms {update_s * 1e3:>10.3f} ms {refresh_s * 1e3:>7.1f} ms {build_s * 1e3:>9.1f} ms")
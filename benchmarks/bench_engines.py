@@ -0,0 +1,60 @@
+"""
+Rating engines fitted from a fight log: fit time, peak memory and ranking agreement.
+
+Fights are generated from hidden "true" movie strengths (Bradley-Terry odds, outcomes mapped
+onto the SCORE_MAP slider values), so each engine's ranking is compared both with the ELO
+replay and with the true order (Spearman rank correlation).
+
+Run from the repository root:
+    python -m benchmarks.bench_engines [--fights 1000000] [--titles 100000] [--memory]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import pandas as pd
+from replay import load_fight_log
+from rating_engines import ENGINES, fit_fights
+from benchmarks.synthetic import write_fight_log, movie_titles
+
+
+def make_fight_log(path, n_fights, n_titles, seed=0):
+    """Writes a head_to_head.csv and returns the true strength per title (in log-odds)."""
+    strength = write_fight_log(path, n_fights, n_titles, seed)[0]
+    return pd.Series(strength, index=movie_titles(n_titles))
+
+
+def spearman(x, y):
+    return float(pd.Series(x).rank().corr(pd.Series(y).rank()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare rating engines fitted from a synthetic fight log.")
+    parser.add_argument('--fights', type=int, default=1_000_000)
+    parser.add_argument('--titles', type=int, default=100_000)
+    parser.add_argument('--memory', action='store_true', help="Also fit under tracemalloc to report peak memory (slow).")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'head_to_head.csv')
+        print(f"Generating {args.fights:,} fights over {args.titles:,} titles...")
+        strength = make_fight_log(path, args.fights, args.titles)
+        start = time.perf_counter()
+        titles, id_a, id_b, score_a = load_fight_log(path)
+        print(f"Parsed fight log in {time.perf_counter() - start:.1f} s")
+
+    truth = strength.reindex(titles).to_numpy()
+    results = {}
+    print(f"{'engine':>14} {'fit':>9} {'peak MB':>8} {'vs ELO':>7} {'vs truth':>9}")
+    for engine in ENGINES:
+        start = time.perf_counter()
+        ratings = fit_fights(id_a, id_b, score_a, len(titles), engine)['Rating']
+        fit_s = time.perf_counter() - start
+        peak = '-'
+        if args.memory: # Tracing slows the fit down a lot, so it gets its own run
+            tracemalloc.start()
+            fit_fights(id_a, id_b, score_a, len(titles), engine)
+            peak = f"{tracemalloc.get_traced_memory()[1] / 2**20:.0f}"
+            tracemalloc.stop()
+        results[engine] = ratings
+        print(f"{engine:>14} {fit_s:>7.2f} s {peak:>8} {spearman(ratings, results['elo']):>7.3f} {spearman(ratings, truth):>9.3f}")
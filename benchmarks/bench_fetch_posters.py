@@ -0,0 +1,102 @@
+"""
+Poster fetcher throughput against a local stub TMDb server (no network, no API key needed).
+
+The stub adds a fixed latency per request and can inject 429s, 500s and stalls,
+so the concurrent mode's rate limiting and retries are exercised end to end.
+
+Run from the repository root:
+    python -m benchmarks.bench_fetch_posters
+"""
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import utils.fetch_poster as fetch_poster
+from utils.tmdb_cache import TmdbCache
+
+LATENCY = 0.05        # Seconds per stub response
+SEQUENTIAL_TITLES = 20
+CONCURRENT_TITLES = 400
+
+
+class StubTmdb(BaseHTTPRequestHandler):
+    failure_rate = 0.0 # Fraction of requests answered with 429 / 500 / a stall past the client timeout
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=None, headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        payload = json.dumps(body or {}).encode()
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        roll = random.random()
+        if roll < self.failure_rate / 3:
+            return self._send(429, headers={'Retry-After': '0.2'})
+        if roll < 2 * self.failure_rate / 3:
+            return self._send(500)
+        if roll < self.failure_rate:
+            time.sleep(fetch_poster.API_TIMEOUT + 0.1) # Client times out
+            return
+        url = urlparse(self.path)
+        if url.path.endswith('/search/movie'):
+            query = parse_qs(url.query)['query'][0]
+            if query.startswith('Missing'):
+                return self._send(200, {'results': []})
+            return self._send(200, {'results': [{'id': zlib.crc32(query.encode())}]})
+        movie_id = url.path.rsplit('/', 1)[-1]
+        return self._send(200, {'poster_path': f"/{movie_id}.jpg"})
+
+
+def expected_url(title):
+    if title.startswith('Missing'):
+        return None
+    return f"{fetch_poster.TMDB_POSTER_BASE_URL}/{zlib.crc32(title.encode())}.jpg"
+
+
+if __name__ == "__main__":
+    fetch_poster.API_TIMEOUT = 1
+    fetch_poster.RETRY_DELAY = 0.1
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubTmdb)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/3"
+    titles = [f"Movie {i}" if i % 10 else f"Missing {i}" for i in range(CONCURRENT_TITLES)]
+
+    # Original sequential mode (including its fixed REQUEST_DELAY sleep)
+    start = time.perf_counter()
+    for title in titles[:SEQUENTIAL_TITLES]:
+        assert fetch_poster.get_poster_url(title, 'stub-key', base_url=base_url) == expected_url(title)
+        time.sleep(fetch_poster.REQUEST_DELAY)
+    sequential_rate = SEQUENTIAL_TITLES / (time.perf_counter() - start)
+    print(f"sequential:            {sequential_rate:6.1f} titles/s")
+
+    for workers, rate, failure_rate in [(8, 50, 0.0), (32, 200, 0.0), (32, 200, 0.05)]:
+        StubTmdb.failure_rate = failure_rate
+        results, stats = fetch_poster.fetch_posters_concurrent(titles, 'stub-key', workers=workers, rate=rate, base_url=base_url)
+        wrong = sum(results[t] != expected_url(t) for t in titles)
+        print(f"concurrent w={workers:<2} r={rate:<3} failures={failure_rate:.0%}: {stats['titles_per_sec']:6.1f} titles/s, "
+              f"{wrong} wrong/missing results")
+
+    # Lookup cache: a first run fills it, a re-run (or resumed run) needs no network at all
+    StubTmdb.failure_rate = 0.0
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TmdbCache(os.path.join(tmp, 'tmdb_cache.db'))
+        for run in ('cold', 'warm'):
+            results, stats = fetch_poster.fetch_posters_concurrent(titles, 'stub-key', workers=32, rate=200,
+                                                                   base_url=base_url, cache=cache)
+            wrong = sum(results[t] != expected_url(t) for t in titles)
+            print(f"cached run ({run}):     {stats['titles_per_sec']:8.1f} titles/s, {wrong} wrong/missing results")
+        cache.close()
+    server.shutdown()
@@ -0,0 +1,44 @@
+"""
+Comparison history panel: full pd.read_csv(...).tail(20) vs. read_recent_fights.
+
+Run from the repository root:
+    python -m benchmarks.bench_history
+"""
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from data_handler import read_recent_fights
+
+SIZES = [10_000, 100_000, 1_000_000, 3_000_000]
+
+
+def make_log(path, n, seed=0):
+    rng = np.random.default_rng(seed)
+    pd.DataFrame({
+        'Movie A': [f"Movie {i}" for i in rng.integers(0, 100_000, n)],
+        'Movie B': [f"Movie {i}" for i in rng.integers(0, 100_000, n)],
+        'Outcome': 'Even / Tie',
+        'Score A': 0.5,
+    }).to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    print(f"{'fights':>10} {'read_csv+tail':>15} {'tail reader':>13} {'page 50':>10}")
+    for n in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'head_to_head.csv')
+            make_log(path, n)
+            start = time.perf_counter()
+            pd.read_csv(path).tail(20)
+            full_s = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(100):
+                read_recent_fights(path, n=20)
+            tail_s = (time.perf_counter() - start) / 100
+            start = time.perf_counter()
+            for _ in range(100):
+                read_recent_fights(path, n=20, skip=49 * 20)
+            page_s = (time.perf_counter() - start) / 100
+        print(f"{n:>10} {full_s * 1e3:>12.1f} ms {tail_s * 1e3:>10.2f} ms {page_s * 1e3:>7.2f} ms")
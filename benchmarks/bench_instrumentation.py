@@ -0,0 +1,37 @@
+"""
+Overhead of the timing instrumentation on a small hot function (update_elo).
+
+Run from the repository root:
+    python -m benchmarks.bench_instrumentation [calls]
+"""
+import os
+import sys
+import tempfile
+import time
+import config
+import instrumentation
+from elo_logic import update_elo
+
+
+def per_call(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn(1200, 1250, 0.75, 40)
+    return (time.perf_counter() - start) / calls
+
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    plain = per_call(update_elo.__wrapped__, calls)
+    instrumentation.enable(False)
+    disabled = per_call(update_elo, calls)
+    instrumentation.enable(True)
+    with tempfile.TemporaryDirectory() as tmp:
+        config.PROFILE_LOG = os.path.join(tmp, 'spans.jsonl') # Includes writing the spans out
+        instrumentation.start_rerun({}) # Spans recorded into a rerun, as on the script thread
+        enabled = per_call(update_elo, calls)
+        instrumentation.flush()
+    instrumentation.enable(False)
+    print(f"update_elo undecorated:       {plain * 1e9:8.0f} ns/call")
+    print(f"profiling off (@timed):       {disabled * 1e9:8.0f} ns/call (+{(disabled - plain) * 1e9:.0f} ns)")
+    print(f"profiling on (span recorded): {enabled * 1e9:8.0f} ns/call (+{(enabled - plain) * 1e9:.0f} ns)")
@@ -0,0 +1,85 @@
+"""
+Click-to-next-pair latency: applying a vote to the selection state and getting the next pair,
+drawn at click time (select_movie_pair with / without the PairSampler) vs. popped from a PairQueue
+(which redraws only the queued pairs containing the voted movies). Storage writes are not included;
+see bench_storage for those. 'fill' is the per-pair cost of topping the queue up after the page is sent.
+
+Run from the repository root:
+    python -m benchmarks.bench_pair_queue
+"""
+import random
+import time
+import numpy as np
+from elo_logic import update_elo
+from selection_logic import select_movie_pair, PairSampler, RatingIndex, PairQueue
+from benchmarks.bench_selection import make_frames
+
+SIZES = [1_000, 100_000, 1_000_000]
+VOTES = 2_000
+
+
+def click_latencies(movies_df, meta_df, select, votes, queue=None):
+    """Per-click seconds for `votes` simulated votes; each vote is cast on the previous pair."""
+    sampler = select.sampler
+    rating_index = select.rating_index
+    latencies = []
+    pair = select()
+    if queue is not None:
+        queue.fill(select)
+    for _ in range(votes):
+        start = time.perf_counter()
+        title_a, title_b = pair
+        rating_a, rating_b = update_elo(movies_df.at[title_a, 'Rating'], movies_df.at[title_b, 'Rating'], random.random(), 40)
+        for title, rating in ((title_a, rating_a), (title_b, rating_b)):
+            movies_df.at[title, 'Rating'] = rating
+            meta_df.at[title, 'Comparisons'] += 1
+            if sampler is not None:
+                sampler.update(title, meta_df.at[title, 'Comparisons'])
+                rating_index.update(title, rating)
+        if queue is not None:
+            queue.invalidate(pair, select)
+            pair = queue.pop(select)
+        else:
+            pair = select()
+        latencies.append(time.perf_counter() - start)
+        if queue is not None:
+            queue.fill(select) # Off the click path (runs after the page is sent)
+    return np.array(latencies)
+
+
+class Select:
+    """select_movie_pair bound to one set of frames / selection state."""
+
+    def __init__(self, movies_df, meta_df, strategy, sampler=None, rating_index=None):
+        self.movies_df, self.meta_df, self.strategy = movies_df, meta_df, strategy
+        self.sampler, self.rating_index = sampler, rating_index
+
+    def __call__(self):
+        return select_movie_pair(self.movies_df, self.meta_df, self.sampler, self.rating_index, self.strategy)
+
+
+def fmt(latencies):
+    return f"{np.median(latencies) * 1e6:>9.1f} / {np.percentile(latencies, 99) * 1e6:>9.1f} us"
+
+
+if __name__ == "__main__":
+    print("click -> next pair, p50 / p99")
+    print(f"{'titles':>10} {'strategy':>14} {'no sampler':>26} {'sampler':>26} {'sampler + queue':>26} {'fill / pair':>12}")
+    for n in SIZES:
+        for strategy in ('weighted', 'rating_window'):
+            movies_df, meta_df = make_frames(n)
+            legacy = click_latencies(movies_df, meta_df, Select(movies_df, meta_df, strategy), max(5, VOTES * 1_000 // n))
+
+            movies_df, meta_df = make_frames(n)
+            select = Select(movies_df, meta_df, strategy, PairSampler.from_frames(movies_df, meta_df), RatingIndex.from_frame(movies_df))
+            direct = click_latencies(movies_df, meta_df, select, VOTES)
+
+            movies_df, meta_df = make_frames(n)
+            select = Select(movies_df, meta_df, strategy, PairSampler.from_frames(movies_df, meta_df), RatingIndex.from_frame(movies_df))
+            queue = PairQueue()
+            queued = click_latencies(movies_df, meta_df, select, VOTES, queue)
+            start = time.perf_counter()
+            queue.clear()
+            queue.fill(select)
+            fill_s = (time.perf_counter() - start) / queue.size
+            print(f"{n:>10} {strategy:>14} {fmt(legacy):>26} {fmt(direct):>26} {fmt(queued):>26} {fill_s * 1e6:>9.1f} us")
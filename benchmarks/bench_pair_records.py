@@ -0,0 +1,93 @@
+"""
+Head-to-head pair records: memory and speed of PairRecords vs. a dict of pairs.
+
+Builds PairRecords over millions of distinct random pairs of 1M movie ids and reports the bytes
+per pair, the bulk build time, the time to look up one candidate pair (seen / never seen, as
+pair selection does per candidate) and to record a vote. The dict-of-pairs baseline
+({(lo, hi): [wins, draws, losses, score]}) is measured with tracemalloc on the smallest count.
+Finally builds the records from the fight logs of the benchmark data sets (as at service start).
+
+Run from the repository root:
+    python -m benchmarks.bench_pair_records [--pairs 1000000 5000000 10000000] [--sizes 1k 100k]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+import numpy as np
+import config
+from pair_records import PairRecords
+from replay import load_fight_log
+from benchmarks.synthetic import dataset
+from benchmarks.suite import SIZES
+
+N_MOVIES = 1_000_000
+
+
+def random_fights(n_pairs, rng):
+    """n_pairs distinct (a, b) pairs of movie ids, each fought once, with random scores."""
+    keys = rng.permutation(np.unique(rng.integers(0, N_MOVIES * N_MOVIES, int(n_pairs * 2.2))))
+    lo, hi = keys // N_MOVIES, keys % N_MOVIES
+    keep = lo < hi # One key per unordered pair
+    lo, hi = lo[keep][:n_pairs], hi[keep][:n_pairs]
+    swap = rng.random(len(lo)) < 0.5 # Either movie can be A
+    return np.where(swap, hi, lo), np.where(swap, lo, hi), rng.choice(list(config.SCORE_MAP.values()), len(lo))
+
+
+def dict_bytes(a, b, score_a):
+    tracemalloc.start()
+    pairs = {}
+    for x, y, score in zip(a.tolist(), b.tolist(), score_a.tolist()):
+        record = pairs.setdefault((min(x, y), max(x, y)), [0, 0, 0, 0.0])
+        record[0 if score > 0.5 else 2 if score < 0.5 else 1] += 1
+        record[3] += score
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(pairs)
+
+
+def per_call(fn, args):
+    start = time.perf_counter()
+    for arg in args:
+        fn(*arg)
+    return (time.perf_counter() - start) / len(args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory and speed of the head-to-head pair records.")
+    parser.add_argument('--pairs', nargs='+', type=int, default=[1_000_000, 5_000_000, 10_000_000])
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['1k', '100k'])
+    parser.add_argument('--lookups', type=int, default=100_000)
+    args = parser.parse_args()
+    config.FIGHTS_ARROW_MIRROR = False
+    rng = np.random.default_rng(0)
+
+    print(f"{'pairs':>11} {'build':>8} {'MB':>7} {'B/pair':>7} {'dict B/pair':>12} {'seen':>8} {'unseen':>8} {'add':>8}")
+    for i, n_pairs in enumerate(sorted(args.pairs)):
+        a, b, score_a = random_fights(n_pairs, rng)
+        start = time.perf_counter()
+        records = PairRecords.from_fights(a, b, score_a)
+        build = time.perf_counter() - start
+        assert len(records) == len(a)
+        nbytes = records.nbytes
+        dict_per_pair = f"{dict_bytes(a, b, score_a):.0f}" if i == 0 else '-'
+        picks = rng.integers(0, len(a), args.lookups)
+        seen = list(zip(b[picks].tolist(), a[picks].tolist()))
+        unseen = [(random.randrange(N_MOVIES), random.randrange(N_MOVIES)) for _ in range(args.lookups)]
+        seen_s, unseen_s = per_call(records.fights, seen), per_call(records.fights, unseen)
+        assert all(records.fights(x, y) for x, y in seen[:1000])
+        add_s = per_call(lambda x, y: records.add(x, y, 0.75), unseen) # Mostly new pairs (may grow the table)
+        print(f"{len(a):>11,} {build:>7.2f}s {nbytes / 2**20:>7.0f} {nbytes / len(a):>7.0f} "
+              f"{dict_per_pair:>12} {seen_s * 1e6:>6.2f}us {unseen_s * 1e6:>6.2f}us {add_s * 1e6:>6.2f}us")
+
+    print(f"\n{'size':>6} {'fights':>11} {'pairs':>11} {'load log':>9} {'build':>8}")
+    for size in args.sizes:
+        n_titles, n_fights = SIZES[size]
+        paths = dataset(n_titles, n_fights)
+        start = time.perf_counter()
+        titles, id_a, id_b, score_a = load_fight_log(paths['fights'])
+        load = time.perf_counter() - start
+        start = time.perf_counter()
+        records = PairRecords.from_fights(id_a, id_b, score_a)
+        build = time.perf_counter() - start
+        print(f"{size:>6} {n_fights:>11,} {len(records):>11,} {load:>8.2f}s {build:>7.2f}s")
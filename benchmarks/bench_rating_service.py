@@ -0,0 +1,176 @@
+"""
+Concurrent-voter load test for the shared RatingService.
+
+Dozens of simulated voters (threads, like Streamlit sessions) draw pairs and vote at the same time.
+Reports votes/sec, vote latency, the average commit batch size and the lost-update count: votes
+whose comparison is missing from the saved metadata. The saved ratings must also equal a replay of
+the saved fight log, i.e. every vote was applied on top of all earlier ones.
+The service runs twice: committing every batch to the tables, and in write-behind mode (votes
+fsync'd to the vote journal, tables flushed every FLUSH_VOTES votes). For contrast, the same load
+is run the old way: every session holds its own copy of the tables and rewrites the CSVs after
+each of its votes.
+
+Run from the repository root:
+    python -m benchmarks.bench_rating_service [--voters 48] [--votes 50] [--titles 2000] [--backend csv]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+import config
+from data_handler import load_movie_data, load_movie_metadata, save_movie_data, save_movie_metadata, log_fight
+from elo_logic import get_k_factor, update_elo
+from rating_service import RatingService
+from replay import replay_fights
+from storage import CsvStorage, SqliteStorage, JournaledStorage
+from vote_journal import VoteJournal
+
+# Which W/L/D column each outcome increments, for movie A and movie B (the old per-click handler)
+OUTCOME_STATS = {
+    "A Much Better": ('Wins', 'Losses'),
+    "A Slightly Better": ('Wins', 'Losses'),
+    "Even / Tie": ('Draws', 'Draws'),
+    "B Slightly Better": ('Losses', 'Wins'),
+    "B Much Better": ('Losses', 'Wins'),
+}
+
+
+def write_catalog(directory, n):
+    movies_csv = os.path.join(directory, 'movies.csv')
+    meta_csv = os.path.join(directory, 'meta.csv')
+    titles = [f"Movie {i}" for i in range(n)]
+    pd.DataFrame({'Title': titles, 'Genres': 'Drama', 'PosterURL': '', 'Rating': config.DEFAULT_ELO}).to_csv(movies_csv, index=False)
+    pd.DataFrame(0, index=pd.Index(titles, name='Title'), columns=['Comparisons', 'Wins', 'Losses', 'Draws']).to_csv(meta_csv)
+    return movies_csv, meta_csv, os.path.join(directory, 'fights.csv')
+
+
+def make_storage(backend, directory, movies_csv, meta_csv, write_behind=False):
+    if backend == 'sqlite':
+        storage = SqliteStorage(os.path.join(directory, 'elo.db'), movies_csv, meta_csv)
+    else:
+        storage = CsvStorage(movies_csv, meta_csv)
+    if write_behind:
+        storage = JournaledStorage(storage, VoteJournal(os.path.join(directory, 'journal.jsonl')),
+                                   fights_csv=os.path.join(directory, 'fights.csv'))
+    return storage
+
+
+def run_voters(voters, votes, vote_fn):
+    """Runs `voters` threads casting `votes` each. Returns (seconds, latencies, per-title vote counts)."""
+    latencies = []
+    counts = {}
+    lock = threading.Lock()
+    barrier = threading.Barrier(voters)
+
+    def voter(seed):
+        rng = random.Random(seed)
+        barrier.wait()
+        for _ in range(votes):
+            start = time.perf_counter()
+            title_a, title_b = vote_fn(rng)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                counts[title_a] = counts.get(title_a, 0) + 1
+                counts[title_b] = counts.get(title_b, 0) + 1
+
+    threads = [threading.Thread(target=voter, args=(seed,)) for seed in range(voters)]
+    start = time.perf_counter()
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    return time.perf_counter() - start, np.array(latencies), counts
+
+
+def lost_updates(counts, meta_df):
+    """Votes missing from the saved metadata (each vote adds one comparison to both movies)."""
+    expected = pd.Series(counts).reindex(meta_df.index).fillna(0)
+    return int((expected - meta_df['Comparisons']).clip(lower=0).sum()) // 2
+
+
+def report(name, seconds, latencies, total_votes, lost, extra=''):
+    print(f"{name:>16}: {total_votes / seconds:>8.0f} votes/s, latency p50 {np.median(latencies) * 1e3:.2f} ms / "
+          f"p99 {np.percentile(latencies, 99) * 1e3:.2f} ms, lost updates: {lost}{extra}")
+
+
+def bench_service(args, write_behind=False):
+    with tempfile.TemporaryDirectory() as directory:
+        movies_csv, meta_csv, fights_csv = write_catalog(directory, args.titles)
+        service = RatingService(make_storage(args.backend, directory, movies_csv, meta_csv, write_behind),
+                                fights_csv=fights_csv, write_behind=write_behind)
+        outcomes = list(config.SCORE_MAP)
+
+        def vote(rng):
+            title_a, title_b = service.select_pair()
+            outcome = rng.choice(outcomes)
+            service.vote(title_a, title_b, outcome, config.SCORE_MAP[outcome])
+            return title_a, title_b
+
+        seconds, latencies, counts = run_voters(args.voters, args.votes, vote)
+        service.close()
+        storage = make_storage(args.backend, directory, movies_csv, meta_csv, write_behind)
+        movies_df = storage.load_movies()
+        meta_df = storage.load_metadata(movie_titles=movies_df.index.tolist())
+        ratings, _ = replay_fights(fights_csv, movie_titles=movies_df.index.tolist())
+        replay_ok = bool((ratings == movies_df['Rating']).all())
+        total_votes = args.voters * args.votes
+        report('write-behind' if write_behind else 'RatingService', seconds, latencies, total_votes, lost_updates(counts, meta_df),
+               f", {total_votes / max(service.batches, 1):.1f} votes/commit, saved ratings match log replay: {replay_ok}")
+
+
+def bench_per_session(args):
+    """The old behaviour: each session loads its own copy and rewrites both CSVs after every vote."""
+    with tempfile.TemporaryDirectory() as directory:
+        movies_csv, meta_csv, fights_csv = write_catalog(directory, args.titles)
+        sessions = {}
+        errors = []
+
+        def vote(rng):
+            session = sessions.get(threading.get_ident())
+            if session is None:
+                movies_df = load_movie_data(movies_csv)
+                session = sessions[threading.get_ident()] = (movies_df, load_movie_metadata(meta_csv, movies_df.index.tolist()))
+            movies_df, meta_df = session
+            title_a = title_b = movies_df.index[rng.randrange(len(movies_df))]
+            while title_b == title_a:
+                title_b = movies_df.index[rng.randrange(len(movies_df))]
+            outcome = rng.choice(list(OUTCOME_STATS))
+            k = get_k_factor(meta_df.at[title_a, 'Comparisons'], meta_df.at[title_b, 'Comparisons'])
+            new_a, new_b = update_elo(movies_df.at[title_a, 'Rating'], movies_df.at[title_b, 'Rating'], config.SCORE_MAP[outcome], k)
+            col_a, col_b = OUTCOME_STATS[outcome]
+            for title, rating, col in ((title_a, new_a, col_a), (title_b, new_b, col_b)):
+                movies_df.at[title, 'Rating'] = rating
+                meta_df.at[title, 'Comparisons'] += 1
+                meta_df.at[title, col] += 1
+            try:
+                log_fight(title_a, title_b, outcome, config.SCORE_MAP[outcome], fights_csv)
+                save_movie_data(movies_df, movies_csv)
+                save_movie_metadata(meta_df, meta_csv)
+            except Exception as e:
+                errors.append(e)
+            return title_a, title_b
+
+        seconds, latencies, counts = run_voters(args.voters, args.votes, vote)
+        try:
+            meta_df = pd.read_csv(meta_csv).set_index('Title')
+            lost = lost_updates(counts, meta_df)
+        except Exception as e:
+            lost = f"unknown (metadata file unreadable: {e})"
+        extra = f", write errors: {len(errors)}" if errors else ''
+        report('per-session CSV', seconds, latencies, args.voters * args.votes, lost, extra)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--voters', type=int, default=48)
+    parser.add_argument('--votes', type=int, default=50, help="Votes per voter")
+    parser.add_argument('--titles', type=int, default=2_000)
+    parser.add_argument('--backend', choices=['csv', 'sqlite'], default='csv')
+    args = parser.parse_args()
+    print(f"{args.voters} voters x {args.votes} votes, {args.titles} titles, {args.backend} storage")
+    bench_service(args)
+    bench_service(args, write_behind=True)
+    bench_per_session(args)
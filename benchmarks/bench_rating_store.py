@@ -0,0 +1,94 @@
+"""
+Per-vote update cost and memory: DataFrame scalar updates (the old RatingService._apply)
+vs. record_result on the array-backed RatingStore.
+
+Run from the repository root:
+    python -m benchmarks.bench_rating_store [--votes 20000]
+"""
+import argparse
+import random
+import time
+import numpy as np
+import pandas as pd
+from elo_logic import get_k_factor, update_elo, record_result
+from rating_store import RatingStore, STAT_COLS
+from benchmarks.bench_rating_service import OUTCOME_STATS
+import config
+
+SIZES = [1_000, 100_000, 1_000_000]
+
+
+def make_frames(n, seed=0):
+    rng = np.random.default_rng(seed)
+    titles = [f"Movie {i}" for i in range(n)]
+    movies_df = pd.DataFrame({'Title': titles, 'Genres': 'Drama', 'PosterURL': '',
+                              'Rating': rng.integers(1000, 1400, n)}).set_index('Title', drop=False)
+    meta_df = pd.DataFrame(rng.integers(0, 50, (n, 4)), index=pd.Index(titles, name='Title'), columns=STAT_COLS)
+    return movies_df, meta_df
+
+
+def make_votes(titles, count, seed=1):
+    rng = random.Random(seed)
+    outcomes = list(OUTCOME_STATS)
+    votes = []
+    for _ in range(count):
+        a, b = rng.sample(range(len(titles)), 2)
+        outcome = rng.choice(outcomes)
+        votes.append((titles[a], titles[b], outcome, config.SCORE_MAP[outcome]))
+    return votes
+
+
+def apply_frames(movies_df, meta_df, votes):
+    """The old per-vote path: .at lookups and writes on the two frames."""
+    for title_a, title_b, outcome, score_a in votes:
+        k = get_k_factor(meta_df.at[title_a, 'Comparisons'], meta_df.at[title_b, 'Comparisons'])
+        new_a, new_b = update_elo(movies_df.at[title_a, 'Rating'], movies_df.at[title_b, 'Rating'], score_a, k)
+        col_a, col_b = OUTCOME_STATS[outcome]
+        for title, rating, col in ((title_a, new_a, col_a), (title_b, new_b, col_b)):
+            movies_df.at[title, 'Rating'] = rating
+            meta_df.at[title, 'Comparisons'] += 1
+            meta_df.at[title, col] += 1
+
+
+def apply_store(store, votes):
+    """The RatingStore path: title -> id dict lookups, then array slot updates."""
+    ids = store.ids
+    for title_a, title_b, _, score_a in votes:
+        record_result(store, ids[title_a], ids[title_b], score_a)
+
+
+def frame_bytes(movies_df, meta_df):
+    """Deep size of the Rating column plus meta_df: what the store replaces."""
+    return int(movies_df['Rating'].memory_usage(index=False) + meta_df.memory_usage(deep=True).sum())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-vote update cost and memory of frames vs RatingStore.")
+    parser.add_argument('--votes', type=int, default=20_000)
+    args = parser.parse_args()
+    print(f"{'titles':>10} {'frames/vote':>12} {'store/vote':>11} {'speedup':>8} {'frame MB':>9} {'store MB':>9} {'view build':>11} {'same state':>11}")
+    for n in SIZES:
+        movies_df, meta_df = make_frames(n)
+        store = RatingStore.from_frames(movies_df, meta_df)
+        votes = make_votes(movies_df.index, args.votes)
+
+        start = time.perf_counter()
+        apply_frames(movies_df, meta_df, votes)
+        frames_s = (time.perf_counter() - start) / len(votes)
+
+        start = time.perf_counter()
+        apply_store(store, votes)
+        store_s = (time.perf_counter() - start) / len(votes)
+
+        catalog = movies_df.drop(columns='Rating')
+        start = time.perf_counter()
+        view = store.movies_frame(catalog)
+        stats_view = store.stats_frame()
+        view_s = time.perf_counter() - start
+        same = bool((view['Rating'] == movies_df['Rating']).all() and (stats_view == meta_df[STAT_COLS]).all().all())
+
+        # Index memory counts for both: the store keeps its own Title index for the views
+        store_mb = (store.nbytes() + store.index.memory_usage(deep=True)) / 2**20
+        frame_mb = (frame_bytes(movies_df, meta_df) + movies_df.index.memory_usage(deep=True)) / 2**20
+        print(f"{n:>10} {frames_s * 1e6:>9.1f} us {store_s * 1e6:>8.1f} us {frames_s / store_s:>7.1f}x "
+              f"{frame_mb:>9.1f} {store_mb:>9.1f} {view_s * 1e3:>8.2f} ms {str(same):>11}")
@@ -0,0 +1,65 @@
+"""
+Batch ELO replay throughput vs. the per-click scalar path.
+
+Run from the repository root:
+    python -m benchmarks.bench_replay [fights] [titles]
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from config import DEFAULT_ELO, SCORE_MAP
+from elo_logic import get_k_factor, update_elo
+from replay import replay_fights
+
+SCALAR_FIGHTS = 2_000 # The .loc path is too slow to run at full size; extrapolated from this many
+
+
+def make_fight_log(path, n_fights, n_titles, seed=0):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, n_titles, n_fights)
+    b = (a + rng.integers(1, n_titles, n_fights)) % n_titles
+    outcomes = np.array(list(SCORE_MAP))
+    picks = rng.integers(0, len(outcomes), n_fights)
+    titles = np.array([f"Movie {i}" for i in range(n_titles)], dtype=object)
+    pd.DataFrame({
+        'Movie A': titles[a], 'Movie B': titles[b],
+        'Outcome': outcomes[picks], 'Score A': np.array(list(SCORE_MAP.values()))[picks],
+    }).to_csv(path, index=False)
+    return titles.tolist()
+
+
+def scalar_replay(path, titles, n_fights):
+    """The live app path: get_k_factor + update_elo + DataFrame .loc updates per fight."""
+    movies_df = pd.DataFrame({'Rating': DEFAULT_ELO}, index=titles)
+    meta_df = pd.DataFrame(0, index=titles, columns=['Comparisons', 'Wins', 'Losses', 'Draws'])
+    fights = pd.read_csv(path, nrows=n_fights)
+    for title_a, title_b, score_a in zip(fights['Movie A'], fights['Movie B'], fights['Score A']):
+        k = get_k_factor(meta_df.loc[title_a, 'Comparisons'], meta_df.loc[title_b, 'Comparisons'])
+        new_a, new_b = update_elo(movies_df.loc[title_a, 'Rating'], movies_df.loc[title_b, 'Rating'], score_a, k)
+        movies_df.loc[title_a, 'Rating'] = new_a
+        movies_df.loc[title_b, 'Rating'] = new_b
+        meta_df.loc[title_a, 'Comparisons'] += 1
+        meta_df.loc[title_b, 'Comparisons'] += 1
+
+
+if __name__ == "__main__":
+    n_fights = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    n_titles = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'head_to_head.csv')
+        print(f"Generating {n_fights:,} fights over {n_titles:,} titles...")
+        titles = make_fight_log(path, n_fights, n_titles)
+
+        start = time.perf_counter()
+        scalar_replay(path, titles, SCALAR_FIGHTS)
+        scalar_per_fight = (time.perf_counter() - start) / SCALAR_FIGHTS
+
+        start = time.perf_counter()
+        replay_fights(path, movie_titles=titles)
+        batch_s = time.perf_counter() - start
+
+    print(f"scalar .loc path: {scalar_per_fight * 1e6:8.1f} us/fight -> {scalar_per_fight * n_fights:10.1f} s extrapolated")
+    print(f"batch replay:     {batch_s / n_fights * 1e6:8.2f} us/fight -> {batch_s:10.1f} s total (incl. CSV parsing)")
@@ -0,0 +1,43 @@
+"""
+Rankings search: Title.str.contains over the full frame vs. TitleSearchIndex, at 500k titles.
+
+Run from the repository root:
+    python -m benchmarks.bench_search [titles]
+"""
+import random
+import sys
+import time
+import pandas as pd
+from search_index import TitleSearchIndex
+
+WORDS = ['the', 'dark', 'knight', 'return', 'of', 'star', 'wars', 'love', 'story', 'night', 'city', 'lost',
+         'last', 'man', 'woman', 'house', 'blood', 'king', 'dream', 'summer', 'war', 'ghost', 'river', 'zodiac']
+QUERIES = ['zodiac river', 'dark knight', 'night', 'the', 'ghost 4999', 'Summer Dream 1', 'th', 'z', '9']
+
+
+def make_titles(n, seed=0):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title() + f" {i}" for i in range(n)]
+
+
+def per_call(fn, reps):
+    start = time.perf_counter()
+    for _ in range(reps):
+        result = fn()
+    return (time.perf_counter() - start) / reps, len(result)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    titles = pd.Series(make_titles(n))
+    start = time.perf_counter()
+    index = TitleSearchIndex(titles)
+    print(f"Built index over {n:,} titles in {time.perf_counter() - start:.1f} s "
+          f"({len(index.gram_ids):,} trigrams, {index.postings.nbytes / 1e6:.0f} MB postings)")
+    print(f"{'query':>16} {'matches':>9} {'str.contains':>14} {'substring idx':>15} {'prefix idx':>12}")
+    for query in QUERIES:
+        scan_s, matches = per_call(lambda: titles[titles.str.contains(query, case=False, na=False)], 3)
+        index_s, index_matches = per_call(lambda: index.search(query), 20)
+        prefix_s, _ = per_call(lambda: index.prefix(query), 20)
+        assert matches == index_matches
+        print(f"{query:>16} {matches:>9} {scan_s * 1e3:>11.1f} ms {index_s * 1e3:>12.3f} ms {prefix_s * 1e3:>9.3f} ms")
@@ -0,0 +1,49 @@
+"""
+Pair selection cost: select_movie_pair (rebuilds weights per pair) vs. the persistent PairSampler,
+plus the rating-window strategy backed by RatingIndex.
+
+Run from the repository root:
+    python -m benchmarks.bench_selection
+"""
+import time
+import numpy as np
+import pandas as pd
+from selection_logic import select_movie_pair, PairSampler, RatingIndex
+
+SIZES = [1_000, 100_000, 1_000_000]
+
+
+def make_frames(n, seed=0):
+    rng = np.random.default_rng(seed)
+    titles = [f"Movie {i}" for i in range(n)]
+    movies_df = pd.DataFrame({'Title': titles, 'Rating': rng.normal(1200, 150, n).astype(int)}, index=titles)
+    meta_df = pd.DataFrame({'Comparisons': rng.integers(0, 60, n)}, index=titles)
+    return movies_df, meta_df
+
+
+def per_call(fn, reps):
+    start = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - start) / reps
+
+
+if __name__ == "__main__":
+    print(f"{'titles':>10} {'select_movie_pair':>18} {'sampler pair':>14} {'sampler update':>16} {'sampler build':>15}"
+          f" {'window pair':>13} {'index update':>14}")
+    for n in SIZES:
+        movies_df, meta_df = make_frames(n)
+        start = time.perf_counter()
+        sampler = PairSampler.from_frames(movies_df, meta_df)
+        build_s = time.perf_counter() - start
+
+        full_s = per_call(lambda: select_movie_pair(movies_df, meta_df), max(3, 3_000 // (n // 1_000)))
+        pair_s = per_call(sampler.select_pair, 20_000)
+        titles = movies_df.index
+        update_s = per_call(lambda: sampler.update(titles[np.random.randint(n)], np.random.randint(60)), 20_000)
+
+        rating_index = RatingIndex.from_frame(movies_df)
+        window_s = per_call(lambda: select_movie_pair(movies_df, meta_df, sampler, rating_index, 'rating_window'), 20_000)
+        index_update_s = per_call(lambda: rating_index.update(titles[np.random.randint(n)], np.random.randint(800, 1600)), 2_000)
+        print(f"{n:>10} {full_s * 1e3:>15.3f} ms {pair_s * 1e6:>11.2f} us {update_s * 1e6:>13.2f} us {build_s * 1e3:>12.1f} ms"
+              f" {window_s * 1e6:>10.2f} us {index_update_s * 1e6:>11.2f} us")
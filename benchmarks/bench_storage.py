@@ -0,0 +1,57 @@
+"""
+Per-vote write cost of the storage backends as the catalog grows.
+
+Run from the repository root:
+    python -m benchmarks.bench_storage
+"""
+import os
+import random
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from storage import CsvStorage, SqliteStorage, META_COLS
+
+SIZES = [1_000, 10_000, 100_000, 200_000]
+VOTES = {'csv': 5, 'sqlite': 200}
+
+
+def make_catalog(n, seed=0):
+    rng = np.random.default_rng(seed)
+    titles = [f"Movie {i}" for i in range(n)]
+    movies_df = pd.DataFrame({
+        'Title': titles,
+        'Genres': 'Drama|Comedy',
+        'PosterURL': '',
+        'Rating': rng.integers(1000, 1400, n),
+    }).set_index('Title', drop=False)
+    meta_df = pd.DataFrame(0, index=titles, columns=META_COLS)
+    return movies_df, meta_df
+
+
+def time_votes(storage, movies_df, meta_df, votes):
+    titles = movies_df.index
+    start = time.perf_counter()
+    for _ in range(votes):
+        title_a, title_b = random.sample(range(len(titles)), 2)
+        title_a, title_b = titles[title_a], titles[title_b]
+        movies_df.at[title_a, 'Rating'] += 10
+        movies_df.at[title_b, 'Rating'] -= 10
+        meta_df.at[title_a, 'Comparisons'] += 1
+        meta_df.at[title_b, 'Comparisons'] += 1
+        storage.save_vote(movies_df, meta_df, [title_a, title_b])
+    return (time.perf_counter() - start) / votes
+
+
+if __name__ == "__main__":
+    print(f"{'titles':>10} {'csv ms/vote':>14} {'sqlite ms/vote':>16}")
+    for n in SIZES:
+        movies_df, meta_df = make_catalog(n)
+        with tempfile.TemporaryDirectory() as tmp:
+            csv = CsvStorage(os.path.join(tmp, 'movies.csv'), os.path.join(tmp, 'meta.csv'))
+            csv.save_all(movies_df, meta_df)
+            sqlite = SqliteStorage(os.path.join(tmp, 'movie_elo.db'), csv.movies_csv, csv.meta_csv)
+            sqlite.import_csv()
+            csv_ms = time_votes(csv, movies_df, meta_df, VOTES['csv']) * 1000
+            sqlite_ms = time_votes(sqlite, movies_df, meta_df, VOTES['sqlite']) * 1000
+        print(f"{n:>10} {csv_ms:>14.2f} {sqlite_ms:>16.3f}")
@@ -0,0 +1,94 @@
+"""
+A movie's rating trajectory: the trajectory index vs. replaying and scanning the whole log.
+
+Builds the index of a synthetic fight log (and reloads it, as at the next start), then times
+trajectory(title) for movies with few and many fights against the only alternative without
+the index: replaying the log with per-fight ratings and picking the movie's rows. Also times
+the per-vote upkeep (log_fight plus the index appending its record).
+
+Run from the repository root:
+    python -m benchmarks.bench_trajectory [--sizes 1k 100k]
+"""
+import argparse
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import numpy as np
+import config
+from data_handler import log_fight
+from replay import load_fight_log, replay_elo
+from trajectory import TrajectoryIndex
+from benchmarks.synthetic import dataset
+from benchmarks.suite import SIZES
+
+
+def full_scan(fights_csv, title):
+    titles, id_a, id_b, score_a = load_fight_log(fights_csv)
+    result = replay_elo(id_a, id_b, score_a, len(titles), per_fight=True)
+    i = titles.index(title)
+    rows = np.flatnonzero((id_a == i) | (id_b == i))
+    return np.where(id_a[rows] == i, result['After A'][rows], result['After B'][rows])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time rating trajectory lookups.")
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['1k', '100k'])
+    parser.add_argument('--votes', type=int, default=200, help="Fights logged to time the index upkeep.")
+    args = parser.parse_args()
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    config.FIGHTS_ARROW_MIRROR = False # The baseline parses the CSV, as without pyarrow
+
+    for size in args.sizes:
+        n_titles, n_fights = SIZES[size]
+        paths = dataset(n_titles, n_fights)
+        with tempfile.TemporaryDirectory() as tmp:
+            fights_csv = os.path.join(tmp, 'head_to_head.csv')
+            shutil.copyfile(paths['fights'], fights_csv)
+            index = TrajectoryIndex(fights_csv)
+            start = time.perf_counter()
+            index.update()
+            build = time.perf_counter() - start
+            start = time.perf_counter()
+            index = TrajectoryIndex(fights_csv) # Registered in place of the first one
+            index.update()
+            load = time.perf_counter() - start
+            disk = sum(os.path.getsize(os.path.join(index.directory, name)) for name in os.listdir(index.directory))
+            print(f"[{size}] {n_titles:,} titles, {n_fights:,} fights: index built in {build:.1f} s, "
+                  f"loaded in {load:.2f} s, {disk / 2**20:.0f} MB on disk")
+
+            counts = index.counts
+            movies = {'fewest fights': int(np.argmin(counts)), 'median': int(np.argsort(counts)[len(counts) // 2]),
+                      'most fights': int(np.argmax(counts))}
+            print(f"  {'movie':<15} {'fights':>7} {'index':>10} {'full scan':>10}")
+            for label, i in movies.items():
+                title = index.titles[i]
+                lookups = []
+                for _ in range(5):
+                    start = time.perf_counter()
+                    found = index.trajectory(title)
+                    lookups.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                reference = full_scan(fights_csv, title)
+                scan = time.perf_counter() - start
+                assert np.array_equal(found['Rating After'].to_numpy(), reference)
+                print(f"  {label:<15} {len(found):>7} {statistics.median(lookups) * 1e3:>8.2f}ms {scan:>8.2f} s")
+
+            rng = np.random.default_rng(0)
+            titles = index.titles
+            upkeep, plain = [], []
+            for _ in range(args.votes):
+                a, b = rng.choice(len(titles), 2, replace=False)
+                start = time.perf_counter()
+                log_fight(titles[a], titles[b], 'A Slightly Better', 0.75, fights_csv)
+                upkeep.append(time.perf_counter() - start)
+            assert len(index) == n_fights + args.votes
+            index.ready = False # Stops following the log: log_fight alone
+            for _ in range(args.votes):
+                start = time.perf_counter()
+                log_fight(titles[0], titles[1], 'A Slightly Better', 0.75, fights_csv)
+                plain.append(time.perf_counter() - start)
+            print(f"  log_fight: {statistics.median(plain) * 1e3:.2f} ms, with the index following the log: "
+                  f"{statistics.median(upkeep) * 1e3:.2f} ms")
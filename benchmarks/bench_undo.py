@@ -0,0 +1,85 @@
+"""
+Undo / redo of votes vs. the fix they replace (replaying the whole fight log).
+
+Casts votes through a RatingService (SQLite storage, so a commit only writes the changed rows),
+then undoes them one at a time, redoes them and undoes them again, checking that the ratings
+and counts and the fight log come back byte for byte. Per-vote undo / redo times should stay
+flat as the catalog and the log grow; the replay a mis-click needed before grows with the log.
+
+Run from the repository root:
+    python -m benchmarks.bench_undo [--sizes 1k 100k] [--votes 100]
+"""
+import argparse
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import numpy as np
+import config
+from rating_service import RatingService
+from replay import load_fight_log, replay_elo
+from storage import SqliteStorage
+from benchmarks.synthetic import dataset
+from benchmarks.suite import SIZES
+
+
+def timed_calls(fn, n):
+    times = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def full_replay(fights_csv):
+    titles, id_a, id_b, score_a = load_fight_log(fights_csv)
+    return replay_elo(id_a, id_b, score_a, len(titles))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time undo / redo of votes.")
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['1k', '100k'])
+    parser.add_argument('--votes', type=int, default=config.UNDO_DEPTH, help="Votes cast, then undone / redone.")
+    args = parser.parse_args()
+    config.UNDO_DEPTH = max(config.UNDO_DEPTH, args.votes)
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    config.CHECKPOINT_EVERY = 0 # Keep the background checkpoint sync out of the timings
+    config.FIGHTS_ARROW_MIRROR = False
+
+    print(f"{'size':>6} {'titles':>10} {'fights':>11} {'vote':>9} {'undo':>9} {'redo':>9} {'full replay':>12}")
+    for size in args.sizes:
+        n_titles, n_fights = SIZES[size]
+        paths = dataset(n_titles, n_fights)
+        with tempfile.TemporaryDirectory() as tmp:
+            fights_csv = os.path.join(tmp, 'head_to_head.csv')
+            movies_csv, meta_csv = os.path.join(tmp, 'movies.csv'), os.path.join(tmp, 'meta.csv')
+            shutil.copyfile(paths['fights'], fights_csv)
+            shutil.copyfile(paths['movies'], movies_csv)
+            shutil.copyfile(paths['meta'], meta_csv)
+            service = RatingService(SqliteStorage(os.path.join(tmp, 'elo.db'), movies_csv, meta_csv), fights_csv=fights_csv)
+            ratings, meta_df = service.movies_df['Rating'].copy(), service.meta_df.copy()
+            with open(fights_csv, 'rb') as f:
+                log = f.read()
+
+            rng = np.random.default_rng(0)
+            titles = service.store.titles
+            def vote():
+                a, b = rng.choice(len(titles), 2, replace=False)
+                service.vote(titles[a], titles[b], *list(config.SCORE_MAP.items())[rng.integers(len(config.SCORE_MAP))])
+            vote_s = timed_calls(vote, args.votes)
+            undo_s = timed_calls(lambda: service.undo(), args.votes)
+            redo_s = timed_calls(lambda: service.redo(), args.votes)
+            assert len(service.undo(args.votes)) == args.votes
+            with open(fights_csv, 'rb') as f:
+                assert f.read() == log
+            assert service.movies_df['Rating'].equals(ratings) and service.meta_df.equals(meta_df)
+            service.close()
+
+            start = time.perf_counter()
+            full_replay(fights_csv)
+            replay_s = time.perf_counter() - start
+            print(f"{size:>6} {n_titles:>10,} {n_fights:>11,} {vote_s * 1e3:>7.2f}ms {undo_s * 1e3:>7.2f}ms "
+                  f"{redo_s * 1e3:>7.2f}ms {replay_s:>10.2f} s")
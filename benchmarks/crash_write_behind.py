@@ -0,0 +1,113 @@
+"""
+Crash-injection test for write-behind mode.
+
+Each round starts a child process running a write-behind RatingService with several voters that
+vote as fast as they can and report every acknowledged vote, then kills it with SIGKILL at a random
+moment (mid-batch, mid-journal-append or mid-flush). The parent then loads the storage the way the
+app does, which replays unflushed journal entries, and checks that:
+  - every acknowledged vote is in the tables (no lost votes),
+  - the fight log holds exactly the votes in the tables,
+  - replaying the fight log from scratch reproduces the stored ratings and W/L/D counts.
+
+Run from the repository root (POSIX only):
+    python -m benchmarks.crash_write_behind [--rounds 20] [--titles 500] [--backend csv]
+"""
+import argparse
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import pandas as pd
+import config
+from rating_service import RatingService
+from replay import replay_fights
+from benchmarks.bench_rating_service import write_catalog, make_storage
+
+VOTERS = 4
+
+
+def paths(directory):
+    """Catalog, metadata and fight log files created by write_catalog."""
+    return tuple(os.path.join(directory, name) for name in ('movies.csv', 'meta.csv', 'fights.csv'))
+
+
+def child(directory, backend):
+    """Votes until killed, printing one line per acknowledged (journaled) vote."""
+    movies_csv, meta_csv, fights_csv = paths(directory)
+    service = RatingService(make_storage(backend, directory, movies_csv, meta_csv, write_behind=True), fights_csv=fights_csv,
+                            write_behind=True, flush_votes=random.randint(5, 100), flush_seconds=random.uniform(0.01, 0.2))
+    lock = threading.Lock()
+    outcomes = list(config.SCORE_MAP)
+
+    def voter():
+        rng = random.Random()
+        while True:
+            title_a, title_b = service.select_pair()
+            outcome = rng.choice(outcomes)
+            service.vote(title_a, title_b, outcome, config.SCORE_MAP[outcome])
+            with lock:
+                sys.stdout.write('ack\n')
+                sys.stdout.flush()
+
+    for _ in range(VOTERS):
+        threading.Thread(target=voter, daemon=True).start()
+    while True:
+        time.sleep(1)
+
+
+def check(directory, backend):
+    """Recovers the storage and returns (votes in tables, problems)."""
+    movies_csv, meta_csv, fights_csv = paths(directory)
+    storage = make_storage(backend, directory, movies_csv, meta_csv, write_behind=True)
+    movies_df = storage.load_movies()
+    meta_df = storage.load_metadata(movie_titles=movies_df.index.tolist())
+    problems = []
+    votes = int(meta_df['Comparisons'].sum()) // 2
+    logged = len(pd.read_csv(fights_csv)) if os.path.exists(fights_csv) else 0
+    if logged != votes:
+        problems.append(f"fight log has {logged} votes, tables have {votes}")
+    ratings, replay_meta = replay_fights(fights_csv, movie_titles=movies_df.index.tolist())
+    if not (ratings == movies_df['Rating']).all():
+        problems.append(f"{int((ratings != movies_df['Rating']).sum())} ratings differ from a fight log replay")
+    stats = ['Comparisons', 'Wins', 'Losses', 'Draws']
+    if not (replay_meta[stats].reindex(meta_df.index).astype(int) == meta_df[stats].astype(int)).all().all():
+        problems.append("W/L/D counts differ from a fight log replay")
+    return votes, problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kill a write-behind RatingService mid-vote and verify recovery.")
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--titles', type=int, default=500)
+    parser.add_argument('--backend', choices=['csv', 'sqlite'], default='csv')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.backend)
+
+    lost_total = 0
+    acked_total = 0
+    failed = 0
+    with tempfile.TemporaryDirectory() as directory:
+        write_catalog(directory, args.titles)
+        for round_no in range(1, args.rounds + 1):
+            proc = subprocess.Popen([sys.executable, '-m', 'benchmarks.crash_write_behind', '--child', directory,
+                                     '--backend', args.backend], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            acked = 0
+            threading.Timer(random.uniform(1.0, 3.0), proc.send_signal, (signal.SIGKILL,)).start()
+            for line in proc.stdout:
+                acked += line == 'ack\n'
+            proc.wait()
+            acked_total += acked
+            votes, problems = check(directory, args.backend)
+            lost = max(acked_total - votes, 0)
+            lost_total += lost
+            failed += bool(problems or lost)
+            print(f"round {round_no:>3}: {acked:>5} acknowledged this round, {acked_total:>6} total, {votes:>6} recovered, "
+                  f"lost {lost}" + (f", PROBLEMS: {'; '.join(problems)}" if problems else ''))
+    print(f"\n{args.rounds} crashes, {acked_total} acknowledged votes, {lost_total} lost, {failed} rounds with problems")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,182 @@
+"""
+Headless benchmark suite over synthetic data sets, with JSON results for comparing commits.
+
+Times the vote path piece by piece (loading, pair selection, the ELO update, saving, fight
+logging) plus the dashboard aggregation and a full fight-log replay, at each requested size.
+Data sets come from benchmarks.synthetic and are cached between runs.
+
+Run from the repository root:
+    python -m benchmarks.suite --sizes 1k 100k --output before.json
+    python -m benchmarks.suite --sizes 1k 100k --output after.json --compare before.json
+
+With --compare, cases whose median got slower than the baseline by more than --threshold
+are reported as regressions and the exit code is 1.
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from data_handler import load_movie_data, load_movie_metadata, save_movie_data, save_movie_metadata, log_fight
+from elo_logic import get_k_factor, update_elo, record_result
+from selection_logic import select_movie_pair, PairSampler
+from rating_store import RatingStore
+from aggregates import DashboardAggregates, compute_rankings, compute_genre_stats
+from replay import replay_fights
+from benchmarks.synthetic import dataset, DEFAULT_DATA_DIR
+
+# name -> (titles, fights)
+SIZES = {
+    '1k': (1_000, 10_000),
+    '100k': (100_000, 1_000_000),
+    '1m': (1_000_000, 10_000_000),
+}
+
+
+def measure(fn, repeat, number=1):
+    """Seconds per call of fn() for `repeat` rounds of `number` calls each."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return {'median': statistics.median(times), 'min': min(times), 'repeat': repeat, 'number': number}
+
+
+def run_size(paths, n_titles, repeat, seed=0):
+    """Runs every case against one data set. Returns {case: timing}."""
+    rng = random.Random(seed)
+    results = {}
+    slow_repeat = max(repeat // max(n_titles // 100_000, 1), 1) # Whole-table cases: fewer rounds for big catalogs
+
+    # --- Loading ---
+    results['load_movie_data'] = measure(lambda: load_movie_data(paths['movies']), slow_repeat)
+    movies_df = load_movie_data(paths['movies'])
+    titles = movies_df.index.tolist()
+    results['load_movie_metadata'] = measure(lambda: load_movie_metadata(paths['meta'], titles), slow_repeat)
+    meta_df = load_movie_metadata(paths['meta'], titles)
+
+    # --- Pair selection ---
+    results['select_movie_pair'] = measure(lambda: select_movie_pair(movies_df, meta_df), slow_repeat, 5)
+    sampler = PairSampler.from_frames(movies_df, meta_df)
+    results['select_movie_pair[sampler]'] = measure(lambda: select_movie_pair(movies_df, meta_df, sampler=sampler), repeat, 1000)
+
+    # --- Rating update ---
+    pairs = itertools.cycle([tuple(rng.sample(range(len(titles)), 2)) for _ in range(1000)])
+
+    def elo_update():
+        # As the app did per vote before the RatingStore: K and ratings looked up by title
+        a, b = next(pairs)
+        title_a, title_b = titles[a], titles[b]
+        k = get_k_factor(meta_df.at[title_a, 'Comparisons'], meta_df.at[title_b, 'Comparisons'])
+        update_elo(movies_df.at[title_a, 'Rating'], movies_df.at[title_b, 'Rating'], 0.75, k)
+    results['update_elo'] = measure(elo_update, repeat, 1000)
+    store = RatingStore.from_frames(movies_df, meta_df)
+    results['record_result'] = measure(lambda: record_result(store, *next(pairs), 0.75), repeat, 1000)
+
+    # --- Saving / logging (to scratch copies) ---
+    with tempfile.TemporaryDirectory() as scratch:
+        movies_csv = os.path.join(scratch, 'movies.csv')
+        meta_csv = os.path.join(scratch, 'meta.csv')
+        fights_csv = os.path.join(scratch, 'fights.csv')
+        results['save_movie_data'] = measure(lambda: save_movie_data(movies_df, movies_csv), slow_repeat)
+        results['save_movie_metadata'] = measure(lambda: save_movie_metadata(meta_df, meta_csv), slow_repeat)
+        # Appending costs the same whatever the log's size, so the scratch log starts empty
+        results['log_fight'] = measure(lambda: log_fight(titles[0], titles[1], 'A Slightly Better', 0.75, fights_csv), repeat, 100)
+
+    # --- Dashboard ---
+    def from_scratch():
+        compute_rankings(movies_df, meta_df)
+        compute_genre_stats(movies_df)
+    results['dashboard_from_scratch'] = measure(from_scratch, slow_repeat)
+    results['dashboard_build'] = measure(lambda: DashboardAggregates.from_frames(movies_df, meta_df), slow_repeat)
+    aggregates = DashboardAggregates.from_frames(movies_df, meta_df)
+
+    def vote_and_refresh():
+        a, b = next(pairs)
+        record_result(aggregates.store, a, b, 0.75)
+        aggregates.update([a, b])
+        aggregates.ranked_view()
+        aggregates.genre_stats()
+    results['dashboard_vote_refresh'] = measure(vote_and_refresh, slow_repeat)
+
+    # --- Fight log ---
+    results['replay_fights'] = measure(lambda: replay_fights(paths['fights'], movie_titles=titles), 1)
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'commit': commit or None, 'python': platform.python_version(), 'pandas': pd.__version__,
+            'numpy': np.__version__, 'machine': platform.machine(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compare(results, baseline, threshold):
+    """Prints median ratios against a baseline. Returns the list of regressed 'size/case' keys."""
+    regressions = []
+    print(f"\n{'case':<40} {'baseline':>12} {'now':>12} {'ratio':>7}")
+    for size, cases in results.items():
+        for case, timing in cases.items():
+            old = baseline.get(size, {}).get(case)
+            if not old:
+                continue
+            ratio = timing['median'] / old['median'] if old['median'] else float('inf')
+            flag = ''
+            if ratio > 1 + threshold:
+                flag = '  REGRESSION'
+                regressions.append(f"{size}/{case}")
+            print(f"{size + '/' + case:<40} {old['median'] * 1e3:>9.3f} ms {timing['median'] * 1e3:>9.3f} ms {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the benchmark suite over synthetic data sets.")
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['1k', '100k'])
+    parser.add_argument('--fights', type=int, help="Override the fight count of every size.")
+    parser.add_argument('--repeat', type=int, default=5, help="Rounds per case (reduced for catalogs over 100k titles).")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="Where generated data sets are cached.")
+    parser.add_argument('--output', help="Write results as JSON to this file.")
+    parser.add_argument('--compare', help="Baseline JSON from an earlier run.")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed slowdown before flagging (0.25 = 25%%).")
+    args = parser.parse_args()
+    logging.getLogger('streamlit').setLevel(logging.ERROR) # st.* calls outside `streamlit run` only warn
+
+    results = {}
+    sizes = {}
+    for size in args.sizes:
+        n_titles, n_fights = SIZES[size]
+        n_fights = args.fights if args.fights is not None else n_fights
+        sizes[size] = {'titles': n_titles, 'fights': n_fights}
+        start = time.perf_counter()
+        paths = dataset(n_titles, n_fights, args.seed, args.data_dir)
+        print(f"[{size}] {n_titles:,} titles, {n_fights:,} fights (data ready in {time.perf_counter() - start:.1f} s)")
+        results[size] = run_size(paths, n_titles, args.repeat, args.seed)
+        for case, timing in results[size].items():
+            print(f"  {case:<32} {timing['median'] * 1e3:>10.3f} ms")
+
+    report = {'environment': environment(), 'sizes': sizes, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)['results'], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions: {', '.join(regressions)}")
+            sys.exit(1)
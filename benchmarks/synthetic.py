@@ -0,0 +1,123 @@
+"""
+Reproducible synthetic data in the app's CSV layout: movies_with_posters.csv, movie_metadata.csv
+and head_to_head.csv.
+
+Fights come from hidden movie strengths (Bradley-Terry odds, mapped onto the SCORE_MAP slider
+outcomes), and the catalog's ratings and W/L/D counts are the ELO replay of that fight log, so
+the three files are consistent with each other. Everything is derived from the seed.
+
+Generate a data set by hand (prints the directory):
+    python -m benchmarks.synthetic --titles 100000 --fights 1000000
+"""
+import argparse
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from config import SCORE_MAP
+from replay import replay_elo
+
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), 'movie_elo_bench')
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Drama', 'Fantasy', 'Horror', 'Romance', 'Sci-Fi', 'Thriller']
+FIGHT_CHUNK = 1_000_000 # Fights generated and written per chunk, bounds memory for 10M-fight logs
+
+MOVIES_FILE = 'movies_with_posters.csv'
+META_FILE = 'movie_metadata.csv'
+FIGHTS_FILE = 'head_to_head.csv'
+
+
+def movie_titles(n_titles):
+    return [f"Movie {i}" for i in range(n_titles)]
+
+
+def fight_outcomes(rng, strength, a, b):
+    """Slider outcome index per fight (0 = A Much Better ... 4 = B Much Better)."""
+    p_a = 1.0 / (1.0 + np.exp(strength[b] - strength[a]))
+    # Clear preferences become "Much Better", close calls "Slightly Better" or a tie
+    margin = rng.random(len(a)) - (1.0 - p_a)
+    return np.select([margin > 0.35, margin > 0.05, margin > -0.05, margin > -0.35], [0, 1, 2, 3], 4)
+
+
+def write_fight_log(path, n_fights, n_titles, seed=0):
+    """
+    Writes head_to_head.csv in chunks.
+
+    Returns:
+        tuple: (strength, id_a, id_b, score_a) - the true strength per movie id and the
+               fights as arrays (for computing the matching ratings and metadata).
+    """
+    rng = np.random.default_rng(seed)
+    strength = rng.normal(0, 1, n_titles)
+    titles = np.array(movie_titles(n_titles), dtype=object)
+    outcomes = np.array(list(SCORE_MAP))
+    scores = np.array(list(SCORE_MAP.values()))
+    ids_a, ids_b, score_a = [], [], []
+    with open(path, 'w', newline='') as f:
+        f.write('Movie A,Movie B,Outcome,Score A\n')
+        for start in range(0, n_fights, FIGHT_CHUNK):
+            size = min(FIGHT_CHUNK, n_fights - start)
+            a = rng.integers(0, n_titles, size).astype(np.int32)
+            b = ((a + rng.integers(1, n_titles, size)) % n_titles).astype(np.int32)
+            picks = fight_outcomes(rng, strength, a, b)
+            pd.DataFrame({'Movie A': titles[a], 'Movie B': titles[b], 'Outcome': outcomes[picks],
+                          'Score A': scores[picks]}).to_csv(f, header=False, index=False)
+            ids_a.append(a)
+            ids_b.append(b)
+            score_a.append(scores[picks])
+    if not ids_a:
+        return strength, np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0)
+    return strength, np.concatenate(ids_a), np.concatenate(ids_b), np.concatenate(score_a)
+
+
+def generate(directory, n_titles, n_fights, seed=0):
+    """Writes the three CSVs into `directory`. Returns their paths (see dataset())."""
+    os.makedirs(directory, exist_ok=True)
+    paths = data_paths(directory)
+    _, id_a, id_b, score_a = write_fight_log(paths['fights'], n_fights, n_titles, seed)
+    state = replay_elo(id_a, id_b, score_a, n_titles)
+    rng = np.random.default_rng(seed + 1)
+    titles = movie_titles(n_titles)
+    genres = np.array(GENRES)
+    pd.DataFrame({
+        'Title': titles,
+        'Genres': ['|'.join(genres[rng.choice(len(GENRES), rng.integers(1, 4), replace=False)]) for _ in range(n_titles)],
+        'PosterURL': [f"https://image.tmdb.org/t/p/w500/synthetic{i}.jpg" for i in range(n_titles)],
+        'Rating': state['Rating'],
+    }).to_csv(paths['movies'], index=False)
+    pd.DataFrame({col: state[col] for col in ['Comparisons', 'Wins', 'Losses', 'Draws']},
+                 index=pd.Index(titles, name='Title')).to_csv(paths['meta'])
+    return paths
+
+
+def data_paths(directory):
+    return {'movies': os.path.join(directory, MOVIES_FILE), 'meta': os.path.join(directory, META_FILE),
+            'fights': os.path.join(directory, FIGHTS_FILE)}
+
+
+def dataset(n_titles, n_fights, seed=0, data_dir=DEFAULT_DATA_DIR):
+    """
+    Paths of a synthetic data set, generating it on first use.
+
+    Data sets are cached under data_dir by (titles, fights, seed); a marker file written
+    last means a generation interrupted halfway is redone rather than reused.
+
+    Returns:
+        dict: 'movies', 'meta', 'fights' -> CSV paths.
+    """
+    directory = os.path.join(data_dir, f"titles{n_titles}_fights{n_fights}_seed{seed}")
+    marker = os.path.join(directory, '.complete')
+    if not os.path.exists(marker):
+        generate(directory, n_titles, n_fights, seed)
+        open(marker, 'w').close()
+    return data_paths(directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic catalog, metadata and fight log.")
+    parser.add_argument('--titles', type=int, default=100_000)
+    parser.add_argument('--fights', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    args = parser.parse_args()
+    paths = dataset(args.titles, args.fights, args.seed, args.data_dir)
+    print(os.path.dirname(paths['movies']))
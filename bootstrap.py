@@ -0,0 +1,247 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+import config
+from columnar import log_check
+from replay import load_fight_log, replay_elo
+
+# Bootstrap intervals for the rankings.
+#
+# Each replicate draws as many fights as the log holds, with replacement, keeps them in log
+# order (the ELO replay is sequential) and replays the ratings from DEFAULT_ELO; every catalog
+# movie is then ranked (1 = best, tied ratings share the better rank). A movie's interval is the
+# central BOOTSTRAP_LEVEL share of its ratings / ranks over all replicates: wide for movies with
+# few comparisons, or in a crowded band of the rankings.
+#
+# Replicates are spread over a process pool (the replay is a pure-Python loop, so threads would
+# take turns on the GIL). The log's id and score arrays are put in shared memory once; workers
+# map them instead of unpickling a copy per task, and write each replicate's ratings and ranks
+# straight into shared result matrices (8 bytes per movie and replicate). Replicate r always
+# draws from the random stream seeded with (seed, r), so results do not depend on the pool size.
+#
+# Results are cached next to the log (head_to_head.bootstrap.npz) with the log's length and a
+# CRC of the bytes before it (columnar.log_check), like the other derived files. They stay valid
+# while the log still starts with those bytes; votes logged since only make them slightly dated.
+
+COLUMNS = ['Rating Low', 'Rating High', 'Rank Best', 'Rank Worst']
+_BLOCK_MOVIES = 65536 # Movies per np.percentile call (bounds its temporary copy)
+_POOL_MIN_FIGHTS = 2_000_000 # Smaller jobs (replicates x fights) run in this process: starting a worker takes ~0.3 s
+
+
+def bootstrap_path(fights_csv):
+    """The interval cache of a fight log (head_to_head.bootstrap.npz next to head_to_head.csv)."""
+    return f"{os.path.splitext(fights_csv)[0]}.bootstrap.npz"
+
+
+# --- Replicates (run in the pool's worker processes) ---
+_shared = {} # Arrays of the current job: views of shared memory blocks in a worker
+_blocks = [] # This worker's open SharedMemory handles (kept alive with the views)
+
+
+def _attach(specs, log_to_movie):
+    """Pool initializer: maps the job's shared arrays, given as {key: (block name, dtype, shape)}."""
+    for key, (name, dtype, shape) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        _blocks.append(block)
+        _shared[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    _shared['log_to_movie'] = log_to_movie
+
+
+def _ranks(ratings):
+    """1-based ranks, highest rating first; tied ratings share the better rank."""
+    return len(ratings) - np.searchsorted(np.sort(ratings), ratings, side='right') + 1
+
+
+def _run_replicates(start, stop, seed):
+    """Replays replicates [start, stop) into the result matrices. Returns how many ran."""
+    id_a, id_b, score_a = _shared['id_a'], _shared['id_b'], _shared['score_a']
+    log_to_movie = _shared['log_to_movie']
+    known = log_to_movie >= 0
+    n_fights, n_movies = len(id_a), _shared['ratings'].shape[1]
+    for r in range(start, stop):
+        rows = np.sort(np.random.default_rng([seed, r]).integers(0, n_fights, n_fights))
+        state = replay_elo(id_a[rows], id_b[rows], score_a[rows], len(log_to_movie))
+        ratings = np.full(n_movies, config.DEFAULT_ELO, dtype=np.int64)
+        ratings[log_to_movie[known]] = state['Rating'][known]
+        _shared['ratings'][r] = ratings
+        _shared['ranks'][r] = _ranks(ratings)
+    return stop - start
+
+
+def _share(array, blocks):
+    """Copies an array into a new shared memory block. Returns (spec for _attach, view)."""
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    blocks.append(block)
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    view[...] = array
+    return (block.name, array.dtype.str, array.shape), view
+
+
+def _intervals(matrix, level):
+    """Per-column central `level` interval of a replicates x movies matrix, as two int arrays."""
+    q = [50 * (1 - level), 50 * (1 + level)]
+    low, high = np.empty(matrix.shape[1], dtype=np.int64), np.empty(matrix.shape[1], dtype=np.int64)
+    for start in range(0, matrix.shape[1], _BLOCK_MOVIES):
+        block = np.percentile(matrix[:, start:start + _BLOCK_MOVIES], q, axis=0)
+        low[start:start + _BLOCK_MOVIES] = np.floor(block[0])
+        high[start:start + _BLOCK_MOVIES] = np.ceil(block[1])
+    return low, high
+
+
+def bootstrap_intervals(fights_csv=config.FIGHTS_CSV, movie_titles=None, replicates=config.BOOTSTRAP_REPLICATES,
+                        level=config.BOOTSTRAP_LEVEL, workers=config.BOOTSTRAP_WORKERS, seed=0, fights=None):
+    """
+    Bootstrap rating and rank intervals of every movie (see module comment).
+
+    Args:
+        fights_csv (str): Path to head_to_head.csv.
+        movie_titles (list, optional): Movies to rank (the catalog); defaults to the log's titles.
+            Fights of other titles are still replayed, as they were when the votes were cast.
+        replicates (int): Bootstrap replicates.
+        level (float): Interval coverage, e.g. 0.95.
+        workers (int, optional): Processes in the pool (None: one per CPU core). With 1, or
+            for small jobs, the replicates run in this process.
+        seed (int): Seed of the resampling.
+        fights (tuple, optional): The log as load_fight_log returns it, if already loaded.
+
+    Returns:
+        pd.DataFrame: 'Rating Low', 'Rating High', 'Rank Best', 'Rank Worst' indexed by Title.
+    """
+    titles, id_a, id_b, score_a = fights if fights is not None else load_fight_log(fights_csv)
+    if len(id_a) == 0:
+        raise ValueError("The fight log has no fights to resample.")
+    movie_titles = list(titles) if movie_titles is None else list(movie_titles)
+    movie_ids = {title: i for i, title in enumerate(movie_titles)}
+    log_to_movie = np.array([movie_ids.get(title, -1) for title in titles], dtype=np.int64)
+    workers = workers or os.cpu_count() or 1
+    if replicates * len(id_a) < _POOL_MIN_FIGHTS:
+        workers = 1
+    arrays = {'id_a': id_a, 'id_b': id_b, 'score_a': score_a,
+              'ratings': np.empty((replicates, len(movie_titles)), dtype=np.int32),
+              'ranks': np.empty((replicates, len(movie_titles)), dtype=np.int32)}
+    blocks, views = [], {}
+    try:
+        if workers == 1:
+            _shared.update(arrays, log_to_movie=log_to_movie)
+            _run_replicates(0, replicates, seed)
+            results = {key: arrays[key] for key in ('ratings', 'ranks')}
+        else:
+            specs = {}
+            for key, array in arrays.items():
+                specs[key], views[key] = _share(array, blocks)
+            del arrays
+            # A few tasks per worker, so a slow worker does not hold up the end of the job
+            step = max(1, -(-replicates // (4 * workers)))
+            # spawn: forking a multi-threaded process (the app's server) can deadlock the child
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_attach, initargs=(specs, log_to_movie)) as pool:
+                tasks = [pool.submit(_run_replicates, start, min(start + step, replicates), seed)
+                         for start in range(0, replicates, step)]
+                for task in tasks:
+                    task.result() # Re-raises a worker's error
+            results = {key: views[key] for key in ('ratings', 'ranks')}
+        rating_low, rating_high = _intervals(results['ratings'], level)
+        rank_best, rank_worst = _intervals(results['ranks'], level)
+    finally:
+        # Views of the blocks must be gone before they can be closed
+        _shared.clear()
+        views.clear()
+        results = None
+        for block in blocks:
+            block.close()
+            block.unlink()
+    frame = pd.DataFrame({'Rating Low': rating_low, 'Rating High': rating_high,
+                          'Rank Best': rank_best, 'Rank Worst': rank_worst}, index=pd.Index(movie_titles, name='Title'))
+    return frame
+
+
+class RankIntervals:
+    """
+    The cached bootstrap intervals of a fight log, recomputed in a background thread on request.
+
+    Args:
+        fights_csv (str): Path to head_to_head.csv.
+    """
+
+    def __init__(self, fights_csv=config.FIGHTS_CSV):
+        self.fights_csv = fights_csv
+        self.path = bootstrap_path(fights_csv)
+        self.frame = None
+        self.info = None # replicates, level, fights, offset, check, time of the cached run
+        self.thread = None
+        self.error = None # Message of the last failed run
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                info = json.loads(str(data['info']))
+                titles = data['titles'].tobytes().decode('utf-8').split('\0') if len(data['titles']) else []
+                frame = pd.DataFrame({col: data[col] for col in COLUMNS}, index=pd.Index(titles, name='Title'))
+        except Exception as e:
+            print(f"Ignoring unreadable bootstrap intervals '{self.path}': {e}")
+            return
+        self.frame, self.info = frame, info
+
+    def _valid(self):
+        try:
+            with open(self.fights_csv, 'rb') as f:
+                size = f.seek(0, os.SEEK_END)
+                return self.info['offset'] <= size and log_check(f, self.info['offset']) == self.info['check']
+        except OSError:
+            return False
+
+    def current(self):
+        """The cached intervals (see bootstrap_intervals), or None if there are none for the current log."""
+        if self.frame is not None and not self._valid(): # The log was cut or replaced since
+            self.frame, self.info = None, None
+        return self.frame
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, movie_titles, **kwargs):
+        """
+        Recomputes the intervals over movie_titles in the background (kwargs: see
+        bootstrap_intervals). Returns False if a run is already in progress.
+        """
+        if self.running:
+            return False
+        self.error = None
+        # Daemon: the job only reads the log and replaces the cache file atomically, so stopping mid-run loses nothing
+        self.thread = threading.Thread(target=self.compute, args=(list(movie_titles),), kwargs=kwargs,
+                                       name='rank-intervals', daemon=True)
+        self.thread.start()
+        return True
+
+    def compute(self, movie_titles, replicates=config.BOOTSTRAP_REPLICATES, level=config.BOOTSTRAP_LEVEL, **kwargs):
+        """Computes the intervals over movie_titles and caches them. Returns the intervals frame (None on failure)."""
+        try:
+            with open(self.fights_csv, 'rb') as f:
+                offset = f.seek(0, os.SEEK_END)
+                check = log_check(f, offset)
+            fights = load_fight_log(self.fights_csv)
+            frame = bootstrap_intervals(self.fights_csv, movie_titles, replicates=replicates, level=level,
+                                        fights=fights, **kwargs)
+            info = {'replicates': replicates, 'level': level, 'fights': len(fights[1]), 'offset': offset,
+                    'check': check, 'time': time.time()}
+            tmp_path = self.path + '.tmp.npz'
+            np.savez(tmp_path, info=json.dumps(info),
+                     titles=np.frombuffer('\0'.join(frame.index).encode('utf-8'), dtype=np.uint8),
+                     **{col: frame[col].to_numpy() for col in COLUMNS})
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error computing bootstrap intervals: {e}")
+            self.error = str(e)
+            return None
+        self.frame, self.info = frame, info
+        return frame
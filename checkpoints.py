@@ -0,0 +1,253 @@
+import glob
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+import config
+from columnar import log_check
+from replay import replay_elo, read_fight_rows, META_COLS
+
+# Rating checkpoints along the fight log, for "as of fight #k" restores without a full replay.
+#
+# Every CHECKPOINT_EVERY fights (rows of head_to_head.csv), the ratings and W/L/D counts that a
+# replay of the log up to that row produces are saved next to the log (head_to_head.checkpoints/),
+# together with the row's byte offset in the log. Movie ids are assigned in order of first appearance in the log
+# (as in replay.load_fight_log), so ids never change as the log grows. Every
+# CHECKPOINT_FULL_EVERY-th checkpoint holds every movie; the ones in between only hold the
+# movies changed since the previous checkpoint (plus titles first seen since). Restoring fight k
+# loads the last full checkpoint before k, applies fewer than CHECKPOINT_FULL_EVERY deltas and
+# replays fewer than CHECKPOINT_EVERY fights, whatever the length of the log.
+#
+# The log rows carry no vote times. A checkpoint is "dated" (its time bounds the vote times of its
+# fights) only when it is written as the log grows past it: by a sync(dated=True) (the rating
+# service's syncs after logging votes), and only if fewer than CHECKPOINT_EVERY rows follow it.
+# Checkpoints written in bulk over an existing log (the first sync, a rebuild, utils scripts) are
+# undated: their fights may have been voted long before.
+#
+# A checkpoint is only valid while the log still starts with the bytes it was built from
+# (length + CRC of the bytes before its offset, columnar.log_check) and was written with
+# the current CHECKPOINT_EVERY; checkpoints of a cut or rewritten log, or of another interval,
+# are deleted and rebuilt by the next sync(). Whether a checkpoint is full is read from its file.
+
+STATE_COLS = ['Rating'] + META_COLS
+
+
+def checkpoint_dir(fights_csv):
+    return f"{os.path.splitext(fights_csv)[0]}.checkpoints"
+
+
+def _pack_titles(titles):
+    return np.frombuffer('\0'.join(titles).encode('utf-8'), dtype=np.uint8)
+
+
+def _unpack_titles(blob):
+    return blob.tobytes().decode('utf-8').split('\0') if len(blob) else []
+
+
+class RatingState:
+    """Replayed ratings and W/L/D counts after the first `fights` rows of the log (ids by first appearance)."""
+
+    def __init__(self):
+        self.titles = []
+        self.ids = {}
+        self.columns = {col: np.empty(0, dtype=np.int64) for col in STATE_COLS}
+        self.fights = 0 # Log rows covered
+        self.offset = 0 # Byte offset in the log after those rows (0: nothing read yet)
+
+    def _grow(self, n):
+        missing = n - len(self.columns['Rating'])
+        if missing > 0:
+            for col in STATE_COLS:
+                fill = config.DEFAULT_ELO if col == 'Rating' else 0
+                self.columns[col] = np.concatenate([self.columns[col], np.full(missing, fill, dtype=np.int64)])
+
+    def add_titles(self, titles):
+        for title in titles:
+            self.ids.setdefault(title, len(self.titles))
+            if len(self.ids) > len(self.titles):
+                self.titles.append(title)
+        self._grow(len(self.titles))
+
+    def advance(self, chunk):
+        """
+        Replays parsed log rows (see read_fight_rows) on top of the state.
+
+        Returns:
+            np.ndarray: Ids of the movies whose values changed.
+        """
+        chunk = chunk.dropna(subset=['Movie A', 'Movie B']) # Rows replay.load_fight_log skips too
+        codes, uniques = pd.factorize(pd.concat([chunk['Movie A'], chunk['Movie B']], ignore_index=True))
+        self.add_titles(uniques)
+        global_ids = np.array([self.ids[t] for t in uniques], dtype=np.int32)
+        codes = global_ids[codes]
+        id_a, id_b = codes[:len(chunk)], codes[len(chunk):]
+        score_a = pd.to_numeric(chunk['Score A'], errors='coerce').fillna(0.5).to_numpy(dtype=np.float64)
+        result = replay_elo(id_a, id_b, score_a, len(self.titles), initial_ratings=self.columns['Rating'],
+                            initial_comparisons=self.columns['Comparisons'])
+        self.columns['Rating'] = result['Rating']
+        self.columns['Comparisons'] = result['Comparisons']
+        for col in ('Wins', 'Losses', 'Draws'): # replay_elo counts only the replayed fights
+            self.columns[col] = self.columns[col] + result[col]
+        return np.unique(codes)
+
+    def frames(self, movie_titles=None):
+        """(ratings, meta_df) indexed by Title, aligned to movie_titles if given (as replay.replay_fights returns)."""
+        index = pd.Index(self.titles, name='Title')
+        ratings = pd.Series(self.columns['Rating'], index=index, name='Rating')
+        meta_df = pd.DataFrame({col: self.columns[col] for col in META_COLS}, index=index)
+        if movie_titles is not None:
+            ratings = ratings.reindex(movie_titles, fill_value=config.DEFAULT_ELO).astype(int)
+            meta_df = meta_df.reindex(movie_titles, fill_value=0).astype(int)
+            ratings.index.name = meta_df.index.name = 'Title'
+        return ratings, meta_df
+
+
+class Checkpoints:
+    """
+    The checkpoints of one fight log.
+
+    Args:
+        fights_csv (str): The fight log.
+        directory (str, optional): Where its checkpoints are kept (default: next to the log).
+        every (int): Fights between checkpoints.
+        full_every (int): Every full_every-th checkpoint stores all movies.
+    """
+
+    def __init__(self, fights_csv=config.FIGHTS_CSV, directory=None,
+                 every=config.CHECKPOINT_EVERY, full_every=config.CHECKPOINT_FULL_EVERY):
+        self.fights_csv = fights_csv
+        self.directory = directory or checkpoint_dir(fights_csv)
+        self.every = every
+        self.full_every = full_every
+        self.lock = threading.Lock() # One sync at a time (the rating service syncs in the background)
+
+    def _path(self, fights):
+        return os.path.join(self.directory, f"fight_{fights:012d}.npz")
+
+    def _is_full(self, fights):
+        return (fights // self.every - 1) % self.full_every == 0 # The 1st, then every full_every-th
+
+    def _on_disk(self):
+        return sorted(int(os.path.basename(path)[6:-4]) for path in glob.glob(os.path.join(self.directory, 'fight_*.npz')))
+
+    def info(self, fights):
+        """A checkpoint's 'fights', 'offset', 'check', 'time', 'dated', 'full' and 'every' (None if unreadable)."""
+        try:
+            with np.load(self._path(fights)) as data:
+                return {'fights': int(data['fights']), 'offset': int(data['offset']), 'check': int(data['check']),
+                        'time': float(data['time']), 'dated': 'dated' in data.files and bool(data['dated']),
+                        'full': bool(data['full']), 'every': int(data['every']) if 'every' in data.files else None}
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def list(self):
+        """Fight counts of the checkpoints that match the log's current contents, oldest first."""
+        on_disk = self._on_disk()
+        if not on_disk or not os.path.exists(self.fights_csv):
+            return []
+        size = os.path.getsize(self.fights_csv)
+        with open(self.fights_csv, 'rb') as f:
+            # The log only grows, so the newest checkpoint that still matches vouches for the older ones
+            for i in range(len(on_disk) - 1, -1, -1):
+                info = self.info(on_disk[i])
+                if info and info['every'] == self.every and info['offset'] <= size and log_check(f, info['offset']) == info['check']:
+                    return on_disk[:i + 1]
+        return []
+
+    def _load(self, checkpoints, fights):
+        """State at the last checkpoint at or before `fights` (an empty state when there is none)."""
+        state = RatingState()
+        usable = [c for c in checkpoints if c <= fights]
+        # The last full one, as saved (newest first: at most CHECKPOINT_FULL_EVERY files are opened)
+        base = next((i for i in range(len(usable) - 1, -1, -1) if (self.info(usable[i]) or {}).get('full')), None)
+        if base is None:
+            return state
+        for checkpoint in usable[base:]:
+            with np.load(self._path(checkpoint)) as data:
+                state.add_titles(_unpack_titles(data['new_titles']))
+                ids = data['ids']
+                for col in STATE_COLS:
+                    state.columns[col][ids] = data[col]
+                state.fights, state.offset = int(data['fights']), int(data['offset'])
+        return state
+
+    def _save(self, state, changed, new_titles, dated=False):
+        full = self._is_full(state.fights)
+        ids = np.arange(len(state.titles)) if full else changed
+        with open(self.fights_csv, 'rb') as f:
+            check = log_check(f, state.offset)
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(state.fights)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, fights=state.fights, offset=state.offset, check=check, time=time.time(), dated=dated, full=full,
+                 every=self.every,
+                 new_titles=_pack_titles(state.titles if full else new_titles), ids=ids,
+                 **{col: state.columns[col][ids] for col in STATE_COLS})
+        os.replace(tmp_path, path)
+
+    def _seek_rows(self, f, state):
+        """Positions f at the first log row after the state. Returns the log's header line."""
+        header = f.readline()
+        f.seek(max(state.offset, len(header)))
+        state.offset = f.tell()
+        return header
+
+    def sync(self, dated=False):
+        """
+        Writes the checkpoints the log has grown past since the last one, after deleting
+        those that no longer match the log. Returns the number of rows after the last checkpoint.
+
+        Args:
+            dated (bool): The log is being followed as votes are logged, so a checkpoint it has only
+                just grown past is stamped as dated (see module comment).
+        """
+        if not os.path.exists(self.fights_csv):
+            return 0
+        try:
+            return self._sync(dated)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error writing checkpoints of '{self.fights_csv}': {e}")
+            return 0
+
+    def _sync(self, dated):
+        with self.lock:
+            checkpoints = self.list()
+            for stale in self._on_disk()[len(checkpoints):]:
+                os.remove(self._path(stale))
+            state = self._load(checkpoints, checkpoints[-1] if checkpoints else 0)
+            with open(self.fights_csv, 'rb') as f:
+                header = self._seek_rows(f, state)
+                chunk, rows, consumed = read_fight_rows(f, header, self.every)
+                while rows == self.every: # The tail is replayed on demand until it fills an interval
+                    known = len(state.titles)
+                    changed = state.advance(chunk)
+                    state.fights += rows
+                    state.offset += consumed
+                    chunk, rows, consumed = read_fight_rows(f, header, self.every) # Read ahead: is this the last one?
+                    self._save(state, changed, state.titles[known:], dated and rows < self.every)
+                return rows
+
+    def state_at(self, fights=None):
+        """
+        The replayed state after the first `fights` rows of the log (default: all of them),
+        from the nearest checkpoint plus a replay of the rows after it.
+
+        Returns:
+            RatingState: .fights is smaller than requested if the log is shorter; .offset is
+                the byte offset in the log right after the state's last row.
+        """
+        self.sync()
+        state = RatingState()
+        if not os.path.exists(self.fights_csv):
+            return state
+        with self.lock:
+            state = self._load(self.list(), float('inf') if fights is None else fights)
+        with open(self.fights_csv, 'rb') as f:
+            header = self._seek_rows(f, state)
+            chunk, rows, consumed = read_fight_rows(f, header, None if fights is None else max(fights - state.fights, 0))
+        if rows:
+            state.advance(chunk)
+            state.fights += rows
+            state.offset += consumed
+        return state
@@ -0,0 +1,343 @@
+import csv
+import json
+import os
+import threading
+import zlib
+import numpy as np
+import config
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc # noqa: F401 (pa.ipc)
+except ImportError: # Optional: without pyarrow everything reads the CSVs
+    pa = pc = pa_csv = None
+
+# Columnar (Arrow IPC, uncompressed) copies of the app's tables, read through memory maps so a
+# reader only touches the columns and rows it asks for and numeric columns come back zero-copy.
+#
+# - Catalog / metadata: write_table() / read_table(), used by the 'arrow' storage backend.
+# - Fight log: head_to_head.csv stays the append-only log the app writes to; its columnar
+#   mirror (head_to_head.arrow next to it) holds the first `csv_bytes` bytes of it, with both
+#   title columns dictionary-encoded over one shared title dictionary, so the indices are
+#   ready-made movie ids for replays. A mirror is only used while the CSV still starts with
+#   the bytes it was built from (length + CRC of the bytes just before the cut); rows appended
+#   since are parsed from the CSV tail. Replays fold a long tail into the mirror.
+
+FIGHT_COLS = ['Movie A', 'Movie B', 'Outcome', 'Score A']
+MIRROR_FORMAT = 2 # 2: only empty fields are null (titles like 'NA' or 'NULL' are kept)
+_KEY = b'movie_elo_fight_mirror'
+_CHECK_BYTES = 4096 # Bytes before a derived file's cut that must still match the CSV (see log_check)
+_CSV_BLOCK = 16 << 20 # Bytes parsed per CSV batch (bounds memory when mirroring big logs)
+
+
+def available():
+    return pa is not None
+
+
+def mirror_enabled():
+    return pa is not None and config.FIGHTS_ARROW_MIRROR
+
+
+# --- Arrow IPC tables ---
+def write_table(df, path):
+    """Writes df's columns (index dropped) as an Arrow IPC file, via a temporary file and an atomic rename."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp" # Concurrent writers never share one
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_table(path, columns=None):
+    """
+    Memory-maps an Arrow IPC file.
+
+    Args:
+        path (str): The .arrow file.
+        columns (list, optional): Columns to keep; the others are never read from disk.
+
+    Returns:
+        pa.Table: Zero-copy views into the mapped file.
+    """
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    return table.select(columns) if columns is not None else table
+
+
+def decode(table):
+    """Table -> DataFrame, with dictionary-encoded columns turned back into plain strings."""
+    # Decoding per chunk only touches the rows in the table, not the whole dictionary
+    columns = [pa.chunked_array([chunk.dictionary_decode() for chunk in column.chunks], column.type.value_type)
+               if pa.types.is_dictionary(column.type) else column for column in table.columns]
+    return pa.Table.from_arrays(columns, names=table.column_names).to_pandas()
+
+
+# --- Fight log mirror ---
+def fight_mirror_path(csv_path):
+    return f"{os.path.splitext(csv_path)[0]}.arrow"
+
+
+def log_check(f, offset):
+    """
+    CRC of the CSV bytes just before offset (a rewritten or truncated log no longer matches).
+    The fight log's derived files (mirror, checkpoints, trajectory index, bootstrap cache) all
+    store it with the length they cover, and are only used while the log still matches.
+    """
+    f.seek(max(offset - _CHECK_BYTES, 0))
+    return zlib.crc32(f.read(min(offset, _CHECK_BYTES)))
+
+
+def open_fight_mirror(csv_path):
+    """
+    The mirror of csv_path, if it still matches the start of the CSV.
+
+    Returns:
+        tuple or None: (table, csv_bytes) - the mirrored fights (memory-mapped) and how many
+            bytes of the CSV they cover - or None when there is no usable mirror.
+    """
+    path = fight_mirror_path(csv_path)
+    if not mirror_enabled() or not os.path.exists(path) or not os.path.exists(csv_path):
+        return None
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(path))
+        key = json.loads((reader.schema.metadata or {}).get(_KEY, b'null'))
+        if not key or key['format'] != MIRROR_FORMAT or os.path.getsize(csv_path) < key['csv_bytes']:
+            return None
+        with open(csv_path, 'rb') as f:
+            if log_check(f, key['csv_bytes']) != key['check']:
+                return None
+        return reader.read_all(), key['csv_bytes']
+    except (OSError, ValueError, KeyError, pa.ArrowException):
+        return None
+
+
+def _extend(dictionary, uniques):
+    """Ids of `uniques` in `dictionary`, appending unseen values. Returns (ids, extended dictionary)."""
+    ids = pc.index_in(uniques, value_set=dictionary).fill_null(-1).to_numpy().astype(np.int32)
+    unseen = ids < 0
+    if unseen.any():
+        ids[unseen] = len(dictionary) + np.arange(unseen.sum(), dtype=np.int32)
+        dictionary = pa.concat_arrays([dictionary, uniques.filter(pa.array(unseen))])
+    return ids, dictionary
+
+
+def _parse_fights(source, names, titles, outcomes):
+    """
+    Parses fight log CSV text into id arrays, growing the title / outcome dictionaries.
+
+    Args:
+        source: Readable Arrow stream with the CSV rows.
+        names (list): Column names of the log, or None when source starts with the header.
+        titles, outcomes (pa.Array): Dictionaries so far.
+
+    Returns:
+        tuple: (parts, titles, outcomes) - parts is a list of (id_a, id_b, outcome, score)
+            NumPy array tuples, one per parsed block.
+    """
+    reader = pa_csv.open_csv(
+        source, read_options=pa_csv.ReadOptions(block_size=_CSV_BLOCK, column_names=names),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={'Movie A': pa.string(), 'Movie B': pa.string(), 'Outcome': pa.string(), 'Score A': pa.float64()},
+            include_columns=FIGHT_COLS, include_missing_columns=True,
+            # Only empty fields are missing, as for pandas in replay.py (keep_default_na=False)
+            null_values=[''], strings_can_be_null=True, quoted_strings_can_be_null=True))
+    parts = []
+    for batch in reader:
+        # Rows without both titles are skipped, like replay.load_fight_log does
+        batch = batch.filter(pc.and_(pc.is_valid(batch.column('Movie A')), pc.is_valid(batch.column('Movie B'))))
+        n = batch.num_rows
+        # Both title columns share one dictionary, so a title has the same id on either side
+        both = pa.concat_arrays([batch.column('Movie A'), batch.column('Movie B')]).dictionary_encode()
+        ids, titles = _extend(titles, both.dictionary)
+        codes = ids[both.indices.to_numpy()]
+        outcome = batch.column('Outcome').cast(pa.string()).fill_null('').dictionary_encode()
+        outcome_ids, outcomes = _extend(outcomes, outcome.dictionary)
+        parts.append((codes[:n], codes[n:], outcome_ids[outcome.indices.to_numpy()],
+                      batch.column('Score A').fill_null(0.5).to_numpy()))
+    return parts, titles, outcomes
+
+
+def _csv_tail(csv_path, offset):
+    """
+    The CSV's complete rows from byte offset on, as a zero-copy view of the memory-mapped file.
+
+    Returns:
+        tuple: (source, names, end) - a stream over the rows (None if there are none), the
+            column names to parse them with (None: the stream starts with the header) and the
+            byte offset after the last complete row. A half-written last row is left for later.
+    """
+    if os.path.getsize(csv_path) <= offset:
+        return None, None, offset
+    buf = pa.memory_map(csv_path).read_buffer()
+    view = memoryview(buf)
+    search_from = max(len(buf) - 65536, offset)
+    cut = bytes(view[search_from:]).rfind(b'\n')
+    end = offset if cut < 0 else search_from + cut + 1
+    if end <= offset:
+        return None, None, offset
+    names = None
+    if offset > 0:
+        header = bytes(view[:65536]).split(b'\n', 1)[0].decode('utf-8').rstrip('\r')
+        names = next(csv.reader([header]))
+    return pa.BufferReader(buf.slice(offset, end - offset)), names, end
+
+
+def _schema(key=None):
+    title = pa.dictionary(pa.int32(), pa.string())
+    schema = pa.schema([('Movie A', title), ('Movie B', title), ('Outcome', pa.dictionary(pa.int32(), pa.string())),
+                        ('Score A', pa.float64())])
+    return schema.with_metadata({_KEY: json.dumps(key).encode()}) if key else schema
+
+
+def _batches(parts, titles, outcomes):
+    """Record batches over the final dictionaries (ids from earlier dictionaries stay valid: they only grow)."""
+    for id_a, id_b, outcome, score in parts:
+        yield pa.record_batch([pa.DictionaryArray.from_arrays(pa.array(id_a, pa.int32()), titles),
+                               pa.DictionaryArray.from_arrays(pa.array(id_b, pa.int32()), titles),
+                               pa.DictionaryArray.from_arrays(pa.array(outcome, pa.int32()), outcomes),
+                               pa.array(score, pa.float64())], schema=_schema())
+
+
+def _mirror_parts(table):
+    """The mirrored fights as (id_a, id_b, outcome, score) arrays, zero-copy per record batch."""
+    return [tuple(batch.column(name).indices.to_numpy() if name != 'Score A' else batch.column(name).to_numpy()
+                  for name in FIGHT_COLS) for batch in table.to_batches()]
+
+
+def _dictionaries(table):
+    def first(name):
+        column = table.column(name)
+        return column.chunk(0).dictionary if column.num_chunks else pa.array([], pa.string())
+    return first('Movie A'), first('Outcome')
+
+
+def _fight_parts(csv_path, max_tail=None):
+    """
+    Every fight in csv_path as id/outcome/score array parts: the mirror's rows plus the CSV rows
+    appended since.
+
+    Args:
+        csv_path (str): The fight log.
+        max_tail (int, optional): Rewrite the mirror when it is missing / stale or more than
+            this many CSV bytes behind (None: never write).
+
+    Returns:
+        tuple or None: (parts, titles, outcomes), or None without pyarrow / when the CSV
+            cannot be parsed as a fight log.
+    """
+    if not mirror_enabled() or not os.path.exists(csv_path):
+        return None
+    try:
+        mirror = open_fight_mirror(csv_path)
+        if mirror is None:
+            csv_bytes = 0
+            parts, titles, outcomes = [], pa.array([], pa.string()), pa.array([], pa.string())
+        else:
+            table, csv_bytes = mirror
+            parts = _mirror_parts(table)
+            titles, outcomes = _dictionaries(table)
+        source, names, end = _csv_tail(csv_path, csv_bytes)
+        if source is not None:
+            tail, titles, outcomes = _parse_fights(source, names, titles, outcomes)
+            parts += tail
+        if max_tail is not None and (mirror is None or end - csv_bytes > max_tail) and end > 0:
+            _write_mirror(csv_path, parts, titles, outcomes, end)
+        return parts, titles, outcomes
+    except (OSError, ValueError, pa.ArrowException) as e:
+        print(f"Could not read '{csv_path}' through its columnar mirror: {e}")
+        return None
+
+
+def _write_mirror(csv_path, parts, titles, outcomes, csv_bytes):
+    path = fight_mirror_path(csv_path)
+    # The app's startup, its background threads and the utils can all rebuild the mirror
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(csv_path, 'rb') as f:
+        key = {'format': MIRROR_FORMAT, 'csv_bytes': csv_bytes, 'check': log_check(f, csv_bytes),
+               'rows': int(sum(len(part[0]) for part in parts))}
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, _schema(key)) as writer:
+            for batch in _batches(parts, titles, outcomes):
+                writer.write_batch(batch)
+        os.replace(tmp_path, path)
+    except (OSError, pa.ArrowException) as e:
+        print(f"Could not write fight log mirror '{path}': {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def sync_fight_mirror(csv_path):
+    """
+    Brings the mirror of csv_path up to date: appends the CSV rows written since it was built,
+    or builds it from the whole CSV. Returns the number of mirrored fights (None if unavailable).
+    """
+    result = _fight_parts(csv_path, max_tail=0)
+    if result is None:
+        return None
+    return int(sum(len(part[0]) for part in result[0]))
+
+
+def load_fight_ids(csv_path):
+    """
+    The fight log as replay input, read through the mirror (see replay.load_fight_log).
+
+    Returns:
+        tuple or None: (titles, id_a, id_b, score_a), or None when the mirror cannot be used.
+    """
+    result = _fight_parts(csv_path, max_tail=config.FIGHTS_ARROW_MAX_TAIL)
+    if result is None:
+        return None
+    parts, titles, _ = result
+    if not parts:
+        empty_ids = np.empty(0, dtype=np.int32)
+        return titles.to_pylist(), empty_ids, empty_ids.copy(), np.empty(0, dtype=np.float64)
+    return (titles.to_pylist(), np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]),
+            np.concatenate([p[3] for p in parts]))
+
+
+def read_fights(csv_path, start=0, stop=None, columns=None):
+    """
+    Fights [start, stop) of the log (log order), reading only those rows of the mirror.
+
+    Rows past the mirror come from the CSV tail. Returns a DataFrame with the requested
+    FIGHT_COLS (default all), or None when the mirror cannot be used.
+    """
+    mirror = open_fight_mirror(csv_path)
+    if mirror is not None and stop is not None and stop <= mirror[0].num_rows:
+        table = mirror[0] # The rows are all mirrored: no need to look at the CSV tail
+    else:
+        result = _fight_parts(csv_path)
+        if result is None:
+            return None
+        table = pa.Table.from_batches(list(_batches(*result)), schema=_schema())
+    stop = table.num_rows if stop is None else min(stop, table.num_rows)
+    start = min(max(start, 0), stop)
+    return decode(table.slice(start, stop - start).select(columns or FIGHT_COLS))
+
+
+def export_fights(csv_path, out_path):
+    """Writes the fights of csv_path's mirror (plus any unmirrored tail) as a fight log CSV."""
+    df = read_fights(csv_path)
+    if df is None:
+        return False
+    tmp_path = f"{out_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, out_path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return True
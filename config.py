@@ -13,6 +13,72 @@ MOVIES_CSV = os.path.join(DATA_DIR, 'movies_with_posters.csv') # Main movie info
 MOVIE_DATA_CSV = os.path.join(DATA_DIR, 'movie_metadata.csv')   # Tracks comparisons, W/L/D
 FIGHTS_CSV = os.path.join(DATA_DIR, 'head_to_head.csv')       # Comparison history log
 
+# --- Storage Backend ---
+# 'csv'    : rewrite movies_with_posters.csv / movie_metadata.csv on every vote (original behaviour)
+# 'sqlite' : keep ratings + metadata in a SQLite database (WAL mode), updating only the changed rows per vote.
+#            The database is imported from the CSVs on first run; use utils/convert_storage.py to export back.
+# 'arrow'  : keep ratings + metadata as Arrow IPC files, read through memory maps (needs pyarrow).
+#            Imported from the CSVs on first run; use utils/convert_columnar.py to export back.
+STORAGE_BACKEND = 'csv'
+STORAGE_DB = os.path.join(DATA_DIR, 'movie_elo.db')
+MOVIES_ARROW = os.path.join(DATA_DIR, 'movies_with_posters.arrow')
+MOVIE_DATA_ARROW = os.path.join(DATA_DIR, 'movie_metadata.arrow')
+# Keep a Parquet snapshot of each cleaned CSV (<csv>.snapshot.parquet, needs pyarrow) so a cold
+# start reads it instead of re-parsing and re-cleaning the CSV; used only while the CSV is unchanged
+CSV_SNAPSHOTS = True
+# Columnar mirror of the fight log (head_to_head.arrow next to head_to_head.csv, needs pyarrow).
+# The CSV stays the log votes are appended to; replays and deep history pages read the mirror
+# through a memory map plus only the CSV rows appended since. A replay folds those rows into
+# the mirror once they exceed FIGHTS_ARROW_MAX_TAIL bytes.
+FIGHTS_ARROW_MIRROR = True
+FIGHTS_ARROW_MAX_TAIL = 4 * 1024 * 1024
+
+# --- Rating Service ---
+# All sessions share one in-process rating service: votes are applied in order by a single
+# writer thread and committed in batches (one fight-log append + one storage write per batch).
+SERVICE_BATCH_SIZE = 256   # Max votes applied and committed together
+SERVICE_BATCH_WAIT = 0.0   # Seconds to wait for more votes before committing (0 = commit whatever is queued)
+SERVICE_CHANGE_LOG = 10_000 # Recent votes remembered so sessions can redraw their queued pairs
+
+# --- Write-Behind ---
+# With WRITE_BEHIND on, each vote is appended to a small fsync'd journal before it is acknowledged,
+# and the fight log + rating/metadata tables are written in groups: every FLUSH_VOTES votes or
+# FLUSH_SECONDS seconds. Votes not yet flushed when the process dies are replayed from the journal
+# the next time the tables are loaded.
+WRITE_BEHIND = False
+VOTE_JOURNAL = os.path.join(DATA_DIR, 'vote_journal.jsonl')
+FLUSH_VOTES = 200
+FLUSH_SECONDS = 5.0
+
+# --- Checkpoints ---
+# Every CHECKPOINT_EVERY fights the replayed ratings and W/L/D counts are checkpointed next to the
+# fight log (head_to_head.checkpoints/), so utils/reset_elo.py can show or restore the rankings
+# "as of fight #k" by replaying at most CHECKPOINT_EVERY fights. Every CHECKPOINT_FULL_EVERY-th
+# checkpoint stores all movies, the others only the movies changed since the previous one.
+CHECKPOINT_EVERY = 1000 # 0 turns checkpointing off
+CHECKPOINT_FULL_EVERY = 50
+ARCHIVE_DIR = os.path.join(DATA_DIR, 'archive') # Where reset / restore move the data they replace
+
+# --- Undo ---
+# The last UNDO_DEPTH votes can be undone (and redone) from the voting page. Each vote's exact
+# before/after values are kept in a journal next to the fight log (head_to_head.undo.jsonl).
+UNDO_DEPTH = 100 # 0 turns undo off
+
+# --- Rating Trajectories ---
+# A per-movie index of the fight log (head_to_head.trajectory/) with both movies' ratings before
+# and after every fight, for the dashboard's rating trajectory chart. Built in the background on
+# the first start (about 37 bytes per fight), then kept up to date as fights are logged.
+TRAJECTORY_INDEX = True
+
+# --- Ranking Uncertainty ---
+# Bootstrap intervals for the rankings (bootstrap.py): each replicate resamples the fight log with
+# replacement and replays it; the dashboard shows every movie's central BOOTSTRAP_LEVEL interval of
+# rating and rank. Run from the dashboard or utils/bootstrap_rankings.py and cached next to the
+# fight log (head_to_head.bootstrap.npz).
+BOOTSTRAP_REPLICATES = 1000
+BOOTSTRAP_LEVEL = 0.95
+BOOTSTRAP_WORKERS = None # Processes replaying replicates (None = one per CPU core)
+
 # --- ELO Parameters ---
 DEFAULT_ELO = 1200
 # K-Factor tiers based on min comparisons in a matchup
@@ -22,9 +88,51 @@ K_TIERS = {
     float('inf'): 24 # Lower K for well-ranked movies (> 50 comparisons)
 }
 
+# --- Rating Engines ---
+# Engine used by utils/replay_elo.py to rebuild ratings from the fight log (rating_engines.py):
+# 'elo'           : replay the per-vote ELO updates in order (original behaviour)
+# 'bradley_terry' : order-independent maximum-likelihood fit over all fights at once
+# 'glicko2'       : Glicko-2 replay, also tracking each movie's rating deviation (RD)
+# All engines produce ELO-scale ratings; votes made in the app keep updating them with ELO.
+RATING_ENGINE = 'elo'
+BT_PRIOR = 1.0      # Virtual draws per movie against an average movie (keeps unbeaten movies finite)
+BT_MAX_ITER = 50    # Bradley-Terry Newton iteration cap
+BT_TOL = 1e-6       # ...stops once no movie's log-strength changes by more than this
+GLICKO_RD = 350.0          # Starting (and maximum) rating deviation
+GLICKO_VOLATILITY = 0.06   # Starting volatility
+GLICKO_TAU = 0.5           # Volatility change constraint
+
+# --- Pair Selection ---
+# Movie A is always weighted towards fewer comparisons. Movie B is picked by:
+# 'weighted'      : uniformly from the rest of the catalog (original behaviour)
+# 'rating_window' : uniformly from movies rated within +/- RATING_WINDOW of movie A (nearest-rated
+#                   movie if the window is empty), so votes are less lopsided and move ratings more
+SELECTION_STRATEGY = 'weighted'
+RATING_WINDOW = 100
+# Already-compared pairs are avoided: a candidate movie B that met movie A n times before is kept
+# with probability REPEAT_PAIR_WEIGHT ** n, else another B is drawn (up to REPEAT_PAIR_TRIES draws,
+# then the least-compared candidate is used). 1 turns the avoidance off, 0 skips repeats whenever possible.
+REPEAT_PAIR_WEIGHT = 0.1
+REPEAT_PAIR_TRIES = 16
+PREFETCH_PAIRS = 3 # Upcoming matchups queued ahead of time (their posters also download in the background)
+
 # --- UI Parameters ---
 POSTER_WIDTH = 180 # Adjust poster size in pixels
 
+# --- Poster Cache ---
+# Posters are downloaded once, resized to POSTER_WIDTH and served from this directory.
+# Least recently shown thumbnails are evicted once it grows past POSTER_CACHE_MAX_MB.
+POSTER_CACHE_DIR = os.path.join(DATA_DIR, 'poster_cache')
+POSTER_CACHE_MAX_MB = 200
+
+# --- Profiling ---
+# With PROFILING on, the app and the data/selection/ELO functions record timing spans
+# (instrumentation.py): a sidebar panel shows the last rerun's breakdown and rolling
+# percentiles, and every span is appended to PROFILE_LOG (one JSON object per line).
+PROFILING = False
+PROFILE_LOG = os.path.join(DATA_DIR, 'profile_spans.jsonl')
+PROFILE_WINDOW = 500 # Recent calls per span name kept for the percentiles
+
 # --- Slider Outcome Mapping ---
 SLIDER_OPTIONS = ["A Much Better", "A Slightly Better", "Even / Tie", "B Slightly Better", "B Much Better"]
 SCORE_MAP = {
@@ -1,18 +1,31 @@
 import pandas as pd
 import os
+import io
+import csv
+import threading
 import streamlit as st # Used only for st.error/st.warning/st.info
 # Import constants from the config file
-from config import DEFAULT_ELO, MOVIE_DATA_CSV
+from config import DEFAULT_ELO, MOVIE_DATA_CSV, FIGHTS_ARROW_MAX_TAIL
+from instrumentation import timed
+import snapshot
+import columnar
+import trajectory
 
 # Note: MOVIES_CSV is passed as an argument now where needed
 
 # @st.cache_data # Removed cache
+@timed()
 def load_movie_data(filename):
     """Loads main movie data (Title, Genres, PosterURL, Rating)."""
     if not os.path.exists(filename):
         st.error(f"Error: Movie data file '{filename}' not found!")
         return pd.DataFrame(columns=['Title', 'Genres', 'PosterURL', 'Rating'])
+    # Already-cleaned copy of this exact CSV version (see snapshot.py)
+    cached = snapshot.load(filename, 'movies')
+    if cached is not None:
+        return cached.set_index('Title', drop=False)
     try:
+        stat = os.stat(filename) # The version the snapshot is keyed to (taken before reading)
         df = pd.read_csv(filename, keep_default_na=False, na_values=[''])
         required_cols = ['Title', 'Genres', 'Rating']
         for col in required_cols:
@@ -34,26 +47,33 @@ def load_movie_data(filename):
 
         final_cols = ['Title', 'Genres', 'PosterURL', 'Rating']
         other_cols = [col for col in df.columns if col not in final_cols]
-        df = df[final_cols + other_cols].set_index('Title', drop=False) # Set Title as index
-        return df
+        df = df[final_cols + other_cols]
+        snapshot.save(filename, df, 'movies', stat)
+        return df.set_index('Title', drop=False) # Set Title as index
     except Exception as e:
         st.error(f"Error loading '{filename}': {e}")
         return pd.DataFrame(columns=['Title', 'Genres', 'PosterURL', 'Rating'])
 
+@timed()
 def load_movie_metadata(filename=MOVIE_DATA_CSV, movie_titles=None):
     """Loads or initializes metadata (Comparisons, Wins, Losses, Draws)."""
     required_meta_cols = ['Comparisons', 'Wins', 'Losses', 'Draws']
     if os.path.exists(filename):
         try:
-            meta_df = pd.read_csv(filename).set_index('Title')
+            meta_df = snapshot.load(filename, 'metadata')
+            if meta_df is None:
+                stat = os.stat(filename)
+                meta_df = pd.read_csv(filename)
+                snapshot.save(filename, meta_df, 'metadata', stat)
+            meta_df = meta_df.set_index('Title')
             if not all(col in meta_df.columns for col in required_meta_cols):
                  raise ValueError("Metadata file missing required columns.")
             # Add any new movies found in the main list but not in metadata
             if movie_titles is not None:
-                current_titles = set(movie_titles)
-                meta_titles = set(meta_df.index)
-                missing_titles = current_titles - meta_titles
-                if missing_titles:
+                current_titles = pd.Index(movie_titles)
+                # Usual case: the same titles in the same order, checked without hashing every title
+                missing_titles = [] if current_titles.equals(meta_df.index) else current_titles.difference(meta_df.index)
+                if len(missing_titles):
                     print(f"Adding {len(missing_titles)} new movies to metadata.")
                     new_meta_rows = pd.DataFrame(0, index=list(missing_titles), columns=required_meta_cols)
                     meta_df = pd.concat([meta_df, new_meta_rows])
@@ -70,35 +90,179 @@ def load_movie_metadata(filename=MOVIE_DATA_CSV, movie_titles=None):
         st.error("Cannot initialize metadata without movie titles list.")
         return pd.DataFrame(columns=required_meta_cols).set_index('Title')
 
+def _write_csv(df, filename):
+    """
+    Writes a CSV via a temporary file and an atomic rename, so a crash never leaves a half-written file.
+    """
+    tmp_filename = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp" # Concurrent writers never share one
+    try:
+        df.to_csv(tmp_filename, index=False)
+        os.replace(tmp_filename, filename)
+    except Exception:
+        try:
+            os.remove(tmp_filename)
+        except OSError:
+            pass
+        raise
+
+@timed()
 def save_movie_data(df, filename):
-    """Saves the main movie DataFrame (including updated ratings)."""
+    """Saves the main movie DataFrame (including updated ratings). Returns True on success."""
     try:
         save_df = df.reset_index(drop=True)
         final_cols = ['Title', 'Genres', 'PosterURL', 'Rating']
         other_cols = [col for col in save_df.columns if col not in final_cols]
         save_df = save_df[final_cols + other_cols]
-        save_df.to_csv(filename, index=False)
+        _write_csv(save_df, filename) # No snapshot: it is built when the CSV is next parsed (see snapshot.py)
+        return True
     except Exception as e:
         st.error(f"Error saving main data '{filename}': {e}")
+        return False
 
+@timed()
 def save_movie_metadata(meta_df, filename=MOVIE_DATA_CSV):
-    """Saves the movie metadata DataFrame."""
+    """Saves the movie metadata DataFrame. Returns True on success."""
     try:
-        meta_df.reset_index().to_csv(filename, index=False)
+        save_df = meta_df.rename_axis('Title').reset_index()
+        _write_csv(save_df, filename)
+        return True
     except Exception as e:
         st.error(f"Error saving metadata '{filename}': {e}")
+        return False
 
+@timed()
 def log_fight(movie_a_title, movie_b_title, outcome_description, score_a, filename):
     """Logs the comparison result to the history file."""
-    new_fight = pd.DataFrame({
-        'Movie A': [movie_a_title], 'Movie B': [movie_b_title],
-        'Outcome': [outcome_description], 'Score A': [score_a]
-    })
+    return log_fights([(movie_a_title, movie_b_title, outcome_description, score_a)], filename)
+
+@timed()
+def log_fights(fights, filename):
+    """
+    Appends several comparison results, (Movie A, Movie B, Outcome, Score A) tuples, in one write.
+    Returns True on success. The log's open trajectory index (see trajectory.py) indexes the new rows.
+    """
+    new_fights = pd.DataFrame(list(fights), columns=['Movie A', 'Movie B', 'Outcome', 'Score A'])
     try:
         if not os.path.exists(filename):
-            new_fight.to_csv(filename, index=False)
+            new_fights.to_csv(filename, index=False)
         else:
-            new_fight.to_csv(filename, mode='a', header=False, index=False)
+            new_fights.to_csv(filename, mode='a', header=False, index=False)
     except Exception as e:
         st.error(f"Error saving fight to '{filename}': {e}")
+        return False
+    trajectory.notify_append(filename)
+    return True
+
+def retract_last_fight(filename, fight, block_size=4096):
+    """
+    Removes the last row of the history file if it is the given (Movie A, Movie B, Outcome,
+    Score A) fight, e.g. when its vote is undone. Only the end of the file is read.
+    Returns True if the row was removed.
+    """
+    title_a, title_b, outcome, score_a = fight
+    try:
+        with open(filename, 'r+b') as f:
+            pos = old_size = f.seek(0, os.SEEK_END)
+            buffer = b''
+            while pos > 0 and b'\n' not in buffer.rstrip(b'\r\n'):
+                read_size = min(block_size, pos)
+                pos -= read_size
+                f.seek(pos)
+                buffer = f.read(read_size) + buffer
+            body = buffer.rstrip(b'\r\n')
+            start = body.rfind(b'\n') + 1
+            if pos == 0 and start == 0: # Only the header is left
+                return False
+            row = next(csv.reader([body[start:].decode('utf-8')]))
+            if len(row) < 4 or row[:3] != [title_a, title_b, outcome] or float(row[3]) != float(score_a):
+                return False
+            f.truncate(pos + start)
+    except Exception as e:
+        st.error(f"Error removing the last fight from '{filename}': {e}")
+        return False
+    trajectory.notify_retract(filename, old_size)
+    return True
 
+def _history_lines(data, header, partial_first=False):
+    """
+    The lines of log rows in data (raw bytes of the log) that history pages show: complete,
+    non-blank rows naming both movies, as the columnar mirror keeps them (a half-written last
+    row and rows with an empty title are skipped). partial_first: data starts mid-row.
+    """
+    lines = data[:data.rfind(b'\n') + 1].splitlines() # Not a half-written last row
+    if partial_first:
+        lines = lines[1:]
+    columns = next(csv.reader([header.decode('utf-8')]), [])
+    if 'Movie A' not in columns or 'Movie B' not in columns:
+        return [line for line in lines if line.strip()]
+    col_a, col_b = columns.index('Movie A'), columns.index('Movie B')
+    kept = []
+    for line in lines:
+        row = next(csv.reader([line.decode('utf-8')]), [])
+        if len(row) > max(col_a, col_b) and row[col_a] and row[col_b]:
+            kept.append(line)
+    return kept
+
+@timed()
+def read_recent_fights(filename, n=20, skip=0, block_size=64 * 1024):
+    """
+    Reads fights from the end of the history file without parsing the whole log.
+
+    Seeks backwards in blocks until enough lines are buffered, so the cost depends
+    on n + skip, not on the size of the log. Pages older than the rows appended since the
+    columnar mirror was written (see columnar.py) are sliced straight from the mirror. Both
+    paths count the same rows (see _history_lines), so their pages meet without a gap.
+
+    Args:
+        filename (str): Path to head_to_head.csv.
+        n (int): Number of fights to return.
+        skip (int): Number of most recent fights to skip (for paging backwards: skip = page * n).
+        block_size (int): Bytes read per backward seek.
+
+    Returns:
+        pd.DataFrame: Up to n fights in log order (oldest first), with the file's header columns.
+            Fewer than n rows means the start of the log was reached.
+    """
+    default_cols = ['Movie A', 'Movie B', 'Outcome', 'Score A']
+    if not os.path.exists(filename):
+        return pd.DataFrame(columns=default_cols)
+    # Deep pages: slice the memory-mapped columnar mirror instead of scanning back through the CSV
+    mirror = columnar.open_fight_mirror(filename) if skip > 0 else None
+    table, mirrored_bytes = mirror or (None, 0)
+    if mirror is not None and os.path.getsize(filename) - mirrored_bytes <= FIGHTS_ARROW_MAX_TAIL:
+        with open(filename, 'rb') as f:
+            header = f.readline()
+            f.seek(mirrored_bytes)
+            tail_rows = len(_history_lines(f.read(), header)) # Only the few rows appended since the mirror was written
+        if skip >= tail_rows:
+            stop = max(table.num_rows - (skip - tail_rows), 0)
+            start = max(stop - n, 0)
+            return columnar.decode(table.slice(start, stop - start))
+    try:
+        with open(filename, 'rb') as f:
+            header = f.readline()
+            if not header.strip():
+                return pd.DataFrame(columns=default_cols)
+            data_start = f.tell()
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            needed = target = n + skip
+            buffer = b''
+            while True:
+                # +1 newline: the first buffered line may be cut off mid-row
+                while pos > data_start and buffer.count(b'\n') <= target:
+                    read_size = min(block_size, pos - data_start)
+                    pos -= read_size
+                    f.seek(pos)
+                    buffer = f.read(read_size) + buffer
+                lines = _history_lines(buffer, header, partial_first=pos > data_start)
+                if len(lines) >= needed or pos <= data_start:
+                    break
+                target += needed - len(lines) # Some lines were skipped: read further back
+        end = max(len(lines) - skip, 0)
+        selected = lines[max(end - n, 0):end]
+        text = b'\n'.join([header.rstrip(b'\r\n')] + selected).decode('utf-8')
+        return pd.read_csv(io.StringIO(text), keep_default_na=False, na_values=[''])
+    except Exception as e:
+        st.error(f"Error reading fight history '{filename}': {e}")
+        return pd.DataFrame(columns=default_cols)
@@ -1,6 +1,7 @@
 import math
 # Import K_TIERS from the config file
 from config import K_TIERS
+from instrumentation import timed
 
 def calculate_expected_score(rating_a, rating_b):
     """Calculates the expected score of player A winning against player B."""
@@ -40,6 +41,7 @@ def get_k_factor(comparisons_a, comparisons_b):
     else: # Fallback if K_TIERS is somehow empty or only has infinity
         return 24 # Default fallback K
 
+@timed()
 def update_elo(rating_a, rating_b, score_a, k):
     """Updates the ELO ratings based on the match outcome and specific K-factor."""
     # Ensure ratings are numeric
@@ -62,3 +64,30 @@ def update_elo(rating_a, rating_b, score_a, k):
     # new_rating_b = max(100, new_rating_b)
 
     return round(new_rating_a), round(new_rating_b)
+
+@timed()
+def record_result(store, id_a, id_b, score_a):
+    """
+    Applies one comparison to a RatingStore in place: K-factor from both comparison counts,
+    new ratings via update_elo, then Comparisons and Wins/Losses/Draws (by score_a).
+
+    Returns:
+        tuple: (new_rating_a, new_rating_b)
+    """
+    comparisons = store.comparisons
+    k = get_k_factor(comparisons[id_a], comparisons[id_b])
+    new_rating_a, new_rating_b = update_elo(store.rating[id_a], store.rating[id_b], score_a, k)
+    store.rating[id_a] = new_rating_a
+    store.rating[id_b] = new_rating_b
+    comparisons[id_a] += 1
+    comparisons[id_b] += 1
+    if score_a > 0.5:
+        store.wins[id_a] += 1
+        store.losses[id_b] += 1
+    elif score_a < 0.5:
+        store.losses[id_a] += 1
+        store.wins[id_b] += 1
+    else:
+        store.draws[id_a] += 1
+        store.draws[id_b] += 1
+    return new_rating_a, new_rating_b
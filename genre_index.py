@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+# Encoded genre index over the catalog.
+# Genres are parsed once (when the catalog is loaded) into a vocabulary plus integer
+# arrays, so genre filters and per-genre stats never re-split the pipe-delimited strings.
+# Movie ids are row positions in movies_df, the same ids used by PairSampler/RatingIndex.
+
+
+class MovieSubset:
+    """A set of movie ids (sorted array) plus a boolean membership mask over the catalog."""
+
+    def __init__(self, ids, n_movies):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.mask = np.zeros(n_movies, dtype=bool)
+        self.mask[self.ids] = True
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class GenreIndex:
+    """
+    Genre vocabulary with per-movie genre codes (CSR layout) and per-genre member ids.
+
+    Attributes:
+        genres (list): Genre names, sorted; a genre's code is its position in this list.
+        codes (np.ndarray): Genre code of every (movie, genre) entry, grouped by movie.
+        movie_of (np.ndarray): Movie id of every entry (parallel to codes).
+        offsets (np.ndarray): Entries of movie i are codes[offsets[i]:offsets[i+1]].
+        counts (np.ndarray): Number of movies per genre code.
+    """
+
+    def __init__(self, genres):
+        genres = pd.Series(list(genres), dtype=object)
+        self.n_movies = len(genres)
+        # Same parsing rules as the dashboard: split on '|', strip, drop blanks and 'Unknown'
+        exploded = genres.fillna('').astype(str).str.split('|').explode().str.strip()
+        exploded = exploded[(exploded != '') & (exploded != 'Unknown') & exploded.notna()]
+        codes, vocabulary = pd.factorize(exploded.to_numpy(), sort=True)
+        self.genres = [str(g) for g in vocabulary]
+        self.genre_ids = {g: i for i, g in enumerate(self.genres)}
+        self.codes = codes.astype(np.int32)
+        self.movie_of = exploded.index.to_numpy(dtype=np.int64) # explode() keeps the row position as index
+        self.offsets = np.searchsorted(self.movie_of, np.arange(self.n_movies + 1))
+        self.counts = np.bincount(self.codes, minlength=len(self.genres))
+        # Members of each genre, grouped by genre code
+        by_genre = np.argsort(self.codes, kind='stable')
+        self._members = self.movie_of[by_genre]
+        self._member_offsets = np.concatenate([[0], np.cumsum(self.counts)])
+        self._subsets = {}
+
+    @classmethod
+    def from_frame(cls, movies_df):
+        """Builds the index over movies_df's rows (ids are row positions)."""
+        return cls(movies_df['Genres'].to_numpy())
+
+    def genres_of(self, movie_id):
+        """Genre codes of one movie."""
+        return self.codes[self.offsets[movie_id]:self.offsets[movie_id + 1]]
+
+    def movie_ids(self, genre):
+        """Ids of the movies tagged with a genre (empty if unknown)."""
+        code = self.genre_ids.get(genre)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return self._members[self._member_offsets[code]:self._member_offsets[code + 1]]
+
+    def subset(self, genres):
+        """Movies tagged with any of the given genres, as a cached MovieSubset."""
+        key = tuple(sorted(genres))
+        if key not in self._subsets:
+            ids = [self.movie_ids(g) for g in key]
+            self._subsets[key] = MovieSubset(np.unique(np.concatenate(ids)) if ids else [], self.n_movies)
+        return self._subsets[key]
+
+    def genre_sums(self, ratings):
+        """Sum of ratings per genre code (float64 array)."""
+        ratings = np.asarray(ratings, dtype=np.float64)
+        return np.bincount(self.codes, weights=ratings[self.movie_of], minlength=len(self.genres))
+
+    def genre_stats(self, ratings):
+        """Per-genre 'mean' / 'count' of the given ratings (array aligned with movie ids)."""
+        return self.stats_from_sums(self.genre_sums(ratings))
+
+    def stats_from_sums(self, sums):
+        """Per-genre 'mean' / 'count' DataFrame (indexed by Genre) from per-genre rating sums."""
+        present = self.counts > 0
+        return pd.DataFrame({
+            'mean': sums[present] / self.counts[present],
+            'count': self.counts[present],
+        }, index=pd.Index(np.array(self.genres, dtype=object)[present], name='Genre'))
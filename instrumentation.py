@@ -0,0 +1,195 @@
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+import numpy as np
+import pandas as pd
+import config
+
+# Lightweight timing spans for finding the slow phase of a Streamlit rerun.
+# Wrap a block in `with span('name'):` or a function in `@timed()`. Spans opened on the
+# script thread between start_rerun() and the next start_rerun() make up that rerun's
+# breakdown; spans on other threads (e.g. the rating service's writer) are background spans.
+# Every finished span feeds the rolling per-name percentiles and is appended to
+# config.PROFILE_LOG as one JSON line. With profiling off (config.PROFILING) span() returns
+# a shared no-op object and @timed functions only pay one flag check per call.
+
+_enabled = config.PROFILING
+_local = threading.local() # .run: the Rerun being recorded on this thread
+_lock = threading.Lock()
+_durations = defaultdict(lambda: deque(maxlen=config.PROFILE_WINDOW)) # name -> recent durations (ms)
+_pending = [] # Finished spans not yet written to the JSONL file
+_run_ids = itertools.count(1)
+_FLUSH_EVERY = 1000 # Unwritten spans that trigger a write without waiting for the next rerun
+
+
+def enable(flag=True):
+    """Turns span recording on or off for the whole process."""
+    global _enabled
+    _enabled = flag
+
+
+def enabled():
+    return _enabled
+
+
+class Rerun:
+    """The spans recorded during one rerun of the script, in the order they were opened."""
+
+    def __init__(self, session):
+        self.id = next(_run_ids)
+        self.session = session
+        self.started = time.perf_counter()
+        self.wall_start = time.time()
+        self.spans = [] # dicts: name, depth, start_ms, ms (None while open)
+        self.depth = 0
+        self.ms = None # Total, set by finish()
+
+    def finish(self):
+        """Closes the rerun at the end of its last span (a rerun stopped by st.rerun()/st.stop() has no explicit end)."""
+        if self.ms is None:
+            ends = [s['start_ms'] + s['ms'] for s in self.spans if s['ms'] is not None]
+            self.ms = max(ends, default=0.0)
+            _record('rerun', self.ms, {'run': self.id, 'session': self.session, 'depth': -1, 'start_ms': 0.0,
+                                       'time': self.wall_start})
+
+    def breakdown(self):
+        """The rerun's spans as a DataFrame (Span indented by nesting depth, ms, % of the rerun)."""
+        rows = [{'Span': ' ' * s['depth'] + s['name'], 'ms': round(s['ms'], 2),
+                 '% of rerun': round(100 * s['ms'] / self.ms, 1) if self.ms else 0.0}
+                for s in self.spans if s['ms'] is not None]
+        return pd.DataFrame(rows, columns=['Span', 'ms', '% of rerun'])
+
+
+class _Span:
+    __slots__ = ('name', 'run', 'record', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.run = getattr(_local, 'run', None)
+        self.start = time.perf_counter()
+        if self.run is not None:
+            self.record = {'name': self.name, 'depth': self.run.depth,
+                           'start_ms': (self.start - self.run.started) * 1e3, 'ms': None}
+            self.run.spans.append(self.record)
+            self.run.depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        ms = (time.perf_counter() - self.start) * 1e3
+        if self.run is None:
+            _record(self.name, ms, {'run': None, 'session': None, 'depth': 0, 'start_ms': None, 'time': time.time()})
+        else:
+            self.run.depth -= 1
+            self.record['ms'] = ms
+            _record(self.name, ms, {'run': self.run.id, 'session': self.run.session, 'depth': self.record['depth'],
+                                    'start_ms': round(self.record['start_ms'], 3), 'time': self.run.wall_start})
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name):
+    """Context manager timing the enclosed block as `name` (a no-op while profiling is off)."""
+    return _Span(name) if _enabled else _NO_SPAN
+
+
+def timed(name=None):
+    """Decorator timing every call of the function (span name defaults to module.qualname)."""
+    def decorate(fn):
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _record(name, ms, fields):
+    with _lock:
+        _durations[name].append(ms)
+        _pending.append({'name': name, 'ms': round(ms, 3), **fields})
+        backlog = len(_pending)
+    if backlog >= _FLUSH_EVERY: # Background spans keep coming when no session reruns
+        flush()
+
+
+def start_rerun(state, session=None):
+    """
+    Starts recording a rerun on the calling thread. Call at the top of the script.
+
+    Args:
+        state (dict-like): Per-session storage (st.session_state); holds the rerun being
+            recorded so the next call can finish it, however the script ended.
+        session (str, optional): Session label written to the JSONL records (default: a
+            random id kept in `state`).
+
+    Returns:
+        Rerun: The previous rerun of this session, finished, or None.
+    """
+    previous = state.get('_profile_rerun')
+    if previous is not None:
+        previous.finish()
+        flush()
+    if not _enabled:
+        state['_profile_rerun'] = _local.run = None
+        return previous
+    if session is None:
+        session = state.setdefault('_profile_session', uuid.uuid4().hex[:8])
+    state['_profile_rerun'] = _local.run = Rerun(session)
+    return previous
+
+
+def percentiles():
+    """p50 / p90 / p99 (ms) of the last PROFILE_WINDOW durations of every span name, slowest p90 first."""
+    with _lock:
+        snapshot = {name: np.array(values) for name, values in _durations.items() if values}
+    rows = [{'Span': name, 'Calls': len(values), 'p50 ms': np.percentile(values, 50),
+             'p90 ms': np.percentile(values, 90), 'p99 ms': np.percentile(values, 99)}
+            for name, values in snapshot.items()]
+    table = pd.DataFrame(rows, columns=['Span', 'Calls', 'p50 ms', 'p90 ms', 'p99 ms'])
+    return table.sort_values('p90 ms', ascending=False).round(3).reset_index(drop=True)
+
+
+def flush(filename=None):
+    """Appends the finished spans recorded so far to the JSONL file (config.PROFILE_LOG)."""
+    filename = filename or config.PROFILE_LOG
+    with _lock:
+        records = _pending[:]
+        _pending.clear()
+    if not records:
+        return
+    try:
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        with open(filename, 'a') as f:
+            f.write(''.join(json.dumps(record) + '\n' for record in records))
+    except OSError as e:
+        print(f"Error writing profiling spans to '{filename}': {e}")
+
+
+def reset():
+    """Forgets the rolling durations and unwritten spans."""
+    with _lock:
+        _durations.clear()
+        _pending.clear()
@@ -1,66 +1,108 @@
 import streamlit as st
-import pandas as pd
 import os
+import uuid
+from datetime import datetime
 # Import functions and constants from other modules
 import config
-from elo_logic import get_k_factor, update_elo
-from data_handler import load_movie_data, load_movie_metadata, save_movie_data, save_movie_metadata, log_fight
-from selection_logic import select_movie_pair
+import instrumentation
+from instrumentation import span
+from data_handler import read_recent_fights
+from rating_service import RatingService
+from selection_logic import PairQueue
+from poster_cache import PosterCache
 
 # --- Streamlit App ---
 st.set_page_config(page_title="Movie ELO Battler", layout="wide")
 st.title("🎬 Movie ELO Battler!")
 st.write(f"Hey Nik! Let's rank some movies!")
 
-# --- Initialize Session State ---
-# Load data into session state ONCE at the start
-if 'movies_df' not in st.session_state:
-    st.session_state.movies_df = load_movie_data(config.MOVIES_CSV)
-    if st.session_state.movies_df.empty:
-        st.error("Initial movie data load failed. Cannot continue.")
-        st.stop()
-    if len(st.session_state.movies_df) < 2:
-        st.warning("Not enough movies loaded to start comparisons.")
-        st.stop()
-
-if 'meta_df' not in st.session_state:
-     if 'movies_df' in st.session_state and not st.session_state.movies_df.empty:
-          # Pass the list of titles from the already loaded movies_df
-          st.session_state.meta_df = load_movie_metadata(
-              filename=config.MOVIE_DATA_CSV,
-              movie_titles=st.session_state.movies_df.index.tolist()
-          )
-     else:
-          st.error("Cannot load metadata because movie data is not available.")
-          # Create an empty placeholder to avoid errors later
-          st.session_state.meta_df = pd.DataFrame(columns=['Comparisons', 'Wins', 'Losses', 'Draws']).set_index('Title')
+# --- Performance Panel (config.PROFILING) ---
+# Spans of this rerun are recorded from here on; the panel shows the previous rerun's breakdown
+last_rerun = instrumentation.start_rerun(st.session_state)
+if instrumentation.enabled():
+    with st.sidebar.expander("⏱️ Performance", expanded=False):
+        if last_rerun is not None and last_rerun.spans:
+            st.caption(f"Last rerun: {last_rerun.ms:.1f} ms")
+            st.dataframe(last_rerun.breakdown(), hide_index=True)
+        else:
+            st.caption("No rerun recorded yet.")
+        st.caption(f"Rolling percentiles (last {config.PROFILE_WINDOW} calls per span):")
+        st.dataframe(instrumentation.percentiles(), hide_index=True)
+        st.caption(f"All spans are appended to {config.PROFILE_LOG}.")
+
+# --- Shared Rating Service ---
+# Ratings, metadata and their indexes live in one RatingService shared by all sessions of this
+# process; votes from every session are applied in order by its single writer thread
+@st.cache_resource
+def get_rating_service():
+    return RatingService()
+
+with span('app.load_service'): # Only slow on the first run of the process
+    service = get_rating_service()
+if service.movies_df.empty:
+    st.error("Initial movie data load failed. Cannot continue.")
+    get_rating_service.clear() # Retry the load on the next run
+    st.stop()
+if len(service) < 2:
+    st.warning("Not enough movies loaded to start comparisons.")
+    st.stop()
 
 # Initialize other session state variables
 if 'show_dashboard' not in st.session_state: st.session_state.show_dashboard = False
 if 'current_pair_titles' not in st.session_state: st.session_state.current_pair_titles = None
+if 'pair_queue' not in st.session_state: st.session_state.pair_queue = PairQueue() # Pre-drawn next pairs (posters prefetched)
+if 'session_id' not in st.session_state: st.session_state.session_id = uuid.uuid4().hex # Owner of this session's votes (undo)
+if 'seen_version' not in st.session_state: st.session_state.seen_version = service.version # Last vote the pair queue has seen
+
+# Poster thumbnails are cached on disk and shared by all sessions of this process
+@st.cache_resource
+def get_poster_cache():
+    return PosterCache()
+
+poster_cache = get_poster_cache()
+
+def reset_pairs():
+    """Drops the current and pre-drawn pairs (e.g. when the matchup genres change)."""
+    st.session_state.current_pair_titles = None
+    st.session_state.pair_queue.clear()
 
 # --- Main Logic ---
-# Get data from session state for use in the current run
-movies_df = st.session_state.movies_df
-meta_df = st.session_state.meta_df
+# Shared frames: read-only here, only the service's writer thread modifies them
+movies_df = service.movies_df
+meta_df = service.meta_df
 
 # --- Comparison Mode ---
 if not st.session_state.show_dashboard:
     st.header("🥊 Rate the Matchup!")
 
-    # Select a pair if none is currently selected
-    if st.session_state.current_pair_titles is None:
-        if len(movies_df) >= 2:
-             # Use the imported selection logic
-             title_a, title_b = select_movie_pair(movies_df, meta_df)
-             if title_a and title_b:
-                  st.session_state.current_pair_titles = (title_a, title_b)
-             else:
-                  st.error("Failed to select a valid movie pair. Please check data.")
-                  st.stop()
+    # Optional genre restriction for matchups (a new pair is drawn when it changes)
+    matchup_genres = st.multiselect("Only match movies from genres:", service.genre_index.genres, key="matchup_genres",
+                                    on_change=reset_pairs)
+    matchup_subset = service.genre_index.subset(matchup_genres) if matchup_genres else None
+    # Draws one pair from the shared selection state (used by the pair queue)
+    draw_pair = lambda: service.select_pair(matchup_subset)
+
+    with span('app.select_pair'):
+        # Queued pairs drawn before votes on their movies (from any session) are redrawn
+        st.session_state.seen_version, changed_titles = service.changed_since(st.session_state.seen_version)
+        if changed_titles is None:
+            st.session_state.pair_queue.clear()
         else:
-            st.warning("Need at least two movies to compare!")
-            st.stop()
+            st.session_state.pair_queue.invalidate(changed_titles, draw_pair)
+
+        # Select a pair if none is currently selected
+        if st.session_state.current_pair_titles is None:
+            if len(movies_df) >= 2:
+                 # Next queued pair (drawn and its posters prefetched while the previous one was shown)
+                 pair = st.session_state.pair_queue.pop(draw_pair)
+                 if pair:
+                      st.session_state.current_pair_titles = pair
+                 else:
+                      st.error("Failed to select a valid movie pair. Please check data.")
+                      st.stop()
+            else:
+                st.warning("Need at least two movies to compare!")
+                st.stop()
 
     # Get data for the current pair
     try:
@@ -71,10 +113,8 @@ if not st.session_state.show_dashboard:
         if title_a not in meta_df.index or title_b not in meta_df.index:
              raise KeyError(f"Title '{title_a}' or '{title_b}' not found in meta_df.")
 
-        movie_a = movies_df.loc[title_a]
-        movie_b = movies_df.loc[title_b]
-        meta_a = meta_df.loc[title_a]
-        meta_b = meta_df.loc[title_b]
+        with span('app.pair_rows'):
+            movie_a, movie_b, meta_a, meta_b = service.pair_rows(title_a, title_b)
 
     except KeyError as e: # Handle cases where data might be missing after loading
          st.error(f"Error accessing movie data or metadata: {e}. Reloading pair...")
@@ -86,28 +126,35 @@ if not st.session_state.show_dashboard:
          st.rerun()
 
     # --- Display Movies Side-by-Side ---
-    col_a, col_b = st.columns(2)
-    with col_a:
-        st.subheader(f"A: {movie_a['Title']}")
-        poster_a_url = movie_a.get('PosterURL', '')
-        # Display poster or placeholder
-        if isinstance(poster_a_url, str) and poster_a_url.startswith('http'):
-             st.image(poster_a_url, width=config.POSTER_WIDTH)
-        else:
-             st.markdown(f'<div style="height:{int(config.POSTER_WIDTH*1.5)}px; display:flex; align-items:center; justify-content:center; border:1px dashed gray; color:gray;">(No Poster)</div>', unsafe_allow_html=True)
-        st.caption(f"Genre: {movie_a.get('Genres', 'N/A')}")
-        st.caption(f"Rating: {movie_a.get('Rating', 'N/A')} | Comparisons: {int(meta_a.get('Comparisons', 0))}")
-
-    with col_b:
-        st.subheader(f"B: {movie_b['Title']}")
-        poster_b_url = movie_b.get('PosterURL', '')
-        # Display poster or placeholder
-        if isinstance(poster_b_url, str) and poster_b_url.startswith('http'):
-             st.image(poster_b_url, width=config.POSTER_WIDTH)
-        else:
-             st.markdown(f'<div style="height:{int(config.POSTER_WIDTH*1.5)}px; display:flex; align-items:center; justify-content:center; border:1px dashed gray; color:gray;">(No Poster)</div>', unsafe_allow_html=True)
-        st.caption(f"Genre: {movie_b.get('Genres', 'N/A')}")
-        st.caption(f"Rating: {movie_b.get('Rating', 'N/A')} | Comparisons: {int(meta_b.get('Comparisons', 0))}")
+    with span('app.render_pair'): # Includes loading the cached poster thumbnails
+        col_a, col_b = st.columns(2)
+        with col_a:
+            st.subheader(f"A: {movie_a['Title']}")
+            poster_a_url = movie_a.get('PosterURL', '')
+            # Display poster or placeholder
+            if isinstance(poster_a_url, str) and poster_a_url.startswith('http'):
+                 st.image(poster_cache.image_source(poster_a_url), width=config.POSTER_WIDTH) # Local thumbnail if cached
+            else:
+                 st.markdown(f'<div style="height:{int(config.POSTER_WIDTH*1.5)}px; display:flex; align-items:center; justify-content:center; border:1px dashed gray; color:gray;">(No Poster)</div>', unsafe_allow_html=True)
+            st.caption(f"Genre: {movie_a.get('Genres', 'N/A')}")
+            st.caption(f"Rating: {movie_a.get('Rating', 'N/A')} | Comparisons: {int(meta_a.get('Comparisons', 0))}")
+
+        with col_b:
+            st.subheader(f"B: {movie_b['Title']}")
+            poster_b_url = movie_b.get('PosterURL', '')
+            # Display poster or placeholder
+            if isinstance(poster_b_url, str) and poster_b_url.startswith('http'):
+                 st.image(poster_cache.image_source(poster_b_url), width=config.POSTER_WIDTH) # Local thumbnail if cached
+            else:
+                 st.markdown(f'<div style="height:{int(config.POSTER_WIDTH*1.5)}px; display:flex; align-items:center; justify-content:center; border:1px dashed gray; color:gray;">(No Poster)</div>', unsafe_allow_html=True)
+            st.caption(f"Genre: {movie_b.get('Genres', 'N/A')}")
+            st.caption(f"Rating: {movie_b.get('Rating', 'N/A')} | Comparisons: {int(meta_b.get('Comparisons', 0))}")
+
+    # Earlier meetings of this pair (repeats are only drawn when unseen opponents are scarce)
+    pair_record = service.pair_record(title_a, title_b)
+    if pair_record and pair_record['Fights']:
+        st.caption(f"Head-to-head so far: {pair_record['Fights']} fights, A won {pair_record['Wins']}, "
+                   f"B won {pair_record['Losses']}, {pair_record['Draws']} draws.")
 
     st.markdown("---") # Separator
 
@@ -125,39 +172,17 @@ if not st.session_state.show_dashboard:
     submit_col, skip_col = st.columns([3, 1]) # Adjust button width ratio if needed
     with submit_col:
         if st.button("Submit Result", key="submit", use_container_width=True):
-            # --- Perform Updates ---
-            # 1. Get comparison counts & determine K-Factor
-            comparisons_a = meta_a.get('Comparisons', 0)
-            comparisons_b = meta_b.get('Comparisons', 0)
-            k = get_k_factor(comparisons_a, comparisons_b) # From elo_logic
-
-            # 2. Update ELO ratings
-            new_rating_a, new_rating_b = update_elo(movie_a['Rating'], movie_b['Rating'], score_a, k) # From elo_logic
-            # Update DataFrames stored in session state
-            st.session_state.movies_df.loc[title_a, 'Rating'] = new_rating_a
-            st.session_state.movies_df.loc[title_b, 'Rating'] = new_rating_b
-
-            # 3. Update metadata (Comparisons, W/L/D)
-            st.session_state.meta_df.loc[title_a, 'Comparisons'] += 1
-            st.session_state.meta_df.loc[title_b, 'Comparisons'] += 1
-            if outcome == "Even / Tie":
-                st.session_state.meta_df.loc[title_a, 'Draws'] += 1
-                st.session_state.meta_df.loc[title_b, 'Draws'] += 1
-            elif outcome in ["A Much Better", "A Slightly Better"]:
-                st.session_state.meta_df.loc[title_a, 'Wins'] += 1
-                st.session_state.meta_df.loc[title_b, 'Losses'] += 1
-            elif outcome in ["B Much Better", "B Slightly Better"]:
-                st.session_state.meta_df.loc[title_a, 'Losses'] += 1
-                st.session_state.meta_df.loc[title_b, 'Wins'] += 1
-
-            # --- Logging & Saving ---
-            log_fight(movie_a['Title'], movie_b['Title'], outcome, score_a, config.FIGHTS_CSV) # From data_handler
+            # --- Apply the Vote ---
+            # The service's writer applies it to the current ratings (another session may have
+            # moved them since this pair was shown), logs the fight and saves the changed rows
+            try:
+                with span('app.vote'): # Waits for the writer thread to commit the vote
+                    service.vote(title_a, title_b, outcome, score_a, session=st.session_state.session_id)
+            except Exception as e:
+                st.error(f"Could not save the result: {e}")
+                st.stop()
             st.session_state.current_pair_titles = None # Ensure a new pair is selected next time
 
-            # Save updated data to files using functions from data_handler
-            save_movie_data(st.session_state.movies_df, config.MOVIES_CSV)
-            save_movie_metadata(st.session_state.meta_df, config.MOVIE_DATA_CSV)
-
             # Rerun the script to display the next pair
             st.rerun()
 
@@ -167,15 +192,58 @@ if not st.session_state.show_dashboard:
             st.session_state.current_pair_titles = None
             st.rerun()
 
+    # --- Undo / Redo Buttons ---
+    # Takes back this session's last committed vote or applies its last undone one again; votes
+    # of other sessions are never undone from here, so undo only works while the last vote is ours
+    session_id = st.session_state.session_id
+    last_done, last_undone = service.undo_status()
+    undo_col, redo_col = st.columns(2)
+    with undo_col:
+        if st.button("↩️ Undo last vote", key="undo", disabled=last_done is None, use_container_width=True,
+                     help=f"{last_done['a']} vs {last_done['b']}: {last_done['outcome']}" if last_done else None):
+            if last_done.get('session') != session_id:
+                st.info("The last vote was cast in another session; only your own last vote can be undone.")
+                st.stop()
+            try:
+                undone = service.undo(session=session_id)
+            except Exception as e:
+                st.error(f"Could not undo the vote: {e}")
+                st.stop()
+            if not undone:
+                st.warning("The last vote is no longer yours, or the ratings changed since (e.g. a reset); it cannot be undone.")
+                st.stop()
+            st.rerun()
+    with redo_col:
+        if st.button("↪️ Redo", key="redo", disabled=last_undone is None, use_container_width=True,
+                     help=f"{last_undone['a']} vs {last_undone['b']}: {last_undone['outcome']}" if last_undone else None):
+            if last_undone.get('session') != session_id:
+                st.info("The last undone vote was cast in another session; only your own votes can be redone.")
+                st.stop()
+            try:
+                redone = service.redo(session=session_id)
+            except Exception as e:
+                st.error(f"Could not redo the vote: {e}")
+                st.stop()
+            if not redone:
+                st.warning("The vote was redone elsewhere, or the ratings changed since it was undone; it cannot be redone.")
+                st.stop()
+            st.rerun()
+
     st.markdown("---")
     # --- Done Comparing Button ---
     if st.button("✅ Done Comparing (Show Dashboard)"):
         st.session_state.show_dashboard = True
-        # Save data one last time before switching view
-        save_movie_data(st.session_state.movies_df, config.MOVIES_CSV)
-        save_movie_metadata(st.session_state.meta_df, config.MOVIE_DATA_CSV)
+        # Make sure every submitted vote is committed before switching view
+        service.flush()
         st.rerun()
 
+    # Top up the pair queue after the page has been sent (off the click path) and download
+    # the queued pairs' posters in the background
+    with span('app.prefetch'):
+        st.session_state.pair_queue.fill(draw_pair)
+        if 'PosterURL' in movies_df.columns:
+            poster_cache.prefetch(movies_df.loc[st.session_state.pair_queue.titles(), 'PosterURL'].tolist())
+
 
 # --- Dashboard Mode ---
 else:
@@ -187,46 +255,59 @@ else:
         st.session_state.current_pair_titles = None # Clear current pair
         st.rerun()
 
-    # --- Prepare Data for Dashboard ---
-    # Ensure metadata is loaded correctly before joining
-    if 'meta_df' not in st.session_state or st.session_state.meta_df.empty:
-         st.warning("Metadata not loaded, attempting reload...")
-         if 'movies_df' in st.session_state and not st.session_state.movies_df.empty:
-              st.session_state.meta_df = load_movie_metadata(
-                  filename=config.MOVIE_DATA_CSV,
-                  movie_titles=st.session_state.movies_df.index.tolist()
-              )
-         else:
-             st.error("Cannot reload metadata as movie data is missing.")
-             st.stop() # Stop if essential data is missing
-
     # Proceed only if meta_df is valid
-    if not st.session_state.meta_df.empty:
-        # Join movie data with metadata
-        ranked_movies_base = st.session_state.movies_df.join(st.session_state.meta_df, how='left')
-        # Fill NaN stats with 0 and ensure integer type
-        stat_cols = ['Comparisons', 'Wins', 'Losses', 'Draws']
-        for col in stat_cols:
-            if col not in ranked_movies_base.columns: ranked_movies_base[col] = 0
-            else: ranked_movies_base[col] = ranked_movies_base[col].fillna(0).astype(int)
-        # Sort by Rating (ensure it's int first)
-        ranked_movies_base = ranked_movies_base.astype({'Rating': 'int'}).sort_values('Rating', ascending=False).reset_index(drop=True) # Drop old index
+    if not meta_df.empty:
+        # Rankings come from the shared materialized aggregates (kept up to date per vote, no re-join/re-sort)
+        with span('app.rankings'):
+            ranked_movies_base = service.ranked_view()
 
         # --- Search Filter ---
         st.subheader("🏆 Overall Rankings")
         search_term = st.text_input("Search Titles:", key="ranking_search")
-        # Apply filter
-        if search_term:
-            ranked_movies_filtered = ranked_movies_base[ranked_movies_base['Title'].str.contains(search_term, case=False, na=False)]
-        else:
-            ranked_movies_filtered = ranked_movies_base
+        genre_filter = st.multiselect("Filter by Genre:", service.genre_index.genres, key="ranking_genres")
+        # Apply filters (title search and genre filter use their indexes, no string scans)
+        with span('app.filter_rankings'):
+            if search_term:
+                matching_ids = service.search_index.search(search_term)
+                if genre_filter:
+                    matching_ids = matching_ids[service.genre_index.subset(genre_filter).mask[matching_ids]]
+                ranked_movies_filtered = service.ranked_rows(matching_ids)
+            elif genre_filter:
+                ranked_movies_filtered = service.ranked_view(service.genre_index.subset(genre_filter))
+            else:
+                ranked_movies_filtered = ranked_movies_base
 
         # --- Display Rankings Table ---
         display_cols = ['Title', 'Rating', 'Comparisons', 'Wins', 'Losses', 'Draws', 'Genres']
+        # Bootstrap rating / rank intervals, if computed for the current fight log (cached, see bootstrap.py)
+        rank_intervals = service.ranking_intervals()
+        if rank_intervals is not None:
+            ranked_movies_filtered = ranked_movies_filtered.join(rank_intervals, on='Title')
+            display_cols[2:2] = ['Rating Low', 'Rating High', 'Rank Best', 'Rank Worst']
         # Ensure all columns exist before displaying
         display_cols = [col for col in display_cols if col in ranked_movies_filtered.columns]
         st.dataframe(ranked_movies_filtered[display_cols])
-        st.caption(f"Showing {len(ranked_movies_filtered)} out of {len(ranked_movies_base)} movies.")
+        st.caption(f"Showing {len(ranked_movies_filtered)} out of {len(ranked_movies_base)} movies. "
+                   f"Total comparisons made: {service.totals()['fights']}.")
+
+        # --- Ranking Uncertainty ---
+        with st.expander("📏 Ranking uncertainty (bootstrap intervals)"):
+            intervals_job = service.rank_intervals
+            if intervals_job.running:
+                st.info("Computing bootstrap intervals in the background. Refresh the page in a while.")
+            elif rank_intervals is not None:
+                info = intervals_job.info
+                st.caption(f"{info['level']:.0%} intervals of each movie's rating and rank over {info['replicates']} "
+                           f"replays of the fight log resampled with replacement ({info['fights']} fights, computed "
+                           f"{datetime.fromtimestamp(info['time']):%Y-%m-%d %H:%M}). Later votes are not included.")
+            else:
+                st.caption("Resamples the fight log and replays it many times to show how certain each "
+                           "movie's rating and rank are. Large logs are faster with utils/bootstrap_rankings.py.")
+            if intervals_job.error:
+                st.error(f"Last run failed: {intervals_job.error}")
+            if st.button("Compute intervals", key="compute_intervals", disabled=intervals_job.running):
+                service.start_ranking_intervals()
+                st.rerun()
     else:
          st.error("Could not display rankings because metadata failed to load.")
 
@@ -234,30 +315,9 @@ else:
     # --- Display Genre Insights ---
     st.subheader("🎭 Insights by Genre")
     try:
-        # Use the main movies_df from session state for this calculation
-        # Reset index if 'Title' is the index, otherwise just copy
-        if isinstance(st.session_state.movies_df.index, pd.Index) and st.session_state.movies_df.index.name == 'Title':
-             movies_df_for_genre = st.session_state.movies_df.reset_index(drop=True)
-        else:
-             movies_df_for_genre = st.session_state.movies_df.copy()
-
-        # Ensure required columns exist in the copy
-        if 'Title' not in movies_df_for_genre.columns or 'Genres' not in movies_df_for_genre.columns or 'Rating' not in movies_df_for_genre.columns:
-             raise ValueError("Required columns missing for genre analysis.")
-
-        movies_df_for_genre['Genres'] = movies_df_for_genre['Genres'].fillna('').astype(str)
-        # Explode genres for analysis
-        genres_expanded = movies_df_for_genre.assign(Genre=movies_df_for_genre['Genres'].str.split('|')).explode('Genre')
-
-        # Clean up the resulting 'Genre' column
-        genres_expanded['Genre'] = genres_expanded['Genre'].str.strip()
-        genres_expanded = genres_expanded[(genres_expanded['Genre'] != '') & (genres_expanded['Genre'] != 'Unknown')]
-
-        if not genres_expanded.empty:
-            # Group by the new 'Genre' column and calculate stats
-            genre_stats = genres_expanded.groupby('Genre')['Rating'].agg(['mean', 'count']).sort_values(['mean', 'count'], ascending=False)
-            genre_stats.rename(columns={'mean': 'Average Rating', 'count': 'Movie Count'}, inplace=True)
-            genre_stats['Average Rating'] = genre_stats['Average Rating'].round(0).astype(int)
+        with span('app.genre_stats'):
+            genre_stats = service.genre_stats()
+        if not genre_stats.empty:
             # Display stats, optionally filter for genres with > 1 movie
             st.dataframe(genre_stats[genre_stats['Movie Count'] > 1])
         else:
@@ -268,16 +328,85 @@ else:
         # import traceback # Uncomment for detailed traceback during debugging
         # st.text(traceback.format_exc())
 
+    # --- Rating Trajectory ---
+    # One movie's fights, read from the trajectory index (cost follows its own fight count)
+    st.subheader("📈 Rating Trajectory")
+    trajectory_search = st.text_input("Find a movie:", key="trajectory_search")
+    if trajectory_search:
+        matching_ids = service.search_index.search(trajectory_search)[:50]
+        trajectory_titles = [service.store.titles[i] for i in matching_ids]
+        trajectory_title = st.selectbox("Movie:", trajectory_titles, key="trajectory_title") if trajectory_titles else None
+        if trajectory_title is None:
+            st.write("No matching movie.")
+        else:
+            with span('app.trajectory'):
+                trajectory_df = service.trajectory(trajectory_title)
+            if trajectory_df is None:
+                st.info("The rating trajectory index is still being built from the fight log. Check back in a moment.")
+            elif trajectory_df.empty:
+                st.write(f"{trajectory_title} has not been in a matchup yet.")
+            else:
+                st.line_chart(trajectory_df.set_index('Fight')[['Rating After']].rename(columns={'Rating After': 'Rating'}))
+                st.dataframe(trajectory_df.iloc[::-1], hide_index=True) # Most recent fight first
+                n_replayed = int((~trajectory_df['Live']).sum())
+                replayed_note = (f" {n_replayed} of them were indexed from the fight log alone (Live = False): their "
+                                 f"ratings are replayed from {config.DEFAULT_ELO} and can differ from the ones the "
+                                 f"rankings showed then." if n_replayed else "")
+                st.caption(f"{len(trajectory_df)} fights. Score is from {trajectory_title}'s side "
+                           f"(1.0 = much better, 0.0 = much worse); Fight # counts fights in the log.{replayed_note}")
+    else:
+        st.caption("Search for a movie to see how its rating evolved and who it was matched against.")
+
+    # --- Head-to-Head ---
+    # Record of two movies against each other, from the service's pair records (O(1) lookup)
+    st.subheader("🥊 Head-to-Head")
+    h2h_titles = []
+    h2h_cols = st.columns(2)
+    for side, h2h_col in zip(('a', 'b'), h2h_cols):
+        with h2h_col:
+            h2h_search = st.text_input(f"Movie {side.upper()}:", key=f"h2h_search_{side}")
+            h2h_matches = [service.store.titles[i] for i in service.search_index.search(h2h_search)[:50]] if h2h_search else []
+            h2h_titles.append(st.selectbox("Pick:", h2h_matches, key=f"h2h_title_{side}") if h2h_matches else None)
+    h2h_a, h2h_b = h2h_titles
+    if h2h_a and h2h_b and h2h_a != h2h_b:
+        h2h = service.pair_record(h2h_a, h2h_b)
+        if not h2h or not h2h['Fights']:
+            st.write(f"{h2h_a} and {h2h_b} have not been matched yet.")
+        else:
+            fights_col, wins_col, draws_col, losses_col, score_col = st.columns(5)
+            fights_col.metric("Fights", h2h['Fights'])
+            wins_col.metric("A Wins", h2h['Wins'])
+            draws_col.metric("Draws", h2h['Draws'])
+            losses_col.metric("B Wins", h2h['Losses'])
+            score_col.metric("Avg Score A", f"{h2h['Score'] / h2h['Fights']:.2f}")
+    else:
+        st.caption("Search for two different movies to see their record against each other.")
+
+    # --- Aggregates Consistency Check ---
+    with st.expander("🔍 Verify dashboard aggregates"):
+        if st.button("Run consistency check"):
+            problems = service.check_consistency() # Rebuilds the aggregates on mismatch
+            if problems:
+                st.error("Aggregates out of sync: " + "; ".join(problems) + ". Rebuilt.")
+            else:
+                st.success("Aggregates match a from-scratch computation.")
+
 
     # --- Display Comparison History ---
     st.subheader("📜 Comparison History")
     if os.path.exists(config.FIGHTS_CSV):
         try:
-            fights_df = pd.read_csv(config.FIGHTS_CSV)
+            # Page 1 = the 20 most recent fights; read from the end of the log, not the whole file
+            history_page_size = 20
+            history_page = st.number_input("History page (1 = most recent):", min_value=1, value=1, step=1, key="history_page")
+            fights_df = read_recent_fights(config.FIGHTS_CSV, n=history_page_size, skip=(history_page - 1) * history_page_size)
             # Display relevant columns based on current format
             display_hist_cols = ['Movie A', 'Movie B', 'Outcome', 'Score A']
             display_hist_cols = [col for col in display_hist_cols if col in fights_df.columns] # Filter existing columns
-            st.dataframe(fights_df[display_hist_cols].tail(20)) # Show last 20
+            if fights_df.empty:
+                st.write("No older comparisons.")
+            else:
+                st.dataframe(fights_df[display_hist_cols])
         except Exception as e:
             st.warning(f"Could not display comparison history: {e}")
     else:
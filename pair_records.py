@@ -0,0 +1,163 @@
+import numpy as np
+from replay import load_fight_log
+
+# Head-to-head records of every pair of movies that has been compared, keyed by integer movie
+# ids (RatingStore / PairSampler ids).
+# An open-addressing hash table (linear probing) over NumPy arrays: one int64 key per pair,
+# (lower id << 32) | higher id, and per slot the lower id's wins, the draws, the higher id's wins
+# and the summed Score A seen from the lower id's side: 28 bytes per slot, and the table doubles
+# when it is 70% full, so 40-80 bytes per pair (a dict of pair tuples takes ~270).
+# Looking up a pair or recording a vote probes a few slots: O(1) expected, which lets pair
+# selection check every candidate opponent against the pairs already seen. The table is built in
+# bulk from the fight log (np.unique over the pair keys, then a vectorized insert) and updated
+# per vote; an undone vote is taken back with count=-1 (its pair stays in the table at 0 fights).
+
+EMPTY = -1
+_HASH = 0x9E3779B97F4A7C15 # Fibonacci hashing: multiply, keep the top `bits` bits
+_MASK64 = (1 << 64) - 1
+_MAX_LOAD = 0.7
+
+
+def _outcome(score):
+    """0 for a win of the lower id, 1 for a draw, 2 for a win of the higher id."""
+    return 0 if score > 0.5 else 2 if score < 0.5 else 1
+
+
+class PairRecords:
+    """
+    Sparse W/D/L counts and summed Score A per compared pair of movie ids (see module comment).
+
+    Args:
+        capacity (int): Pairs the table holds before it first grows.
+    """
+
+    def __init__(self, capacity=0):
+        bits = 4
+        while (1 << bits) * _MAX_LOAD < capacity:
+            bits += 1
+        self._allocate(bits)
+
+    def _allocate(self, bits):
+        n = 1 << bits
+        self.bits = bits
+        self.shift = 64 - bits
+        self.mask = n - 1
+        self.size = 0 # Occupied slots
+        self.keys = np.full(n, EMPTY, dtype=np.int64)
+        self.counts = np.zeros((n, 3), dtype=np.int32) # Lower id's wins, draws, higher id's wins
+        self.score = np.zeros(n, dtype=np.float64) # Summed Score A of the lower id
+
+    @classmethod
+    def from_fights(cls, id_a, id_b, score_a):
+        """Builds the records of a fight log given as id arrays (see replay.load_fight_log)."""
+        id_a, id_b = np.asarray(id_a, dtype=np.int64), np.asarray(id_b, dtype=np.int64)
+        score_a = np.asarray(score_a, dtype=np.float64)
+        flip = id_a > id_b
+        keys = (np.minimum(id_a, id_b) << 32) | np.maximum(id_a, id_b)
+        score_lo = np.where(flip, 1.0 - score_a, score_a)
+        pairs, inverse = np.unique(keys, return_inverse=True)
+        outcome = np.where(score_lo > 0.5, 0, np.where(score_lo < 0.5, 2, 1))
+        counts = np.bincount(inverse * 3 + outcome, minlength=3 * len(pairs)).reshape(-1, 3)
+        records = cls(len(pairs))
+        records._insert(pairs, counts, np.bincount(inverse, weights=score_lo, minlength=len(pairs)))
+        return records
+
+    @classmethod
+    def from_log(cls, fights_csv, ids):
+        """
+        Builds the records of a fight log over a catalog's ids.
+
+        Args:
+            fights_csv (str): Path to head_to_head.csv.
+            ids (dict): title -> id (e.g. RatingStore.ids). Fights of other titles are skipped.
+        """
+        titles, id_a, id_b, score_a = load_fight_log(fights_csv)
+        lookup = np.array([ids.get(title, -1) for title in titles], dtype=np.int64)
+        a, b = lookup[id_a], lookup[id_b]
+        keep = (a >= 0) & (b >= 0) & (a != b)
+        return cls.from_fights(a[keep], b[keep], score_a[keep])
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.counts.nbytes + self.score.nbytes
+
+    def _slots(self, keys):
+        return ((keys.astype(np.uint64) * np.uint64(_HASH)) >> np.uint64(self.shift)).astype(np.int64)
+
+    def _insert(self, keys, counts, score):
+        """Inserts distinct keys that are not in the table yet (vectorized: one round per probe step)."""
+        slots = self._slots(keys)
+        pending = np.arange(len(keys))
+        while pending.size:
+            free = self.keys[slots[pending]] == EMPTY
+            # One key per free slot wins it; the others probe the next slot
+            _, first = np.unique(slots[pending[free]], return_index=True)
+            placed = pending[free][first]
+            self.keys[slots[placed]] = keys[placed]
+            self.counts[slots[placed]] = counts[placed]
+            self.score[slots[placed]] = score[placed]
+            left = np.ones(len(pending), dtype=bool)
+            left[np.flatnonzero(free)[first]] = False
+            pending = pending[left]
+            slots[pending] = (slots[pending] + 1) & self.mask
+        self.size += len(keys)
+
+    def _grow(self):
+        used = self.keys != EMPTY
+        keys, counts, score = self.keys[used], self.counts[used], self.score[used]
+        self._allocate(self.bits + 1)
+        self._insert(keys, counts, score)
+
+    def _find(self, key):
+        """The slot holding key, or the empty slot it would go into."""
+        keys, mask = self.keys, self.mask
+        i = ((key * _HASH) & _MASK64) >> self.shift
+        while True:
+            k = keys[i]
+            if k == key or k == EMPTY:
+                return i
+            i = (i + 1) & mask
+
+    def add(self, a, b, score_a, count=1):
+        """Records a fight of ids a and b (count=-1 takes one back, e.g. an undone vote)."""
+        lo, hi, score = (a, b, score_a) if a < b else (b, a, 1.0 - score_a)
+        key = (int(lo) << 32) | int(hi)
+        i = self._find(key)
+        if self.keys[i] == EMPTY:
+            if count < 0:
+                return
+            if self.size + 1 > _MAX_LOAD * len(self.keys):
+                self._grow()
+                i = self._find(key)
+            self.keys[i] = key
+            self.size += 1
+        self.counts[i, _outcome(score)] += count
+        self.score[i] += count * score
+
+    def fights(self, a, b):
+        """Number of fights between ids a and b (0 if they never met)."""
+        lo, hi = (a, b) if a < b else (b, a)
+        key = (int(lo) << 32) | int(hi)
+        i = self._find(key)
+        return 0 if self.keys[i] == EMPTY else sum(self.counts[i].tolist())
+
+    def record(self, a, b):
+        """
+        Head-to-head record of id a against id b.
+
+        Returns:
+            dict: Fights, Wins, Draws and Losses of a, and Score (a's summed Score A).
+        """
+        lo, hi = (a, b) if a < b else (b, a)
+        key = (int(lo) << 32) | int(hi)
+        i = self._find(key)
+        if self.keys[i] == EMPTY:
+            return {'Fights': 0, 'Wins': 0, 'Draws': 0, 'Losses': 0, 'Score': 0.0}
+        won_lo, draws, won_hi = self.counts[i].tolist()
+        fights, score = won_lo + draws + won_hi, float(self.score[i])
+        if a < b:
+            return {'Fights': fights, 'Wins': won_lo, 'Draws': draws, 'Losses': won_hi, 'Score': score}
+        return {'Fights': fights, 'Wins': won_hi, 'Draws': draws, 'Losses': won_lo, 'Score': fights - score}
@@ -0,0 +1,175 @@
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from PIL import Image
+import config
+
+# Local poster thumbnail cache.
+# Posters are downloaded once, resized to config.POSTER_WIDTH and stored content-addressed
+# (file name = SHA-256 of the thumbnail bytes) under config.POSTER_CACHE_DIR, with an
+# index mapping poster URL -> digest. Least recently used thumbnails (last use recorded at most
+# every TOUCH_AFTER seconds per poster) are evicted once the cache exceeds its size budget.
+# Upcoming posters can be prefetched in the background; a render never downloads: it shows the
+# remote URL of a poster that is not cached yet and queues it.
+
+DOWNLOAD_TIMEOUT = 10 # Seconds per poster download
+RETRY_FAILED_AFTER = 300 # Seconds before a poster that failed to download is tried again
+TOUCH_AFTER = 60 # Seconds before a cached poster's LRU time is updated again (each update is a write)
+
+
+class PosterCache:
+    """
+    Content-addressed, size-bounded (LRU) on-disk cache of resized poster thumbnails.
+
+    Args:
+        cache_dir (str): Directory for thumbnails and the index database.
+        width (int): Thumbnail width in pixels (aspect ratio is kept).
+        max_bytes (int): Size budget for stored thumbnails.
+        workers (int): Background download threads used by prefetch().
+    """
+
+    def __init__(self, cache_dir=config.POSTER_CACHE_DIR, width=config.POSTER_WIDTH,
+                 max_bytes=config.POSTER_CACHE_MAX_MB * 1024 * 1024, workers=4):
+        self.cache_dir = cache_dir
+        self.width = width
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(cache_dir, 'index.db'), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, size INTEGER NOT NULL, last_used REAL NOT NULL)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, digest TEXT NOT NULL)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_blobs_used ON blobs(last_used)')
+        self.total_bytes = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+        self.session = requests.Session()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='poster-prefetch')
+        self.in_flight = set()
+        self.failed = {} # url -> time of last failed download (kept in memory only; lock held)
+
+    def _blob_path(self, digest):
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.jpg")
+
+    def get(self, url):
+        """Local thumbnail path for a poster URL, or None if it is not cached yet."""
+        with self.lock:
+            row = self.conn.execute('SELECT urls.digest, blobs.last_used FROM urls LEFT JOIN blobs USING (digest) '
+                                    'WHERE url = ?', (url,)).fetchone()
+            if row is None:
+                return None
+            digest, last_used = row
+            path = self._blob_path(digest)
+            if not os.path.exists(path): # Removed behind our back: forget it
+                with self.conn:
+                    self.conn.execute('DELETE FROM urls WHERE url = ?', (url,))
+                return None
+            now = time.time()
+            if last_used is None or now - last_used > TOUCH_AFTER: # Renders mostly just read
+                with self.conn:
+                    self.conn.execute('UPDATE blobs SET last_used = ? WHERE digest = ?', (now, digest))
+            return path
+
+    def fetch(self, url):
+        """
+        Downloads, resizes and stores a poster. Returns the local path, or None on failure (or if
+        another thread is downloading it, or it failed less than RETRY_FAILED_AFTER seconds ago).
+        """
+        path = self.get(url)
+        if path is not None or not self._claim(url):
+            return path
+        return self._download(url)
+
+    def _claim(self, url):
+        """Marks a poster as being downloaded, unless it already is or failed recently. Returns True if claimed."""
+        with self.lock:
+            if url in self.in_flight or time.time() - self.failed.get(url, 0) < RETRY_FAILED_AFTER:
+                return False
+            self.in_flight.add(url)
+            return True
+
+    def _download(self, url):
+        """Downloads a poster claimed with _claim (released when done). Returns the local path, or None."""
+        try:
+            path = self.get(url) # Cached since it was claimed (e.g. queued by prefetch)
+            return path if path is not None else self._store(url)
+        finally:
+            with self.lock:
+                self.in_flight.discard(url)
+
+    def _store(self, url):
+        try:
+            response = self.session.get(url, timeout=DOWNLOAD_TIMEOUT)
+            response.raise_for_status()
+            image = Image.open(io.BytesIO(response.content)).convert('RGB')
+            if image.width > self.width:
+                image = image.resize((self.width, round(image.height * self.width / image.width)), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', quality=85)
+            data = buffer.getvalue()
+        except Exception as e:
+            print(f"Could not cache poster '{url}': {e}")
+            with self.lock:
+                self.failed[url] = time.time()
+            return None
+
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        with self.lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path) # Atomic: readers never see a partial file
+            with self.conn:
+                inserted = self.conn.execute('INSERT OR IGNORE INTO blobs (digest, size, last_used) VALUES (?, ?, ?)',
+                                             (digest, len(data), time.time())).rowcount
+                self.conn.execute('INSERT OR REPLACE INTO urls (url, digest) VALUES (?, ?)', (url, digest))
+            if inserted:
+                self.total_bytes += len(data)
+            self._evict(keep=digest)
+            self.failed.pop(url, None)
+        return path
+
+    def _evict(self, keep=None):
+        """Drops least recently used thumbnails until the cache fits its budget (lock held)."""
+        while self.total_bytes > self.max_bytes:
+            row = self.conn.execute('SELECT digest, size FROM blobs WHERE digest != ? ORDER BY last_used LIMIT 1',
+                                    (keep or '',)).fetchone()
+            if row is None:
+                break
+            digest, size = row
+            with self.conn:
+                self.conn.execute('DELETE FROM blobs WHERE digest = ?', (digest,))
+                self.conn.execute('DELETE FROM urls WHERE digest = ?', (digest,))
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                pass
+            self.total_bytes -= size
+
+    def prefetch(self, urls):
+        """Queues background downloads for posters not cached or already being fetched."""
+        for url in urls:
+            if isinstance(url, str) and self.get(url) is None:
+                self._queue(url)
+
+    def _queue(self, url):
+        """Queues the download of a poster known not to be cached (unless it is being fetched)."""
+        if url.startswith('http') and self._claim(url):
+            self.pool.submit(self._download, url)
+
+    def image_source(self, url):
+        """
+        What to pass to st.image: the local thumbnail if it is cached, else the remote URL
+        (the poster is then queued for download, so a later render gets the thumbnail).
+        """
+        path = self.get(url)
+        if path is None and isinstance(url, str):
+            self._queue(url)
+        return path or url
@@ -0,0 +1,234 @@
+import math
+import numpy as np
+import pandas as pd
+import config
+from replay import load_fight_log, replay_elo
+
+# Alternative rating engines fitted from the head_to_head.csv fight log.
+# 'elo'           : sequential ELO replay (replay.py), the same updates the app makes per vote.
+# 'bradley_terry' : order-independent maximum-likelihood fit of P(A beats B) = p_A / (p_A + p_B)
+#                   over all fights at once; fractional Score A values count as partial wins.
+# 'glicko2'       : sequential Glicko-2, tracking a rating deviation (RD) and volatility per movie.
+# All engines report ratings on the ELO scale (DEFAULT_ELO = average movie, 400 points = 10:1 odds),
+# so their rankings are directly comparable and the app's live ELO updates can continue from them.
+
+ENGINES = ['elo', 'bradley_terry', 'glicko2']
+
+_GLICKO_SCALE = 400 / math.log(10) # 173.7178: ELO points per Glicko-2 internal unit (and per BT log-strength)
+_BT_MAX_STEP = 4.0 # Largest log-strength change per Newton step (guards the first steps on lopsided data)
+
+
+# --- Bradley-Terry ---
+def pair_counts(id_a, id_b, score_a):
+    """
+    Collapses fights into one row per unordered movie pair.
+
+    Returns:
+        tuple: (i, j, games, wins_i) arrays with i < j, where games is the number of fights
+               between i and j and wins_i the total Score of i in those fights.
+    """
+    id_a = np.asarray(id_a, dtype=np.int64)
+    id_b = np.asarray(id_b, dtype=np.int64)
+    swap = id_a > id_b
+    i = np.where(swap, id_b, id_a)
+    j = np.where(swap, id_a, id_b)
+    score_i = np.where(swap, 1.0 - score_a, score_a)
+    width = int(j.max(initial=0)) + 1
+    keys, inverse = np.unique(i * width + j, return_inverse=True)
+    games = np.bincount(inverse, minlength=len(keys)).astype(np.float64)
+    wins_i = np.bincount(inverse, weights=score_i, minlength=len(keys))
+    return keys // width, keys % width, games, wins_i
+
+
+def fit_bradley_terry(id_a, id_b, score_a, n_movies, prior=config.BT_PRIOR, max_iter=config.BT_MAX_ITER,
+                      tol=config.BT_TOL):
+    """
+    Maximum-likelihood Bradley-Terry log-strengths via Newton iterations.
+
+    The Hessian of the log-likelihood is a weighted graph Laplacian over the distinct movie
+    pairs, so each Newton step is solved with Jacobi-preconditioned conjugate gradients whose
+    matrix-vector products are vectorized passes over the pair arrays: cost and memory scale
+    with the number of pairs, not fights, and no dense matrix is built. Every movie also plays
+    `prior` virtual draws against a reference movie of strength 1: this keeps movies that won
+    (or lost) every fight finite and pins the scale, so strength 1 maps to DEFAULT_ELO.
+
+    Args:
+        id_a, id_b (np.ndarray): Integer movie ids for each fight.
+        score_a (np.ndarray): Score A for each fight (1.0 = A much better ... 0.0 = B much better).
+        n_movies (int): Number of distinct movie ids.
+        prior (float): Virtual draws per movie against the reference movie.
+        max_iter (int): Newton iteration cap.
+        tol (float): Stop once no log-strength moves by more than this.
+
+    Returns:
+        tuple: (ratings, iterations) - float64 ELO-scale ratings and the Newton iterations used.
+    """
+    i, j, games, wins_i = pair_counts(id_a, id_b, score_a)
+    wins = (np.bincount(i, weights=wins_i, minlength=n_movies)
+            + np.bincount(j, weights=games - wins_i, minlength=n_movies) + prior * 0.5)
+    log_p = np.zeros(n_movies)
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        p_ij = 1.0 / (1.0 + np.exp(log_p[j] - log_p[i])) # P(i beats j)
+        p_ref = 1.0 / (1.0 + np.exp(-log_p))              # P(movie beats the reference movie)
+        gradient = (wins - np.bincount(i, weights=games * p_ij, minlength=n_movies)
+                    - np.bincount(j, weights=games * (1.0 - p_ij), minlength=n_movies) - prior * p_ref)
+        weight = games * p_ij * (1.0 - p_ij)
+        diag = (np.bincount(i, weights=weight, minlength=n_movies)
+                + np.bincount(j, weights=weight, minlength=n_movies) + prior * p_ref * (1.0 - p_ref))
+        step = _solve_laplacian(i, j, weight, diag, gradient)
+        np.clip(step, -_BT_MAX_STEP, _BT_MAX_STEP, out=step)
+        log_p += step
+        if np.abs(step).max(initial=0.0) < tol:
+            break
+    return config.DEFAULT_ELO + _GLICKO_SCALE * log_p, iterations
+
+
+def _solve_laplacian(i, j, weight, diag, rhs, rtol=1e-2, max_iter=500):
+    """Jacobi-preconditioned conjugate gradients for (diag - pair weights) x = rhs."""
+    n = len(diag)
+
+    def matvec(x):
+        return (diag * x - np.bincount(i, weights=weight * x[j], minlength=n)
+                - np.bincount(j, weights=weight * x[i], minlength=n))
+
+    x = np.zeros(n)
+    residual = rhs.copy()
+    z = residual / diag
+    direction = z.copy()
+    rz = residual @ z
+    target = rtol * np.sqrt(rhs @ rhs)
+    for _ in range(max_iter):
+        if np.sqrt(residual @ residual) <= target:
+            break
+        product = matvec(direction)
+        alpha = rz / (direction @ product)
+        x += alpha * direction
+        residual -= alpha * product
+        z = residual / diag
+        rz, rz_old = residual @ z, rz
+        direction = z + (rz / rz_old) * direction
+    return x
+
+
+# --- Glicko-2 ---
+def _g(phi):
+    return 1.0 / math.sqrt(1.0 + 3.0 * phi * phi / (math.pi * math.pi))
+
+
+def _volatility(phi, sigma, v, delta, tau, eps=1e-6):
+    """New volatility (Glickman's step 5, Illinois algorithm)."""
+    a = math.log(sigma * sigma)
+    phi2 = phi * phi
+
+    def f(x):
+        ex = math.exp(x)
+        return ex * (delta * delta - phi2 - v - ex) / (2.0 * (phi2 + v + ex) ** 2) - (x - a) / (tau * tau)
+
+    big_a = a
+    if delta * delta > phi2 + v:
+        big_b = math.log(delta * delta - phi2 - v)
+    else:
+        k = 1
+        while f(a - k * tau) < 0:
+            k += 1
+        big_b = a - k * tau
+    f_a, f_b = f(big_a), f(big_b)
+    while abs(big_b - big_a) > eps:
+        c = big_a + (big_a - big_b) * f_a / (f_b - f_a)
+        f_c = f(c)
+        if f_c * f_b <= 0:
+            big_a, f_a = big_b, f_b
+        else:
+            f_a /= 2.0
+        big_b, f_b = c, f_c
+    return math.exp(big_a / 2.0)
+
+
+def glicko2_update(mu, phi, sigma, mu_opp, phi_opp, score, tau=config.GLICKO_TAU):
+    """
+    One Glicko-2 update of a player after a single game (internal scale).
+
+    Returns:
+        tuple: (mu, phi, sigma) after the game.
+    """
+    g = _g(phi_opp)
+    expected = 1.0 / (1.0 + math.exp(-g * (mu - mu_opp)))
+    v = 1.0 / (g * g * expected * (1.0 - expected))
+    delta = v * g * (score - expected)
+    sigma = _volatility(phi, sigma, v, delta, tau)
+    phi_star = math.sqrt(phi * phi + sigma * sigma)
+    phi = 1.0 / math.sqrt(1.0 / (phi_star * phi_star) + 1.0 / v)
+    return mu + phi * phi * g * (score - expected), phi, sigma
+
+
+def replay_glicko2(id_a, id_b, score_a, n_movies, rd=config.GLICKO_RD, volatility=config.GLICKO_VOLATILITY,
+                   tau=config.GLICKO_TAU):
+    """
+    Replays fights in log order with Glicko-2, each fight being its own rating period.
+
+    Both movies are updated from their pre-fight values. RD never grows past the starting `rd`.
+
+    Returns:
+        dict: 'Rating' and 'RD' (ELO scale) and 'Volatility' -> float64 arrays of length n_movies.
+    """
+    max_phi = rd / _GLICKO_SCALE
+    mu = [0.0] * n_movies
+    phi = [max_phi] * n_movies
+    sigma = [volatility] * n_movies
+    for a, b, s in zip(np.asarray(id_a).tolist(), np.asarray(id_b).tolist(), np.asarray(score_a).tolist()):
+        mu_a, phi_a, sigma_a = mu[a], phi[a], sigma[a]
+        mu_b, phi_b, sigma_b = mu[b], phi[b], sigma[b]
+        mu[a], phi[a], sigma[a] = glicko2_update(mu_a, phi_a, sigma_a, mu_b, phi_b, s, tau)
+        mu[b], phi[b], sigma[b] = glicko2_update(mu_b, phi_b, sigma_b, mu_a, phi_a, 1.0 - s, tau)
+        phi[a] = min(phi[a], max_phi)
+        phi[b] = min(phi[b], max_phi)
+    return {
+        'Rating': config.DEFAULT_ELO + _GLICKO_SCALE * np.asarray(mu, dtype=np.float64),
+        'RD': _GLICKO_SCALE * np.asarray(phi, dtype=np.float64),
+        'Volatility': np.asarray(sigma, dtype=np.float64),
+    }
+
+
+# --- Fitting from the fight log ---
+def fit_fights(id_a, id_b, score_a, n_movies, engine=config.RATING_ENGINE):
+    """
+    Runs one engine over fight id arrays.
+
+    Returns:
+        dict: 'Rating' -> int64 array, plus 'RD' / 'Volatility' for glicko2.
+    """
+    if engine == 'elo':
+        return {'Rating': replay_elo(id_a, id_b, score_a, n_movies)['Rating']}
+    if engine == 'bradley_terry':
+        ratings, _ = fit_bradley_terry(id_a, id_b, score_a, n_movies)
+        return {'Rating': np.rint(ratings).astype(np.int64)}
+    if engine == 'glicko2':
+        state = replay_glicko2(id_a, id_b, score_a, n_movies)
+        state['Rating'] = np.rint(state['Rating']).astype(np.int64)
+        return state
+    raise ValueError(f"Unknown rating engine '{engine}' (expected one of {ENGINES}).")
+
+
+def fit_ratings(filename=config.FIGHTS_CSV, movie_titles=None, engine=config.RATING_ENGINE):
+    """
+    Fits ratings from the fight log with the given engine.
+
+    Args:
+        filename (str): Path to head_to_head.csv.
+        movie_titles (list, optional): Catalog titles. If given, results are aligned to this
+            list (unseen movies get DEFAULT_ELO, unknown titles are dropped).
+        engine (str): One of ENGINES (defaults to config.RATING_ENGINE).
+
+    Returns:
+        pd.DataFrame: Rating (plus RD / Volatility for glicko2), indexed by Title.
+    """
+    titles, id_a, id_b, score_a = load_fight_log(filename)
+    fitted = pd.DataFrame(fit_fights(id_a, id_b, score_a, len(titles), engine), index=pd.Index(titles, name='Title'))
+    if movie_titles is not None:
+        fitted = fitted.reindex(movie_titles)
+        fitted['Rating'] = fitted['Rating'].fillna(config.DEFAULT_ELO).astype(int)
+        if 'RD' in fitted:
+            fitted = fitted.fillna({'RD': config.GLICKO_RD, 'Volatility': config.GLICKO_VOLATILITY})
+        fitted.index.name = 'Title'
+    return fitted
@@ -0,0 +1,621 @@
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+import pandas as pd
+import config
+from elo_logic import record_result, get_k_factor
+from data_handler import log_fights, retract_last_fight
+from storage import get_storage, JournaledStorage, META_COLS
+from rating_store import RatingStore
+from aggregates import DashboardAggregates
+from instrumentation import timed
+from checkpoints import Checkpoints
+from genre_index import GenreIndex
+from search_index import TitleSearchIndex
+from selection_logic import select_movie_pair, PairSampler, RatingIndex
+from undo_journal import UndoJournal, undo_journal_path, STATE_COLS
+from trajectory import TrajectoryIndex
+from pair_records import PairRecords
+from bootstrap import RankIntervals
+
+# Shared rating state for all sessions of the app (one instance per process, see
+# movie_elo_app.get_rating_service). Votes are applied by a single writer thread, in
+# submission order, against the current ratings, so concurrent voters never overwrite each
+# other's updates. Votes queued while a commit is running are applied and committed
+# together: one fight-log append and one storage write per batch.
+# Readers take the same lock the writer holds while applying a batch and until that batch is
+# persisted (or journaled) or rolled back, so every read sees the committed state between two
+# batches: never half a vote, nor votes that are later taken back.
+# In write-behind mode (config.WRITE_BEHIND) a batch is only fsync'd to the vote journal before
+# the voters are answered; the fight log and tables are written every FLUSH_VOTES votes or
+# FLUSH_SECONDS seconds, and on close(). A batch that cannot be written (or journaled) is rolled
+# back: its movies get their values from before the batch again and its logged rows are removed.
+# Ratings and W/L/D counts live in a RatingStore (NumPy arrays by movie id); movies_df and
+# meta_df are zero-copy frame views over it for the dashboard and the storage backends.
+# Rating checkpoints of the fight log (checkpoints.py) are written by a background thread at
+# startup and whenever another CHECKPOINT_EVERY fights have been logged.
+# Committed votes are recorded with their before/after values in an UndoJournal; undo() and
+# redo() are queued like votes and run by the writer, which sets those values back (or again)
+# and takes the vote's row off the end of the fight log (or appends it again). Entries record the
+# app session that cast the vote; a session can only undo (or redo) while the top entry is its own.
+# The fight log's TrajectoryIndex (trajectory.py) is built in the background at startup and then
+# follows the log as votes are logged; the writer hands it the before / after ratings of the
+# votes it logs (from their undo history entries), so their records hold the ratings it applied.
+# Head-to-head records of every compared pair (PairRecords, keyed by store ids) are built from the
+# fight log at startup and updated per applied vote (and undo / redo); pair selection uses them to
+# avoid repeat matchups.
+# Bootstrap rating / rank intervals (bootstrap.py) are read from their cache next to the log and
+# recomputed on request by a background thread (which runs the replicates in a process pool).
+
+
+class _Command:
+    """An undo / redo request, queued for the writer thread like a vote."""
+
+    def __init__(self, action, n, session=None):
+        self.action = action
+        self.n = n
+        self.session = session
+        self.future = Future()
+
+
+class RatingService:
+    """
+    Single-writer rating service shared by all sessions.
+
+    Args:
+        storage: Storage backend (defaults to config.STORAGE_BACKEND).
+        fights_csv (str): Fight log to append votes to.
+        batch_size (int): Max votes applied and committed together.
+        batch_wait (float): Seconds the writer waits for more votes before committing a batch.
+        write_behind (bool): Journal votes and flush the tables in groups (see config.WRITE_BEHIND).
+        flush_votes (int): Write-behind: flush after this many journaled votes.
+        flush_seconds (float): Write-behind: flush journaled votes at least this often.
+    """
+
+    def __init__(self, storage=None, fights_csv=config.FIGHTS_CSV, batch_size=config.SERVICE_BATCH_SIZE,
+                 batch_wait=config.SERVICE_BATCH_WAIT, write_behind=config.WRITE_BEHIND,
+                 flush_votes=config.FLUSH_VOTES, flush_seconds=config.FLUSH_SECONDS):
+        storage = storage or get_storage(write_behind=write_behind)
+        if write_behind and not isinstance(storage, JournaledStorage):
+            storage = JournaledStorage(storage, fights_csv=fights_csv)
+        self.storage = storage
+        self.fights_csv = fights_csv
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.write_behind = write_behind
+        self.flush_votes = flush_votes
+        self.flush_seconds = flush_seconds
+        self.unflushed = [] # Write-behind: journal entries not yet written to the tables
+        self.unflushed_history = [] # ... and their undo history entries (for the trajectory index)
+        self.flush_deadline = None
+        self.lock = threading.RLock()
+        movies_df = self.storage.load_movies()
+        if movies_df.empty:
+            meta_df = pd.DataFrame(columns=['Title'] + META_COLS).set_index('Title')
+        else:
+            meta_df = self.storage.load_metadata(movie_titles=movies_df.index.tolist())
+        self.catalog = movies_df.drop(columns='Rating') # Static columns (Genres, PosterURL, ...)
+        self.store = RatingStore.from_frames(movies_df, meta_df)
+        # Metadata rows of titles no longer in the catalog: kept so saving meta_df preserves them
+        self.orphan_meta = meta_df[~meta_df.index.isin(movies_df.index)]
+        self._build_indexes()
+        self.version = 0 # Votes applied since start
+        self.changes = deque(maxlen=config.SERVICE_CHANGE_LOG) # (version, title_a, title_b) of recent votes
+        self.batches = 0
+        self.votes = queue.Queue()
+        self.checkpoints = Checkpoints(fights_csv) if config.CHECKPOINT_EVERY else None
+        self.checkpoint_thread = None
+        self.logged_since_checkpoint = 0
+        self._checkpoint()
+        self.undo_journal = UndoJournal(undo_journal_path(fights_csv), config.UNDO_DEPTH) if config.UNDO_DEPTH else None
+        self.trajectories = TrajectoryIndex(fights_csv) if config.TRAJECTORY_INDEX else None
+        if self.trajectories is not None:
+            self.trajectories.update_async()
+        self.rank_intervals = RankIntervals(fights_csv)
+        self.writer = threading.Thread(target=self._run, name='rating-writer', daemon=True)
+        self.writer.start()
+
+    def _build_indexes(self):
+        """(Re)builds the derived structures from the catalog and the rating store."""
+        self.genre_index = GenreIndex.from_frame(self.catalog)
+        self.search_index = TitleSearchIndex.from_frame(self.catalog)
+        self.sampler = PairSampler.from_store(self.store)
+        self.rating_index = RatingIndex.from_store(self.store)
+        self.aggregates = DashboardAggregates(self.store, self.catalog, genre_index=self.genre_index)
+        self.pairs = PairRecords.from_log(self.fights_csv, self.store.ids)
+
+    @property
+    def movies_df(self):
+        """The movies table (catalog columns + Rating) as a view over the store."""
+        return self.store.movies_frame(self.catalog)
+
+    @property
+    def meta_df(self):
+        """The metadata table (Comparisons / Wins / Losses / Draws) as a view over the store."""
+        meta_df = self.store.stats_frame()
+        if not self.orphan_meta.empty:
+            meta_df = pd.concat([meta_df, self.orphan_meta[META_COLS]])
+        return meta_df
+
+    def __len__(self):
+        return len(self.store)
+
+    # --- Writes ---
+    def submit(self, title_a, title_b, outcome, score_a, session=None):
+        """
+        Queues a vote, cast by app session `session` (recorded for undo). The returned Future
+        resolves to (new_rating_a, new_rating_b) once the vote has been applied and committed,
+        or raises if it could not be.
+        """
+        future = Future()
+        self.votes.put((title_a, title_b, outcome, score_a, future, session))
+        return future
+
+    def vote(self, title_a, title_b, outcome, score_a, session=None, timeout=30):
+        """Submits a vote and waits for its commit. Returns (new_rating_a, new_rating_b)."""
+        return self.submit(title_a, title_b, outcome, score_a, session).result(timeout)
+
+    def undo(self, n=1, session=None, timeout=30):
+        """
+        Undoes the last n committed votes, newest first: ratings and W/L/D counts go back to
+        their values before each vote and its fight log row is removed. With a session, only
+        that session's votes are undone, stopping at the first vote cast by another one.
+
+        Returns:
+            list: (title_a, title_b) of the votes undone, newest first; fewer than n (possibly
+                none) if the undo history is shorter, no longer matches the ratings or its
+                next vote belongs to another session.
+        """
+        return self._queue_command('undo', n, session).result(timeout)
+
+    def redo(self, n=1, session=None, timeout=30):
+        """Applies the last n undone votes (of `session`, see undo) again. Returns their (title_a, title_b), in redo order."""
+        return self._queue_command('redo', n, session).result(timeout)
+
+    def undo_status(self):
+        """(vote undo() would take back, vote redo() would apply) as undo journal entries, or None."""
+        if self.undo_journal is None:
+            return None, None
+        return self.undo_journal.last_done(), self.undo_journal.last_undone()
+
+    def _queue_command(self, action, n, session=None):
+        command = _Command(action, n, session)
+        self.votes.put(command)
+        return command.future
+
+    def flush(self):
+        """Blocks until every vote submitted so far has been committed."""
+        self.votes.join()
+
+    def close(self):
+        """Commits pending votes (flushing them to the tables) and stops the writer thread."""
+        self.votes.put(None)
+        self.writer.join()
+        if self.checkpoint_thread is not None:
+            self.checkpoint_thread.join()
+        if self.trajectories is not None and self.trajectories.thread is not None:
+            self.trajectories.thread.join()
+
+    def _run(self):
+        while True:
+            try:
+                # Write-behind: wake up in time to flush journaled votes that are getting old
+                timeout = max(self.flush_deadline - time.monotonic(), 0) if self.flush_deadline else None
+                first = self.votes.get(timeout=timeout)
+            except queue.Empty:
+                self._flush()
+                continue
+            if first is None:
+                self._flush()
+                self.votes.task_done()
+                return
+            if isinstance(first, _Command):
+                self._run_command(first)
+                self.votes.task_done()
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.batch_wait
+            stop = False
+            command = None # An undo / redo queued behind the batch's votes runs right after it
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.votes.get(timeout=max(deadline - time.monotonic(), 0)) if self.batch_wait else self.votes.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                if isinstance(item, _Command):
+                    command = item
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if command is not None:
+                self._run_command(command)
+            if stop:
+                self._flush()
+            for _ in range(len(batch) + stop + (command is not None)):
+                self.votes.task_done()
+            if stop:
+                return
+
+    def _apply(self, title_a, title_b, outcome, score_a):
+        """Applies one vote to the in-memory state (lock held). Returns the new ratings."""
+        if outcome not in config.SCORE_MAP:
+            raise KeyError(f"Unknown outcome '{outcome}'.")
+        store = self.store
+        id_a, id_b = store.ids[title_a], store.ids[title_b]
+        new_rating_a, new_rating_b = record_result(store, id_a, id_b, score_a)
+        for title, i, rating in ((title_a, id_a, new_rating_a), (title_b, id_b, new_rating_b)):
+            self.rating_index.update(title, rating)
+            self.sampler.update(title, store.comparisons[i])
+        self.aggregates.update([id_a, id_b])
+        self.pairs.add(id_a, id_b, score_a)
+        self.version += 1
+        self.changes.append((self.version, title_a, title_b))
+        return new_rating_a, new_rating_b
+
+    @timed('rating_service.commit')
+    def _commit(self, batch):
+        """Applies a batch of votes, then persists it with one log append and one storage write."""
+        applied = []
+        history = [] # Undo journal entries of the applied votes
+        with self.lock:
+            for title_a, title_b, outcome, score_a, future, session in batch:
+                try:
+                    ids = self.store.ids
+                    if title_a == title_b or title_a not in ids or title_b not in ids:
+                        raise KeyError(f"Invalid matchup '{title_a}' vs '{title_b}'.")
+                    before = [self._values(title_a), self._values(title_b)]
+                    k = get_k_factor(before[0][1], before[1][1])
+                    ratings = self._apply(title_a, title_b, outcome, score_a)
+                    # Post-vote stats of both movies, taken now: a movie can appear twice in a batch
+                    columns = self.store.columns()
+                    stats = [[int(columns[col][ids[title]]) for col in META_COLS] for title in (title_a, title_b)]
+                    applied.append((title_a, title_b, outcome, score_a, future, ratings, stats))
+                    history.append({'a': title_a, 'b': title_b, 'outcome': outcome, 'score': score_a, 'k': int(k),
+                                    'before': before, 'after': [self._values(title_a), self._values(title_b)],
+                                    'session': session})
+                except Exception as e:
+                    future.set_exception(e)
+            if not applied:
+                return
+            # The lock stays held until the batch is persisted or rolled back, so readers never
+            # see votes that may still be taken back
+            if self.write_behind:
+                committed = self._journal(applied, history)
+                if committed:
+                    self.unflushed_history.extend(history)
+            else:
+                committed = self._persist(applied, history)
+        if not committed:
+            return
+        self.batches += 1
+        for vote in applied:
+            vote[4].set_result(vote[5])
+        self._remember(history)
+        if not self.write_behind:
+            self._logged(len(applied))
+        elif len(self.unflushed) >= self.flush_votes:
+            self._flush()
+
+    def _persist(self, applied, history):
+        """
+        Writes a batch with one log append and one storage write (lock held).
+        Returns True if it was written (if not, it is rolled back, see _roll_back).
+        """
+        logged = False
+        try:
+            touched = list(dict.fromkeys(title for vote in applied for title in vote[:2]))
+            self._note_trajectories(history)
+            if not log_fights([vote[:4] for vote in applied], self.fights_csv):
+                raise IOError("fight log write failed")
+            logged = True
+            if not self.storage.save_vote(self.movies_df, self.meta_df, touched):
+                raise IOError("storage write failed")
+        except Exception as e:
+            print(f"Error committing {len(applied)} votes: {e}")
+            self._drop_trajectories()
+            self._roll_back(history, logged)
+            for vote in applied:
+                vote[4].set_exception(e)
+            return False
+        return True
+
+    def _journal(self, applied, history):
+        """
+        Write-behind commit: fsyncs the batch to the vote journal (lock held).
+        Returns True if the votes were journaled (if not, they are rolled back, see _roll_back).
+        """
+        votes = [{'a': title_a, 'b': title_b, 'outcome': outcome, 'score': score_a,
+                  'rating_a': int(rating_a), 'rating_b': int(rating_b), 'meta_a': stats_a, 'meta_b': stats_b}
+                 for title_a, title_b, outcome, score_a, _, (rating_a, rating_b), (stats_a, stats_b) in applied]
+        try:
+            entries = self.storage.journal.append(votes)
+        except Exception as e:
+            print(f"Error journaling {len(applied)} votes: {e}")
+            self._roll_back(history, False)
+            for vote in applied:
+                vote[4].set_exception(e)
+            return False
+        self.unflushed.extend(entries)
+        if self.flush_deadline is None:
+            self.flush_deadline = time.monotonic() + self.flush_seconds
+        return True
+
+    def _flush(self):
+        """Write-behind: writes the journaled votes to the fight log and tables."""
+        if not self.unflushed:
+            self.flush_deadline = None
+            return
+        self._note_trajectories(self.unflushed_history)
+        if self.storage.flush(self.movies_df, self.meta_df, self.unflushed):
+            self._logged(len(self.unflushed))
+            self.unflushed = []
+            self.unflushed_history = []
+            self.flush_deadline = None
+        else: # Still safe in the journal; try again later
+            self._drop_trajectories()
+            print(f"Flushing {len(self.unflushed)} journaled votes failed; retrying in {self.flush_seconds}s.")
+            self.flush_deadline = time.monotonic() + self.flush_seconds
+
+    def _roll_back(self, history, logged):
+        """
+        Takes back the applied votes of a batch that could not be committed, newest first: their
+        movies get their 'before' values again (see _set_values; the version still moves on, so
+        sessions redraw pairs of these movies) and, if `logged`, their fight log rows are removed.
+        """
+        for entry in reversed(history):
+            if logged and not retract_last_fight(self.fights_csv, (entry['a'], entry['b'], entry['outcome'], entry['score'])):
+                print(f"Could not remove the fight '{entry['a']}' vs '{entry['b']}' from the log.")
+            self._set_values(entry, 'before')
+
+    def _note_trajectories(self, history):
+        """Hands the trajectory index the ratings of votes about to be logged (see TrajectoryIndex.note_live)."""
+        if self.trajectories is not None:
+            self.trajectories.note_live([(entry['a'], entry['b'], entry['score'], entry['before'][0][0], entry['before'][1][0],
+                                          entry['after'][0][0], entry['after'][1][0]) for entry in history])
+
+    def _drop_trajectories(self):
+        """The noted votes were not logged after all."""
+        if self.trajectories is not None:
+            self.trajectories.drop_live()
+
+    def _logged(self, n):
+        """Counts fights appended to the log; checkpoints once another interval is complete."""
+        self.logged_since_checkpoint += n
+        if self.checkpoints is not None and self.logged_since_checkpoint >= self.checkpoints.every:
+            self._checkpoint(dated=True)
+
+    def _checkpoint(self, dated=False):
+        """Syncs the checkpoints in the background (unless a sync is still running; dated: see Checkpoints.sync)."""
+        if self.checkpoints is None or (self.checkpoint_thread is not None and self.checkpoint_thread.is_alive()):
+            return
+        self.logged_since_checkpoint = 0
+        self.checkpoint_thread = threading.Thread(target=self.checkpoints.sync, args=(dated,), name='rating-checkpoints', daemon=True)
+        self.checkpoint_thread.start()
+
+    # --- Undo / Redo (writer thread) ---
+    def _values(self, title):
+        """A movie's [Rating, Comparisons, Wins, Losses, Draws] (as stored in the undo journal)."""
+        i = self.store.ids[title]
+        columns = self.store.columns()
+        return [int(columns[col][i]) for col in STATE_COLS]
+
+    def _has_values(self, entry, side):
+        """Whether both movies of an undo journal entry currently hold its 'before' / 'after' values."""
+        ids = self.store.ids
+        if entry['a'] not in ids or entry['b'] not in ids:
+            return False
+        return [self._values(entry['a']), self._values(entry['b'])] == entry[side]
+
+    def _set_values(self, entry, side):
+        """Sets both movies of an undo journal entry to its 'before' / 'after' values."""
+        store = self.store
+        ids = [store.ids[entry['a']], store.ids[entry['b']]]
+        with self.lock:
+            for title, i, values in zip((entry['a'], entry['b']), ids, entry[side]):
+                store.rating[i], store.comparisons[i], store.wins[i], store.losses[i], store.draws[i] = values
+                self.rating_index.update(title, values[0])
+                self.sampler.update(title, values[1])
+            self.aggregates.update(ids)
+            self.pairs.add(ids[0], ids[1], entry['score'], 1 if side == 'after' else -1)
+            self.version += 1 # Sessions redraw queued pairs of these movies, as after a vote
+            self.changes.append((self.version, entry['a'], entry['b']))
+
+    def _remember(self, history):
+        """Records committed votes in the undo journal."""
+        if self.undo_journal is None:
+            return
+        try:
+            self.undo_journal.record(history)
+        except Exception as e: # The votes stand; they just cannot be undone
+            print(f"Error recording {len(history)} votes for undo: {e}")
+
+    def _run_command(self, command):
+        try:
+            if self.undo_journal is None:
+                raise RuntimeError("Undo is turned off (config.UNDO_DEPTH = 0).")
+            # Undo works on the fight log's last rows: write journaled votes to it first
+            self._flush()
+            if self.unflushed:
+                raise IOError("journaled votes could not be flushed")
+            done = (self._undo if command.action == 'undo' else self._redo)(command.n, command.session)
+            command.future.set_result([(entry['a'], entry['b']) for entry in done])
+        except Exception as e:
+            command.future.set_exception(e)
+
+    def _undo(self, n, session=None):
+        """Sets the last n votes' (of session, if given) movies back to their 'before' values and drops their fight log rows."""
+        journal = self.undo_journal
+        undone = []
+        for entry in itertools.islice(reversed(journal.undo_stack), n):
+            if session is not None and entry.get('session') != session: # Another session's vote
+                break
+            fight = (entry['a'], entry['b'], entry['outcome'], entry['score'])
+            # The tables or the log changed outside the service (a reset, restore, ...): stop there
+            if not (self._has_values(entry, 'after') and retract_last_fight(self.fights_csv, fight)):
+                journal.drop_done(len(undone))
+                break
+            self._set_values(entry, 'before')
+            undone.append(entry)
+        if not undone:
+            return undone
+        try:
+            self._save_undo(undone)
+        except Exception:
+            # Put the votes back (as _persist and _redo leave a failed write): their rows on the log,
+            # their movies at the 'after' values; the undo stack is left as it was
+            redone = undone[::-1]
+            self._note_trajectories(redone)
+            if not log_fights([(entry['a'], entry['b'], entry['outcome'], entry['score']) for entry in redone], self.fights_csv):
+                self._drop_trajectories()
+                print(f"Could not log {len(redone)} fights again after a failed undo.")
+            for entry in redone:
+                self._set_values(entry, 'after')
+            raise
+        journal.mark_undone(undone)
+        self._anchor_vote_journal()
+        return undone
+
+    def _redo(self, n, session=None):
+        """Sets the last n undone votes' (of session, if given) movies to their 'after' values again and re-logs their fights."""
+        journal = self.undo_journal
+        redone = []
+        for entry in itertools.islice(reversed(journal.redo_stack), n):
+            if session is not None and entry.get('session') != session:
+                break
+            if not self._has_values(entry, 'before'):
+                journal.drop_undone(len(redone))
+                break
+            self._set_values(entry, 'after')
+            redone.append(entry)
+        if not redone:
+            return redone
+        self._note_trajectories(redone)
+        if not log_fights([(entry['a'], entry['b'], entry['outcome'], entry['score']) for entry in redone], self.fights_csv):
+            self._drop_trajectories()
+            for entry in reversed(redone):
+                self._set_values(entry, 'before')
+            raise IOError("fight log write failed")
+        try:
+            self._save_undo(redone)
+        except Exception:
+            for entry in reversed(redone):
+                if not retract_last_fight(self.fights_csv, (entry['a'], entry['b'], entry['outcome'], entry['score'])):
+                    print(f"Could not remove the fight '{entry['a']}' vs '{entry['b']}' from the log.")
+                self._set_values(entry, 'before')
+            raise
+        journal.mark_redone(redone)
+        self._anchor_vote_journal()
+        self._logged(len(redone))
+        return redone
+
+    def _save_undo(self, entries):
+        """Writes the movies of undone / redone votes to the tables."""
+        titles = list(dict.fromkeys(title for entry in entries for title in (entry['a'], entry['b'])))
+        if not self.storage.save_vote(self.movies_df, self.meta_df, titles):
+            raise IOError("storage write failed")
+
+    def _anchor_vote_journal(self):
+        """After an undo / redo changed the log's length, points the vote journal's marker at its new end."""
+        if isinstance(self.storage, JournaledStorage):
+            # Nothing is pending (flushed first): re-anchor the vote journal to the log's new length
+            journal = self.storage.journal
+            journal.mark_flushed(journal.seq, self.storage._fights_size())
+
+    # --- Reads (consistent: taken between two batches) ---
+    def select_pair(self, subset=None):
+        """Draws a matchup from the shared sampler (see select_movie_pair)."""
+        with self.lock:
+            # With a sampler, select_movie_pair only needs the frames for their size
+            return select_movie_pair(self.catalog, None, sampler=self.sampler,
+                                     rating_index=self.rating_index, subset=subset, pairs=self.pairs)
+
+    def pair_rows(self, title_a, title_b):
+        """Copies of the movie and metadata rows of a matchup: (movie_a, movie_b, meta_a, meta_b)."""
+        with self.lock:
+            movies_df, meta_df = self.movies_df, self.store.stats_frame()
+            return (movies_df.loc[title_a].copy(), movies_df.loc[title_b].copy(),
+                    meta_df.loc[title_a].copy(), meta_df.loc[title_b].copy())
+
+    def pair_record(self, title_a, title_b):
+        """
+        Head-to-head record of title_a against title_b (see PairRecords.record), counting every
+        applied vote; None if either title is not in the catalog.
+        """
+        with self.lock:
+            ids = self.store.ids
+            if title_a not in ids or title_b not in ids:
+                return None
+            return self.pairs.record(ids[title_a], ids[title_b])
+
+    def changed_since(self, version):
+        """
+        Titles voted on after `version`.
+
+        Returns:
+            tuple: (current version, set of titles), or (current version, None) if `version`
+                is older than the change log (the caller should drop anything it derived).
+        """
+        with self.lock:
+            if version == self.version:
+                return version, set()
+            if not self.changes or self.changes[0][0] > version + 1:
+                return self.version, None
+            titles = set()
+            for v, title_a, title_b in reversed(self.changes):
+                if v <= version:
+                    break
+                titles.update((title_a, title_b))
+            return self.version, titles
+
+    def trajectory(self, title):
+        """
+        A movie's rating trajectory and opponents, from the fight log's TrajectoryIndex (it follows
+        the log, so in write-behind mode votes show up once they are flushed).
+        None while the index is being built, or with config.TRAJECTORY_INDEX off.
+        """
+        if self.trajectories is None:
+            return None
+        return self.trajectories.trajectory(title)
+
+    def ranking_intervals(self):
+        """
+        Cached bootstrap intervals ('Rating Low', 'Rating High', 'Rank Best', 'Rank Worst' by Title),
+        or None if they were never computed for the current fight log.
+        """
+        return self.rank_intervals.current()
+
+    def start_ranking_intervals(self):
+        """Recomputes the bootstrap intervals over the catalog in the background. False if already running."""
+        with self.lock:
+            titles = list(self.store.titles)
+        return self.rank_intervals.start(titles)
+
+    def ranked_view(self, subset=None):
+        with self.lock:
+            return self.aggregates.ranked_view(subset)
+
+    def ranked_rows(self, ids):
+        with self.lock:
+            return self.aggregates.ranked_rows(ids)
+
+    def genre_stats(self):
+        with self.lock:
+            return self.aggregates.genre_stats()
+
+    def totals(self):
+        with self.lock:
+            return self.aggregates.totals()
+
+    def check_consistency(self):
+        """Checks the dashboard aggregates against a from-scratch computation, rebuilding them on mismatch."""
+        with self.lock:
+            problems = self.aggregates.check_consistency(self.movies_df, self.meta_df)
+            if problems:
+                self.aggregates = DashboardAggregates(self.store, self.catalog, genre_index=self.genre_index)
+            return problems
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+# In-memory rating state as contiguous NumPy arrays, one slot per movie id (row position in
+# movies_df, as for PairSampler / RatingIndex / GenreIndex). A vote touches a handful of array
+# slots instead of label lookups on pandas frames; the frames the dashboard and the storage
+# backends work with are built on demand as zero-copy views over the arrays.
+
+STAT_COLS = ['Comparisons', 'Wins', 'Losses', 'Draws']
+
+
+class RatingStore:
+    """
+    Rating, Comparisons, Wins, Losses and Draws per movie id, plus a title -> id dict.
+
+    Args:
+        titles (list): Movie titles; titles[id] is the movie with that id.
+        ratings (array-like): Rating per id.
+        stats (dict, optional): Comparisons / Wins / Losses / Draws arrays (default 0).
+    """
+
+    def __init__(self, titles, ratings, stats=None):
+        self.index = pd.Index(titles, name='Title')
+        self.titles = self.index.tolist()
+        self.ids = {title: i for i, title in enumerate(self.titles)}
+        n = len(self.titles)
+        self.rating = np.array(ratings, dtype=np.int64) # Own, writable copies (to_numpy() can be read-only)
+        stats = stats or {}
+        self.comparisons, self.wins, self.losses, self.draws = (
+            np.array(stats[col], dtype=np.int64) if col in stats else np.zeros(n, dtype=np.int64)
+            for col in STAT_COLS)
+
+    @classmethod
+    def from_frames(cls, movies_df, meta_df):
+        """Builds a store over movies_df's titles; metadata missing for a movie counts as 0."""
+        meta = meta_df.reindex(movies_df.index)
+        stats = {col: meta[col].fillna(0).to_numpy(dtype=np.int64) if col in meta.columns else np.zeros(len(movies_df), dtype=np.int64)
+                 for col in STAT_COLS}
+        return cls(movies_df.index, movies_df['Rating'].to_numpy(dtype=np.int64), stats)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def columns(self):
+        """Column name -> array, for Rating and the stat columns."""
+        return {'Rating': self.rating, 'Comparisons': self.comparisons, 'Wins': self.wins,
+                'Losses': self.losses, 'Draws': self.draws}
+
+    def stats_frame(self):
+        """Comparisons / Wins / Losses / Draws indexed by Title (the meta_df layout), sharing the arrays."""
+        columns = self.columns()
+        return pd.DataFrame({col: columns[col] for col in STAT_COLS}, index=self.index, copy=False)
+
+    def movies_frame(self, catalog):
+        """
+        The movies_df layout: catalog's columns (Title, Genres, PosterURL, ...) followed by
+        Rating, indexed by Title. The Rating column shares the store's array.
+        """
+        columns = {col: catalog[col] for col in catalog.columns}
+        columns['Rating'] = pd.Series(self.rating, index=self.index, copy=False)
+        return pd.DataFrame(columns, index=self.index, copy=False)
+
+    def joined_frame(self, catalog):
+        """movies_frame() plus the stat columns (the dashboard's joined layout), sharing the arrays."""
+        columns = {col: catalog[col] for col in catalog.columns}
+        for col, values in self.columns().items():
+            columns[col] = pd.Series(values, index=self.index, copy=False)
+        return pd.DataFrame(columns, index=self.index, copy=False)
+
+    def nbytes(self):
+        """Bytes held by the arrays (excluding titles)."""
+        return sum(values.nbytes for values in self.columns().values())
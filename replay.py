@@ -0,0 +1,206 @@
+import io
+import itertools
+import os
+import numpy as np
+import pandas as pd
+from config import DEFAULT_ELO, FIGHTS_CSV, K_TIERS
+from elo_logic import get_k_factor
+import columnar
+
+# Batch ELO replay over the head_to_head.csv fight log.
+# Rebuilds every movie's rating, comparison count and W/L/D from scratch, using
+# integer movie ids and NumPy arrays instead of per-fight DataFrame .loc updates.
+# Results match the live per-click path (get_k_factor + update_elo) exactly.
+
+META_COLS = ['Comparisons', 'Wins', 'Losses', 'Draws']
+FIGHT_COLS = ['Movie A', 'Movie B', 'Score A']
+
+# calculate_expected_score() saturates to 0/1 beyond a rating gap of 40 * 400
+_MAX_DIFF = 16000
+
+
+def load_fight_log(filename=FIGHTS_CSV, chunksize=1_000_000):
+    """
+    Streams the fight log into integer id arrays.
+
+    Reads the columnar mirror (head_to_head.arrow) when pyarrow is installed, parsing only the
+    CSV rows appended since it was written; otherwise parses the CSV in chunks.
+
+    Args:
+        filename (str): Path to head_to_head.csv.
+        chunksize (int): Rows parsed per chunk, bounds peak parsing memory.
+
+    Returns:
+        tuple: (titles, id_a, id_b, score_a) where titles[id] is the movie title,
+               id_a/id_b are int32 arrays and score_a is a float64 array.
+    """
+    if columnar.mirror_enabled():
+        fights = columnar.load_fight_ids(filename)
+        if fights is not None:
+            return fights
+    title_ids = {}
+    ids_a, ids_b, scores = [], [], []
+    if os.path.exists(filename) and os.path.getsize(filename) > 0:
+        for chunk in pd.read_csv(filename, usecols=FIGHT_COLS, chunksize=chunksize,
+                                 dtype={'Movie A': str, 'Movie B': str}, keep_default_na=False, na_values=['']):
+            chunk = chunk.dropna(subset=['Movie A', 'Movie B'])
+            # Factorize both title columns together, then map the chunk's uniques onto global ids
+            codes, uniques = pd.factorize(pd.concat([chunk['Movie A'], chunk['Movie B']], ignore_index=True))
+            global_ids = np.array([title_ids.setdefault(t, len(title_ids)) for t in uniques], dtype=np.int32)
+            codes = global_ids[codes]
+            ids_a.append(codes[:len(chunk)])
+            ids_b.append(codes[len(chunk):])
+            scores.append(pd.to_numeric(chunk['Score A'], errors='coerce').fillna(0.5).to_numpy(dtype=np.float64))
+
+    titles = list(title_ids)
+    if not ids_a:
+        empty_ids = np.empty(0, dtype=np.int32)
+        return titles, empty_ids, empty_ids.copy(), np.empty(0, dtype=np.float64)
+    return titles, np.concatenate(ids_a), np.concatenate(ids_b), np.concatenate(scores)
+
+
+def _k_table():
+    """K-factor for every min-comparison count up to the last finite tier (anything above uses the last entry)."""
+    finite_thresholds = [t for t in K_TIERS if t != float('inf')]
+    cap = int(max(finite_thresholds)) + 1 if finite_thresholds else 0
+    return [get_k_factor(c, c) for c in range(cap + 1)], cap
+
+
+def _expected_table():
+    """Expected score of A for every integer rating gap (B - A) in [-_MAX_DIFF, _MAX_DIFF]."""
+    diffs = np.arange(-_MAX_DIFF, _MAX_DIFF + 1, dtype=np.float64)
+    return (1.0 / (1.0 + 10.0 ** (diffs / 400.0))).tolist()
+
+
+def read_fight_rows(f, header, rows):
+    """
+    Reads up to `rows` complete log rows (None: all) from a binary file's current position.
+
+    Returns:
+        tuple: (DataFrame of the rows, number of rows, bytes consumed). A half-written last
+            row is not consumed.
+    """
+    lines = list(itertools.islice(f, rows))
+    if lines and not lines[-1].endswith(b'\n'):
+        lines.pop()
+    if not lines:
+        return pd.DataFrame(columns=FIGHT_COLS), 0, 0
+    data = b''.join(lines)
+    chunk = pd.read_csv(io.BytesIO(header + data), usecols=lambda col: col in FIGHT_COLS,
+                        dtype={'Movie A': str, 'Movie B': str}, keep_default_na=False, na_values=[''],
+                        skip_blank_lines=False)
+    return chunk, len(lines), len(data)
+
+
+def replay_elo(id_a, id_b, score_a, n_movies, initial_ratings=None, initial_comparisons=None, per_fight=False):
+    """
+    Replays fights in log order and returns the resulting state arrays.
+
+    Args:
+        id_a, id_b (np.ndarray): Integer movie ids for each fight.
+        score_a (np.ndarray): Score A for each fight (1.0 = A much better ... 0.0 = B much better).
+        n_movies (int): Number of distinct movie ids.
+        initial_ratings (np.ndarray, optional): Starting ratings, defaults to DEFAULT_ELO.
+        initial_comparisons (np.ndarray, optional): Starting comparison counts (affects K), defaults to 0.
+        per_fight (bool): Also return both movies' ratings before and after every fight.
+
+    Returns:
+        dict: 'Rating', 'Comparisons', 'Wins', 'Losses', 'Draws' -> int64 arrays of length n_movies.
+              Comparisons/W/L/D only count the replayed fights plus initial_comparisons.
+              With per_fight: 'Before A', 'Before B', 'After A', 'After B' -> int64 arrays, one entry per fight.
+    """
+    if initial_ratings is None:
+        ratings = [DEFAULT_ELO] * n_movies
+    else:
+        ratings = np.asarray(initial_ratings, dtype=np.int64).tolist()
+    if initial_comparisons is None:
+        counts = [0] * n_movies
+    else:
+        counts = np.asarray(initial_comparisons, dtype=np.int64).tolist()
+
+    # The rating recurrence is inherently sequential (each fight depends on the last),
+    # so it runs as a tight loop over plain lists with K and expected scores precomputed.
+    k_table, k_cap = _k_table()
+    expected = _expected_table()
+    # Per-fight ratings: the rating before a fight is the one after the movie's previous fight,
+    # so only the post-fight ratings are recorded in the loop
+    after_a, after_b = ([], []) if per_fight else (None, None)
+    for a, b, s in zip(id_a.tolist(), id_b.tolist(), score_a.tolist()):
+        ra = ratings[a]
+        rb = ratings[b]
+        ca = counts[a]
+        cb = counts[b]
+        c = ca if ca < cb else cb
+        k = k_table[c if c < k_cap else k_cap]
+        diff = rb - ra
+        if diff > _MAX_DIFF:
+            e = 0.0
+        elif diff < -_MAX_DIFF:
+            e = 1.0
+        else:
+            e = expected[diff + _MAX_DIFF]
+        change = k * (s - e)
+        ratings[a] = round(ra + change)
+        ratings[b] = round(rb - change)
+        counts[a] = ca + 1
+        counts[b] = cb + 1
+        if per_fight:
+            after_a.append(ratings[a])
+            after_b.append(ratings[b])
+
+    # W/L/D do not feed back into ratings, so they are counted in one vectorized pass
+    a_won = score_a > 0.5
+    b_won = score_a < 0.5
+    draw = score_a == 0.5
+    result = {
+        'Rating': np.asarray(ratings, dtype=np.int64),
+        'Comparisons': np.asarray(counts, dtype=np.int64),
+        'Wins': np.bincount(id_a[a_won], minlength=n_movies) + np.bincount(id_b[b_won], minlength=n_movies),
+        'Losses': np.bincount(id_a[b_won], minlength=n_movies) + np.bincount(id_b[a_won], minlength=n_movies),
+        'Draws': np.bincount(id_a[draw], minlength=n_movies) + np.bincount(id_b[draw], minlength=n_movies),
+    }
+    if per_fight:
+        result['After A'] = np.asarray(after_a, dtype=np.int64)
+        result['After B'] = np.asarray(after_b, dtype=np.int64)
+        result['Before A'], result['Before B'] = _before(id_a, id_b, result['After A'], result['After B'], initial_ratings)
+    return result
+
+
+def _before(id_a, id_b, after_a, after_b, initial_ratings):
+    """Each fight's pre-fight ratings: the movie's rating after its previous fight, or its starting rating."""
+    n = len(id_a)
+    ids = np.concatenate([id_a, id_b])
+    after = np.concatenate([after_a, after_b])
+    order = np.lexsort((np.tile(np.arange(n), 2), ids)) # By movie, then by fight
+    before = np.empty(2 * n, dtype=np.int64)
+    first = np.ones(2 * n, dtype=bool) # First replayed fight of its movie
+    first[1:] = ids[order[1:]] != ids[order[:-1]]
+    before[order[1:]] = after[order[:-1]]
+    start = ids[order[first]]
+    before[order[first]] = DEFAULT_ELO if initial_ratings is None else np.asarray(initial_ratings, dtype=np.int64)[start]
+    return before[:n], before[n:]
+
+
+def replay_fights(filename=FIGHTS_CSV, movie_titles=None):
+    """
+    Rebuilds ratings and metadata from the fight log.
+
+    Args:
+        filename (str): Path to head_to_head.csv.
+        movie_titles (list, optional): Catalog titles. If given, results are aligned to
+            this list (unseen movies get DEFAULT_ELO and zero counts, unknown titles are dropped).
+
+    Returns:
+        tuple: (ratings, meta_df) - a Rating Series and a Comparisons/Wins/Losses/Draws
+               DataFrame, both indexed by Title.
+    """
+    titles, id_a, id_b, score_a = load_fight_log(filename)
+    state = replay_elo(id_a, id_b, score_a, len(titles))
+    ratings = pd.Series(state['Rating'], index=titles, name='Rating')
+    meta_df = pd.DataFrame({col: state[col] for col in META_COLS}, index=titles)
+    if movie_titles is not None:
+        ratings = ratings.reindex(movie_titles, fill_value=DEFAULT_ELO).astype(int)
+        meta_df = meta_df.reindex(movie_titles, fill_value=0).astype(int)
+    ratings.index.name = 'Title'
+    meta_df.index.name = 'Title'
+    return ratings, meta_df
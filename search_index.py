@@ -0,0 +1,91 @@
+import bisect
+import numpy as np
+import pandas as pd
+
+# Title search index for the rankings search box.
+# Built once per catalog load (like the genre index); movie ids are row positions in movies_df.
+
+GRAM = 3 # Trigrams: queries of GRAM+ characters are answered from posting lists
+
+
+class TitleSearchIndex:
+    """
+    Case-insensitive title search: a sorted array of folded titles for prefix
+    queries and trigram posting lists for substring queries.
+
+    Prefix queries are two bisects plus the matches. Substring queries intersect
+    the query's trigram posting lists (shortest first) and verify the few
+    remaining candidates, so the cost follows the size of the rarest trigram's
+    list rather than the catalog. Queries shorter than a trigram match so much
+    of a catalog that they are a vectorized scan of the folded titles, kept as a
+    string column (Arrow-backed with pandas 3) so no per-query copy is made.
+    """
+
+    def __init__(self, titles):
+        self.folded = [str(t).casefold() for t in titles]
+        n = len(self.folded)
+        # Prefix array: folded titles in sorted order, with the id of each
+        self.sorted_ids = np.array(sorted(range(n), key=self.folded.__getitem__), dtype=np.int64)
+        self.sorted_folded = [self.folded[i] for i in self.sorted_ids]
+        self.folded_column = pd.Series(self.folded, dtype=str) # For short queries
+        # Trigram posting lists in CSR layout: ids of gram g are postings[offsets[g]:offsets[g+1]] (sorted)
+        grams = []
+        owners = []
+        for i, title in enumerate(self.folded):
+            title_grams = {title[j:j + GRAM] for j in range(len(title) - GRAM + 1)}
+            grams.extend(title_grams)
+            owners.extend([i] * len(title_grams))
+        codes, vocabulary = pd.factorize(pd.Series(grams, dtype=object))
+        owners = np.asarray(owners, dtype=np.int32)
+        order = np.lexsort((owners, codes))
+        self.gram_ids = {g: k for k, g in enumerate(vocabulary)}
+        self.postings = owners[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(vocabulary)))])
+
+    @classmethod
+    def from_frame(cls, movies_df):
+        """Builds the index over movies_df's titles (ids are row positions)."""
+        return cls(movies_df.index)
+
+    def __len__(self):
+        return len(self.folded)
+
+    def prefix(self, query):
+        """Ids of titles starting with query (case-insensitive), in title order."""
+        query = query.casefold()
+        lo = bisect.bisect_left(self.sorted_folded, query)
+        hi = bisect.bisect_left(self.sorted_folded, query + '\U0010ffff', lo)
+        return self.sorted_ids[lo:hi]
+
+    def _posting(self, gram):
+        k = self.gram_ids.get(gram)
+        if k is None:
+            return None
+        return self.postings[self.offsets[k]:self.offsets[k + 1]]
+
+    def search(self, query):
+        """Ids of titles containing query as a substring (case-insensitive, literal), sorted by id."""
+        query = query.casefold()
+        if not query:
+            return np.arange(len(self.folded), dtype=np.int64)
+        if len(query) < GRAM:
+            return np.flatnonzero(self.folded_column.str.contains(query, regex=False).to_numpy(dtype=bool))
+        postings = []
+        for gram in {query[j:j + GRAM] for j in range(len(query) - GRAM + 1)}:
+            posting = self._posting(gram)
+            if posting is None:
+                return np.empty(0, dtype=np.int64)
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            # Binary-search the candidates in the longer (sorted) list: O(candidates * log)
+            pos = np.minimum(np.searchsorted(posting, candidates), len(posting) - 1)
+            candidates = candidates[posting[pos] == candidates]
+            if len(candidates) == 0:
+                break
+        if len(query) == GRAM:
+            return candidates.astype(np.int64)
+        # Trigrams can co-occur without forming the query; verify the survivors
+        folded = self.folded
+        return np.array([i for i in candidates.tolist() if query in folded[i]], dtype=np.int64)
@@ -1,14 +1,334 @@
 import pandas as pd
 import random
+import bisect
+from collections import deque
 import numpy as np
+from config import SELECTION_STRATEGY, RATING_WINDOW, PREFETCH_PAIRS, REPEAT_PAIR_WEIGHT, REPEAT_PAIR_TRIES
+from instrumentation import timed
 
-def select_movie_pair(movies_df, meta_df):
+SELECTION_EXPONENT = 1.5 # Increase exponent (e.g., 1.5 or 2) for stronger priority
+
+def selection_weight(comparisons):
+    """
+    Selection weight for a movie's comparison count: higher weight for fewer comparisons.
+    Adding 1 avoids division by zero and gives 0-comparison movies highest weight.
+    Works on scalars, NumPy arrays and pandas Series.
+    """
+    return 1 / (comparisons + 1)**SELECTION_EXPONENT
+
+
+def pick_opponent(a, draw, pairs, repeat_weight=REPEAT_PAIR_WEIGHT, max_tries=REPEAT_PAIR_TRIES):
+    """
+    Draws opponents for id `a` until one is kept: a candidate that met `a` n times before is
+    kept with probability repeat_weight ** n (one O(1) PairRecords lookup per candidate).
+    After max_tries draws, the least-compared candidate is used.
+
+    Args:
+        a (int): Id of movie A.
+        draw (callable): Draws one candidate id for movie B (None if there is none).
+        pairs (PairRecords): Head-to-head records of the pairs compared so far.
+
+    Returns:
+        int: Id of movie B, or None if draw() found none.
+    """
+    best, best_fights = None, None
+    for _ in range(max_tries):
+        b = draw()
+        if b is None:
+            return None
+        fights = pairs.fights(a, b)
+        if fights == 0 or random.random() < repeat_weight ** fights:
+            return b
+        if best is None or fights < best_fights:
+            best, best_fights = b, fights
+    return best
+
+
+class PairSampler:
+    """
+    Persistent weighted sampler over the catalog, keyed by integer id (row position).
+
+    Keeps the selection weights in a sum tree, so a vote only updates the two
+    touched leaves and drawing a pair costs O(log n) instead of rebuilding the
+    weight vector for every pair. Draws follow the same distribution as
+    select_movie_pair: movie A weighted by selection_weight(Comparisons),
+    movie B uniform over the rest of the catalog.
+    """
+
+    def __init__(self, titles, comparisons):
+        self.titles = list(titles)
+        self.ids = {title: i for i, title in enumerate(self.titles)}
+        n = len(self.titles)
+        self.size = 1
+        while self.size < max(n, 1):
+            self.size *= 2
+        # Leaves live at [size, size + n); internal node i holds tree[2i] + tree[2i+1]
+        tree = np.zeros(2 * self.size, dtype=np.float64)
+        tree[self.size:self.size + n] = selection_weight(np.asarray(comparisons, dtype=np.float64))
+        node = self.size
+        while node > 1:
+            parents = np.arange(node // 2, node)
+            tree[parents] = tree[2 * parents] + tree[2 * parents + 1]
+            node //= 2
+        self.tree = tree.tolist() # Plain list: scalar indexing is much faster than on ndarrays
+
+    @classmethod
+    def from_frames(cls, movies_df, meta_df):
+        """Builds a sampler over movies_df's titles using meta_df's 'Comparisons'."""
+        comparisons = meta_df['Comparisons'].reindex(movies_df.index).fillna(0).astype(int)
+        return cls(movies_df.index, comparisons.to_numpy())
+
+    @classmethod
+    def from_store(cls, store):
+        """Builds a sampler over a RatingStore's titles and comparison counts."""
+        return cls(store.titles, store.comparisons)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def update(self, title, comparisons):
+        """Sets a movie's comparison count (call for both movies after a vote)."""
+        i = self.size + self.ids[title]
+        tree = self.tree
+        tree[i] = selection_weight(comparisons)
+        i //= 2
+        while i >= 1:
+            tree[i] = tree[2 * i] + tree[2 * i + 1]
+            i //= 2
+
+    def sample_id(self, subset=None, max_tries=64):
+        """
+        Draws one id with probability proportional to its weight.
+        With a MovieSubset the draw is restricted to its ids: rejection sampling first,
+        then a direct weighted choice over the subset's ids for rare subsets.
+        """
+        if subset is not None:
+            for _ in range(max_tries):
+                i = self.sample_id()
+                if subset.mask[i]:
+                    return i
+            ids = subset.ids.tolist()
+            return random.choices(ids, weights=[self.tree[self.size + i] for i in ids], k=1)[0]
+        tree = self.tree
+        n = len(self.titles)
+        while True:
+            r = random.random() * tree[1]
+            i = 1
+            while i < self.size:
+                left = tree[2 * i]
+                if r < left:
+                    i = 2 * i
+                else:
+                    r -= left
+                    i = 2 * i + 1
+            leaf = i - self.size
+            if leaf < n: # Float rounding can walk into the zero-weight padding; just redraw
+                return leaf
+
+    def sample_title(self, subset=None):
+        """Draws one title weighted by comparisons (optionally within a MovieSubset)."""
+        return self.titles[self.sample_id(subset)]
+
+    def select_pair(self, subset=None, pairs=None):
+        """
+        Returns (title_a, title_b): A weighted by comparisons, B uniform among the others (within
+        subset if given). With PairRecords, pairs already compared are avoided (see pick_opponent).
+        """
+        n = len(self.titles) if subset is None else len(subset)
+        if n < 2:
+            print("Not enough movies to select a pair.")
+            return None, None
+        a = self.sample_id(subset)
+        def draw():
+            if subset is None:
+                b = random.randrange(n - 1)
+                return b + 1 if b >= a else b
+            b = a
+            while b == a:
+                b = int(subset.ids[random.randrange(n)])
+            return b
+        b = draw() if pairs is None else pick_opponent(a, draw, pairs)
+        return self.titles[a], self.titles[b]
+
+
+class RatingIndex:
+    """
+    Catalog kept sorted by rating, for picking informative opponents.
+
+    A vote moves two entries (O(log n) search plus a list shift); choosing an
+    opponent within a rating window is two bisects, independent of how many
+    candidates the window holds.
+    """
+
+    def __init__(self, titles, ratings):
+        self.titles = list(titles)
+        self.ids = {title: i for i, title in enumerate(self.titles)}
+        self.ratings = [int(r) for r in ratings]
+        self.entries = sorted(zip(self.ratings, range(len(self.titles)))) # (rating, id) pairs
+
+    @classmethod
+    def from_frame(cls, movies_df):
+        """Builds the index over movies_df's titles and 'Rating' column."""
+        return cls(movies_df.index, movies_df['Rating'].to_numpy())
+
+    @classmethod
+    def from_store(cls, store):
+        """Builds the index over a RatingStore's titles and ratings."""
+        return cls(store.titles, store.rating)
+
+    def __len__(self):
+        return len(self.titles)
+
+    def update(self, title, rating):
+        """Moves a movie to its new rating (call for both movies after a vote)."""
+        i = self.ids[title]
+        rating = int(rating)
+        old = (self.ratings[i], i)
+        del self.entries[bisect.bisect_left(self.entries, old)]
+        bisect.insort(self.entries, (rating, i))
+        self.ratings[i] = rating
+
+    def select_opponent(self, title, window=RATING_WINDOW, subset=None, max_tries=64, pairs=None):
+        """
+        Picks an opponent for `title` uniformly from the movies rated within +/- window.
+        If the window holds no other movie, the nearest-rated neighbour is used instead
+        (the pair whose expected score is closest to 0.5, i.e. the most informative vote).
+        With a MovieSubset, opponents are drawn from the window by rejection sampling and
+        fall back to a uniform pick from the subset.
+        With PairRecords, opponents already compared with `title` are avoided (see pick_opponent).
+        """
+        if pairs is None:
+            return self._draw_opponent(title, window, subset, max_tries)
+        def draw():
+            opponent = self._draw_opponent(title, window, subset, max_tries)
+            return None if opponent is None else self.ids[opponent]
+        j = pick_opponent(self.ids[title], draw, pairs)
+        return None if j is None else self.titles[j]
+
+    def _draw_opponent(self, title, window, subset, max_tries):
+        if len(self.titles) < 2:
+            return None
+        i = self.ids[title]
+        rating = self.ratings[i]
+        lo = bisect.bisect_left(self.entries, (rating - window, -1))
+        hi = bisect.bisect_right(self.entries, (rating + window, len(self.titles)))
+        if subset is not None:
+            if hi - lo > 1:
+                for _ in range(max_tries):
+                    j = self.entries[random.randrange(lo, hi)][1]
+                    if j != i and subset.mask[j]:
+                        return self.titles[j]
+            if len(subset) < 2:
+                return None
+            j = i
+            while j == i:
+                j = int(subset.ids[random.randrange(len(subset))])
+            return self.titles[j]
+        if hi - lo > 1:
+            pos = bisect.bisect_left(self.entries, (rating, i), lo, hi)
+            j = random.randrange(lo, hi - 1)
+            if j >= pos:
+                j += 1
+            return self.titles[self.entries[j][1]]
+        # Only the movie itself is in the window: take the closer of its two neighbours
+        pos = bisect.bisect_left(self.entries, (rating, i))
+        neighbours = [self.entries[p] for p in (pos - 1, pos + 1) if 0 <= p < len(self.entries)]
+        nearest = min(neighbours, key=lambda entry: abs(entry[0] - rating))
+        return self.titles[nearest[1]]
+
+
+class PairQueue:
+    """
+    Queue of pre-drawn matchups, so the next pair is ready the moment a vote is submitted.
+
+    pop() is O(1). fill() draws pairs up to the queue size and is meant to run after the
+    current pair has been shown, off the click path. A vote changes the weights and ratings
+    the queued pairs were drawn with, so invalidate() redraws just the queued pairs that
+    contain one of the voted movies; every other queued pair is still a valid draw.
+    The select callable (usually a select_movie_pair partial) draws one (title_a, title_b).
+    """
+
+    def __init__(self, size=PREFETCH_PAIRS):
+        self.size = size
+        self.pairs = deque()
+        self.counts = {} # title -> number of queued pairs containing it
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def _count(self, pair, delta):
+        for title in pair:
+            count = self.counts.get(title, 0) + delta
+            if count: self.counts[title] = count
+            else: del self.counts[title]
+
+    def _draw(self, select):
+        pair = select()
+        return pair if pair and all(pair) else None
+
+    def pop(self, select):
+        """Returns the next queued pair, or draws one directly if the queue is empty."""
+        if self.pairs:
+            pair = self.pairs.popleft()
+            self._count(pair, -1)
+            return pair
+        return self._draw(select)
+
+    def fill(self, select):
+        """Draws pairs until the queue holds `size` of them."""
+        while len(self.pairs) < self.size:
+            pair = self._draw(select)
+            if pair is None:
+                break
+            self.pairs.append(pair)
+            self._count(pair, 1)
+
+    def invalidate(self, titles, select):
+        """Redraws the queued pairs containing any of `titles` (the movies whose rating/count changed)."""
+        if not any(title in self.counts for title in titles):
+            return
+        kept = deque()
+        for pair in self.pairs:
+            if pair[0] in titles or pair[1] in titles:
+                self._count(pair, -1)
+                pair = self._draw(select)
+                if pair is None:
+                    continue
+                self._count(pair, 1)
+            kept.append(pair)
+        self.pairs = kept
+
+    def clear(self):
+        """Drops all queued pairs (e.g. when the matchup genres change)."""
+        self.pairs.clear()
+        self.counts.clear()
+
+    def titles(self):
+        """Titles of all queued pairs, in queue order."""
+        return [title for pair in self.pairs for title in pair]
+
+
+@timed()
+def select_movie_pair(movies_df, meta_df, sampler=None, rating_index=None, strategy=SELECTION_STRATEGY, subset=None,
+                      pairs=None):
     """
     Selects a pair of movies for comparison, prioritizing movies with fewer comparisons.
 
     Args:
         movies_df (pd.DataFrame): DataFrame containing movie titles as index.
         meta_df (pd.DataFrame): DataFrame containing metadata, including 'Comparisons'.
+        sampler (PairSampler, optional): Persistent sampler kept in sync with meta_df.
+            If given, the pair is drawn from it in O(log n) instead of rebuilding weights.
+        rating_index (RatingIndex, optional): Sorted rating index kept in sync with movies_df,
+            used by the 'rating_window' strategy (built on the fly if missing).
+        strategy (str): 'weighted' picks movie B uniformly; 'rating_window' picks B among
+            movies with a similar rating (see config.SELECTION_STRATEGY). Movie A is always
+            weighted towards fewer comparisons.
+        subset (MovieSubset, optional): Restrict both movies to these ids, e.g.
+            GenreIndex.subset(['Horror']) for genre-restricted matchups.
+        pairs (PairRecords, optional): Head-to-head records over the sampler's ids. If given
+            (with a sampler), movie B is redrawn away from pairs already compared
+            (see config.REPEAT_PAIR_WEIGHT).
 
     Returns:
         tuple: A tuple containing two distinct movie titles, or (None, None) if selection fails.
@@ -17,6 +337,25 @@ def select_movie_pair(movies_df, meta_df):
         print("Not enough movies to select a pair.")
         return None, None
 
+    if subset is not None and len(subset) < 2:
+        print("Not enough movies in the selected subset to select a pair.")
+        return None, None
+
+    if sampler is not None and len(sampler) == len(movies_df):
+        if strategy == 'rating_window':
+            if rating_index is None or len(rating_index) != len(movies_df):
+                rating_index = RatingIndex.from_frame(movies_df)
+            title_a = sampler.sample_title(subset)
+            return title_a, rating_index.select_opponent(title_a, subset=subset, pairs=pairs)
+        return sampler.select_pair(subset, pairs)
+
+    # Without a sampler: restrict the frames to the subset and select as usual
+    if subset is not None:
+        movies_df = movies_df.iloc[subset.ids]
+        rating_index = None
+    if strategy == 'rating_window' and (rating_index is None or len(rating_index) != len(movies_df)):
+        rating_index = RatingIndex.from_frame(movies_df)
+
     # Ensure metadata is aligned with movie list and has 'Comparisons'
     try:
         # Align meta_df with movies_df index, fill missing comparisons with 0
@@ -29,9 +368,7 @@ def select_movie_pair(movies_df, meta_df):
         return random.sample(valid_titles, 2)
 
     # Calculate weights: Higher weight for fewer comparisons
-    # Adding 1 avoids division by zero and gives 0-comparison movies highest weight.
-    # Using power (e.g., ^2) can increase the priority further.
-    weights = 1 / (comparisons + 1)**1.5 # Increase exponent (e.g., 1.5 or 2) for stronger priority
+    weights = selection_weight(comparisons)
 
     # Normalize weights to sum to 1 (required by random.choices)
     total_weight = weights.sum()
@@ -56,6 +393,9 @@ def select_movie_pair(movies_df, meta_df):
         print(f"Error during weighted choice for title_a: {e}. Using uniform selection.")
         return random.sample(valid_titles, 2)
 
+    # Select the second movie from a similar rating band
+    if strategy == 'rating_window':
+        return title_a, rating_index.select_opponent(title_a)
 
     # Select the second movie randomly from the remaining titles
     remaining_titles = [t for t in valid_titles if t != title_a]
@@ -0,0 +1,85 @@
+import json
+import os
+import threading
+import config
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # Optional: without pyarrow every load parses the CSVs
+    pa = pq = None
+
+# Binary snapshots of the cleaned catalog / metadata tables, stored next to their CSV as
+# <csv>.snapshot.parquet. Each snapshot records the size and mtime of the CSV it matches (plus
+# the kind of table and SNAPSHOT_FORMAT); it is only used while the CSV still has exactly that
+# size and mtime, so an edited or replaced CSV is always re-parsed. Snapshots are only written
+# when a CSV is parsed, never when the app saves one: a second full-table write per vote would
+# cost more than the parse it saves at the next start. The key is the stat of the CSV version
+# the frame was read from, taken by the caller before reading, so a concurrent writer replacing
+# the CSV in between cannot get its version's key stamped on this frame (a later load then
+# just misses).
+
+SNAPSHOT_FORMAT = 1 # Bump when load_movie_data / load_movie_metadata clean the CSVs differently
+_KEY = b'movie_elo_snapshot'
+
+
+def enabled():
+    return pq is not None and config.CSV_SNAPSHOTS
+
+
+def snapshot_path(csv_path):
+    return f"{csv_path}.snapshot.parquet"
+
+
+def _source_key(csv_path, kind, stat=None):
+    stat = stat or os.stat(csv_path)
+    return {'kind': kind, 'format': SNAPSHOT_FORMAT, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def load(csv_path, kind):
+    """
+    The frame stored for csv_path, if a snapshot of the CSV's current version exists.
+
+    Args:
+        csv_path (str): The source CSV.
+        kind (str): Table kind ('movies' / 'metadata'), guards against mixing up snapshots.
+
+    Returns:
+        pd.DataFrame or None: The saved columns (no index), or None on a miss.
+    """
+    if not enabled():
+        return None
+    path = snapshot_path(csv_path)
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+        if json.loads(metadata.get(_KEY, b'null')) != _source_key(csv_path, kind):
+            return None
+        return pq.read_table(path).to_pandas()
+    except (OSError, ValueError, pa.ArrowException):
+        return None
+
+
+def save(csv_path, df, kind, stat=None):
+    """
+    Writes df (columns only, index dropped) as the snapshot of a version of csv_path.
+
+    Args:
+        stat (os.stat_result, optional): Stat of the CSV version df was read from or written
+            as (default: the CSV's current stat).
+    """
+    if not enabled():
+        return
+    path = snapshot_path(csv_path)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp" # Other writers use other temp files
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        key = json.dumps(_source_key(csv_path, kind, stat)).encode()
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _KEY: key})
+        pq.write_table(table, tmp_path, compression='snappy')
+        os.replace(tmp_path, path)
+    except (OSError, ValueError, TypeError, pa.ArrowException) as e:
+        print(f"Could not write snapshot '{path}': {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
@@ -0,0 +1,394 @@
+import os
+import sqlite3
+import pandas as pd
+import streamlit as st # Used only for st.error/st.warning/st.info
+import config
+import columnar
+from data_handler import load_movie_data, load_movie_metadata, save_movie_data, save_movie_metadata, log_fights
+from vote_journal import VoteJournal, apply_entries, fsync_file
+
+# Storage backends for the rating (movies) and metadata tables.
+# All backends load/save the same DataFrame layout used by the app:
+#   movies_df: indexed by Title, columns Title, Genres, PosterURL, Rating, ...
+#   meta_df:   indexed by Title, columns Comparisons, Wins, Losses, Draws
+
+META_COLS = ['Comparisons', 'Wins', 'Losses', 'Draws']
+
+
+class CsvStorage:
+    """Original behaviour: every save rewrites the full CSV files."""
+    name = 'csv'
+
+    def __init__(self, movies_csv=config.MOVIES_CSV, meta_csv=config.MOVIE_DATA_CSV):
+        self.movies_csv = movies_csv
+        self.meta_csv = meta_csv
+
+    def load_movies(self):
+        return load_movie_data(self.movies_csv)
+
+    def load_metadata(self, movie_titles=None):
+        return load_movie_metadata(filename=self.meta_csv, movie_titles=movie_titles)
+
+    def save_vote(self, movies_df, meta_df, titles):
+        """Persists the rows changed by one vote. CSV can only rewrite whole files."""
+        return self.save_all(movies_df, meta_df)
+
+    def save_all(self, movies_df, meta_df):
+        saved_movies = save_movie_data(movies_df, self.movies_csv)
+        saved_meta = save_movie_metadata(meta_df, self.meta_csv)
+        return saved_movies and saved_meta
+
+    def import_csv(self, movies_csv=None, meta_csv=None):
+        """Nothing to import: the CSV files are the storage."""
+        pass
+
+    def export_csv(self, movies_csv=None, meta_csv=None):
+        movies_df = self.load_movies()
+        meta_df = self.load_metadata(movie_titles=movies_df.index.tolist())
+        save_movie_data(movies_df, movies_csv or self.movies_csv)
+        save_movie_metadata(meta_df, meta_csv or self.meta_csv)
+
+
+class SqliteStorage:
+    """
+    SQLite (WAL mode) storage. A vote only updates the two changed rows in
+    each table, so the per-vote write cost does not grow with the catalog.
+    The database is created from the CSV files on first use.
+    """
+    name = 'sqlite'
+
+    def __init__(self, db_path=config.STORAGE_DB, movies_csv=config.MOVIES_CSV, meta_csv=config.MOVIE_DATA_CSV):
+        self.db_path = db_path
+        self.movies_csv = movies_csv
+        self.meta_csv = meta_csv
+        # NORMAL: in WAL mode a commit survives the process being killed, but not a power loss or OS
+        # crash (the WAL is only fsync'd at checkpoints). JournaledStorage sets FULL, since it drops
+        # votes from its journal once they are committed here.
+        self.synchronous = 'NORMAL'
+
+    def _connect(self):
+        # A short-lived connection per operation keeps this safe across Streamlit reruns (different threads)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        return conn
+
+    def _has_tables(self):
+        if not os.path.exists(self.db_path):
+            return False
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name IN ('movies', 'metadata')").fetchall()
+            return len(rows) == 2
+        finally:
+            conn.close()
+
+    def _write_tables(self, movies_df, meta_df):
+        """Replaces both tables with the given DataFrames."""
+        save_movies = movies_df.reset_index(drop=True)
+        save_meta = meta_df.rename_axis('Title').reset_index()
+        conn = self._connect()
+        try:
+            with conn:
+                save_movies.to_sql('movies', conn, if_exists='replace', index=False)
+                save_meta.to_sql('metadata', conn, if_exists='replace', index=False)
+                conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_movies_title ON movies(Title)')
+                conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_metadata_title ON metadata(Title)')
+        finally:
+            conn.close()
+
+    def import_csv(self, movies_csv=None, meta_csv=None):
+        """(Re)builds the database from the CSV layout."""
+        movies_df = load_movie_data(movies_csv or self.movies_csv)
+        if movies_df.empty:
+            st.error("Cannot import into SQLite storage: movie data is empty.")
+            return
+        meta_df = load_movie_metadata(filename=meta_csv or self.meta_csv, movie_titles=movies_df.index.tolist())
+        self._write_tables(movies_df, meta_df)
+
+    def export_csv(self, movies_csv=None, meta_csv=None):
+        """Writes the database back out in the CSV layout."""
+        movies_df = self.load_movies()
+        meta_df = self.load_metadata(movie_titles=movies_df.index.tolist())
+        save_movie_data(movies_df, movies_csv or self.movies_csv)
+        save_movie_metadata(meta_df, meta_csv or self.meta_csv)
+
+    def load_movies(self):
+        if not self._has_tables():
+            self.import_csv()
+            if not self._has_tables():
+                return pd.DataFrame(columns=['Title', 'Genres', 'PosterURL', 'Rating'])
+        conn = self._connect()
+        try:
+            df = pd.read_sql('SELECT * FROM movies ORDER BY rowid', conn)
+        except Exception as e:
+            st.error(f"Error loading movies from '{self.db_path}': {e}")
+            return pd.DataFrame(columns=['Title', 'Genres', 'PosterURL', 'Rating'])
+        finally:
+            conn.close()
+        df['PosterURL'] = df['PosterURL'].fillna('')
+        df['Rating'] = df['Rating'].astype(int)
+        return df.set_index('Title', drop=False)
+
+    def load_metadata(self, movie_titles=None):
+        if not self._has_tables():
+            self.import_csv()
+        conn = self._connect()
+        try:
+            meta_df = pd.read_sql('SELECT * FROM metadata ORDER BY rowid', conn).set_index('Title')
+            meta_df = meta_df[META_COLS].astype(int)
+            # Add any new movies found in the main list but not in metadata
+            if movie_titles is not None:
+                missing_titles = [t for t in movie_titles if t not in meta_df.index]
+                if missing_titles:
+                    print(f"Adding {len(missing_titles)} new movies to metadata.")
+                    with conn:
+                        conn.executemany('INSERT INTO metadata (Title, Comparisons, Wins, Losses, Draws) VALUES (?, 0, 0, 0, 0)',
+                                         [(t,) for t in missing_titles])
+                    new_meta_rows = pd.DataFrame(0, index=missing_titles, columns=META_COLS)
+                    meta_df = pd.concat([meta_df, new_meta_rows])
+            return meta_df
+        except Exception as e:
+            st.error(f"Error loading metadata from '{self.db_path}': {e}")
+            return pd.DataFrame(0, index=movie_titles or [], columns=META_COLS)
+        finally:
+            conn.close()
+
+    def save_vote(self, movies_df, meta_df, titles):
+        """Writes only the rating and metadata rows of the given titles, in one transaction."""
+        movie_rows = [(int(movies_df.at[t, 'Rating']), t) for t in titles]
+        meta_rows = [tuple(int(meta_df.at[t, col]) for col in META_COLS) + (t,) for t in titles]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany('UPDATE movies SET Rating = ? WHERE Title = ?', movie_rows)
+                conn.executemany('UPDATE metadata SET Comparisons = ?, Wins = ?, Losses = ?, Draws = ? WHERE Title = ?', meta_rows)
+            return True
+        except Exception as e:
+            st.error(f"Error saving vote to '{self.db_path}': {e}")
+            return False
+        finally:
+            conn.close()
+
+    def save_all(self, movies_df, meta_df):
+        try:
+            self._write_tables(movies_df, meta_df)
+            return True
+        except Exception as e:
+            st.error(f"Error saving data to '{self.db_path}': {e}")
+            return False
+
+
+class ArrowStorage:
+    """
+    Arrow IPC storage (needs pyarrow). Loading memory-maps the files instead of parsing text;
+    saving writes the binary tables, much cheaper than formatting CSVs. Arrow files are
+    immutable, so a vote still rewrites both tables, like CsvStorage.
+    The files are created from the CSV files on first use.
+    """
+    name = 'arrow'
+
+    def __init__(self, movies_path=config.MOVIES_ARROW, meta_path=config.MOVIE_DATA_ARROW,
+                 movies_csv=config.MOVIES_CSV, meta_csv=config.MOVIE_DATA_CSV):
+        self.movies_path = movies_path
+        self.meta_path = meta_path
+        self.movies_csv = movies_csv
+        self.meta_csv = meta_csv
+
+    def _has_tables(self):
+        return os.path.exists(self.movies_path) and os.path.exists(self.meta_path)
+
+    def _write_tables(self, movies_df, meta_df):
+        columnar.write_table(movies_df.reset_index(drop=True), self.movies_path)
+        columnar.write_table(meta_df.rename_axis('Title').reset_index(), self.meta_path)
+
+    def import_csv(self, movies_csv=None, meta_csv=None):
+        """(Re)builds the Arrow files from the CSV layout."""
+        movies_df = load_movie_data(movies_csv or self.movies_csv)
+        if movies_df.empty:
+            st.error("Cannot import into Arrow storage: movie data is empty.")
+            return
+        meta_df = load_movie_metadata(filename=meta_csv or self.meta_csv, movie_titles=movies_df.index.tolist())
+        self._write_tables(movies_df, meta_df)
+
+    def export_csv(self, movies_csv=None, meta_csv=None):
+        """Writes the Arrow files back out in the CSV layout."""
+        movies_df = self.load_movies()
+        meta_df = self.load_metadata(movie_titles=movies_df.index.tolist())
+        save_movie_data(movies_df, movies_csv or self.movies_csv)
+        save_movie_metadata(meta_df, meta_csv or self.meta_csv)
+
+    def load_movies(self):
+        if not self._has_tables():
+            self.import_csv()
+            if not self._has_tables():
+                return pd.DataFrame(columns=['Title', 'Genres', 'PosterURL', 'Rating'])
+        try:
+            df = columnar.read_table(self.movies_path).to_pandas()
+        except Exception as e:
+            st.error(f"Error loading movies from '{self.movies_path}': {e}")
+            return pd.DataFrame(columns=['Title', 'Genres', 'PosterURL', 'Rating'])
+        df['PosterURL'] = df['PosterURL'].fillna('')
+        df['Rating'] = df['Rating'].astype(int)
+        return df.set_index('Title', drop=False)
+
+    def load_metadata(self, movie_titles=None):
+        if not self._has_tables():
+            self.import_csv()
+        try:
+            meta_df = columnar.read_table(self.meta_path, ['Title'] + META_COLS).to_pandas().set_index('Title')
+            meta_df = meta_df.astype(int)
+            # Add any new movies found in the main list but not in metadata
+            if movie_titles is not None:
+                current_titles = pd.Index(movie_titles)
+                missing_titles = [] if current_titles.equals(meta_df.index) else current_titles.difference(meta_df.index)
+                if len(missing_titles):
+                    print(f"Adding {len(missing_titles)} new movies to metadata.")
+                    new_meta_rows = pd.DataFrame(0, index=list(missing_titles), columns=META_COLS)
+                    meta_df = pd.concat([meta_df, new_meta_rows])
+            return meta_df
+        except Exception as e:
+            st.error(f"Error loading metadata from '{self.meta_path}': {e}")
+            return pd.DataFrame(0, index=movie_titles or [], columns=META_COLS)
+
+    def save_vote(self, movies_df, meta_df, titles):
+        """Arrow files cannot be updated in place: rewrites both tables."""
+        return self.save_all(movies_df, meta_df)
+
+    def save_all(self, movies_df, meta_df):
+        try:
+            self._write_tables(movies_df, meta_df)
+            return True
+        except Exception as e:
+            st.error(f"Error saving data to '{self.movies_path}' / '{self.meta_path}': {e}")
+            return False
+
+
+class JournaledStorage:
+    """
+    Write-behind wrapper around a storage backend (config.WRITE_BEHIND).
+
+    Votes are made durable in a VoteJournal first; flush() later writes a whole group of
+    them to the fight log and the wrapped backend's tables. Loading replays any journal
+    entries a killed process had not flushed yet, so the tables come back complete (and
+    fails if they cannot be flushed, rather than starting from tables missing those votes).
+    Everything else is delegated to the wrapped backend.
+    """
+
+    def __init__(self, inner, journal=None, fights_csv=config.FIGHTS_CSV):
+        self.inner = inner
+        self.name = inner.name
+        if isinstance(inner, SqliteStorage):
+            inner.synchronous = 'FULL' # Commits are fsync'd, like the CSV / Arrow files flush() syncs
+        self.journal = journal or VoteJournal()
+        self.fights_csv = fights_csv
+        self.replayed_meta = None # Metadata load_movies replayed the journal into, for load_metadata
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def _fights_size(self):
+        return os.path.getsize(self.fights_csv) if os.path.exists(self.fights_csv) else 0
+
+    def _cut_fights(self, size):
+        """Drops fight log rows appended after the log was `size` bytes long."""
+        if self._fights_size() <= size:
+            return
+        if size == 0:
+            os.remove(self.fights_csv) # Next append writes the header again
+        else:
+            with open(self.fights_csv, 'r+b') as f:
+                f.truncate(size)
+
+    def load_movies(self):
+        movies_df = self.inner.load_movies()
+        self.replayed_meta = None
+        pending = self.journal.pending()
+        if pending and not movies_df.empty:
+            print(f"Replaying {len(pending)} unflushed votes from '{self.journal.path}'.")
+            meta_df = self.inner.load_metadata(movie_titles=movies_df.index.tolist())
+            apply_entries(movies_df, meta_df, pending)
+            # Fight log rows past the last completed flush belong to an interrupted flush; they are re-appended
+            if self.journal.fights_bytes is not None:
+                self._cut_fights(self.journal.fights_bytes)
+            if not self.flush(movies_df, meta_df, pending):
+                raise IOError(f"Could not write {len(pending)} unflushed votes from '{self.journal.path}' "
+                              f"to the fight log and tables; they are kept in the journal.")
+            self.replayed_meta = meta_df
+        elif not pending:
+            # Nothing pending: (re)anchor the marker to the current fight log
+            self.journal.mark_flushed(self.journal.seq, self._fights_size())
+        return movies_df
+
+    def load_metadata(self, movie_titles=None):
+        # After a replay: the metadata it was applied to, so ratings and W/L/D come from the same state
+        meta_df, self.replayed_meta = self.replayed_meta, None
+        if meta_df is None:
+            return self.inner.load_metadata(movie_titles=movie_titles)
+        if movie_titles is not None:
+            missing_titles = pd.Index(movie_titles).difference(meta_df.index)
+            if len(missing_titles):
+                meta_df = pd.concat([meta_df, pd.DataFrame(0, index=list(missing_titles), columns=META_COLS)])
+        return meta_df
+
+    def flush(self, movies_df, meta_df, entries):
+        """
+        Writes journaled votes to the fight log and the tables, then marks them flushed.
+        Returns True on success; on failure the entries stay pending in the journal.
+        """
+        if not entries:
+            return True
+        fights_bytes = self._fights_size()
+        titles = list(dict.fromkeys(title for e in entries for title in (e['a'], e['b'])))
+        if not (log_fights([(e['a'], e['b'], e['outcome'], e['score']) for e in entries], self.fights_csv)
+                and self.inner.save_vote(movies_df, meta_df, titles)):
+            self._cut_fights(fights_bytes) # So the retry does not log these votes twice
+            return False
+        try:
+            fsync_file(self.fights_csv)
+            if isinstance(self.inner, CsvStorage):
+                fsync_file(self.inner.movies_csv)
+                fsync_file(self.inner.meta_csv)
+            elif isinstance(self.inner, ArrowStorage):
+                fsync_file(self.inner.movies_path)
+                fsync_file(self.inner.meta_path)
+            self.journal.mark_flushed(entries[-1]['seq'], self._fights_size())
+        except OSError as e:
+            if self.journal.flushed_seq >= entries[-1]['seq']:
+                # The marker was written; only dropping the flushed entries from the journal failed
+                print(f"Error trimming the vote journal '{self.journal.path}': {e}")
+                return True
+            # Not marked flushed: the journal is untouched and the entries stay pending
+            print(f"Error syncing {len(entries)} flushed votes to disk: {e}")
+            try:
+                self._cut_fights(fights_bytes)
+            except OSError:
+                pass # Load cuts the log back to the marker's fights_bytes before replaying
+            return False
+        return True
+
+
+BACKENDS = {
+    CsvStorage.name: CsvStorage,
+    SqliteStorage.name: SqliteStorage,
+    ArrowStorage.name: ArrowStorage,
+}
+
+def get_storage(backend=None, write_behind=None):
+    """
+    Returns the storage backend selected by config.STORAGE_BACKEND (or the given name),
+    wrapped in a JournaledStorage when config.WRITE_BEHIND is on or a vote journal
+    exists (so unflushed votes are replayed even after write-behind was turned off).
+    """
+    backend = backend or config.STORAGE_BACKEND
+    if backend not in BACKENDS:
+        st.warning(f"Unknown storage backend '{backend}'. Falling back to CSV.")
+        backend = CsvStorage.name
+    if backend == ArrowStorage.name and not columnar.available():
+        st.warning("Arrow storage needs pyarrow. Falling back to CSV.")
+        backend = CsvStorage.name
+    storage = BACKENDS[backend]()
+    write_behind = config.WRITE_BEHIND if write_behind is None else write_behind
+    if write_behind or os.path.exists(config.VOTE_JOURNAL):
+        storage = JournaledStorage(storage)
+    return storage
@@ -0,0 +1,401 @@
+import csv
+import io
+import json
+import os
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+import config
+from elo_logic import get_k_factor, update_elo
+from replay import replay_elo, read_fight_rows, FIGHT_COLS
+from columnar import log_check
+
+# Per-movie rating trajectories, indexed from the fight log.
+#
+# head_to_head.csv only records who fought whom, so a movie's rating history would take a replay
+# of the whole log. This index, kept next to the log (head_to_head.trajectory/), holds one
+# fixed-size record per fight: both movie ids, both movies' ratings before and after the fight,
+# the score, whether those ratings are live, and the number of each movie's previous fight. Those
+# back-links are the per-movie posting lists: following them from a movie's last fight (heads,
+# kept in memory) returns its whole trajectory and its opponents in time proportional to its
+# own fight count. Movie ids are assigned in order of first appearance in the log.
+#
+# log_fights() / retract_last_fight() notify the process's open index of the log, which then
+# appends / drops the records of the changed rows, O(1) per fight. Rows it has not seen yet
+# (e.g. appended while it was busy) are picked up from the log by the next update. As for the
+# checkpoints, the index is only used while the log still starts with the bytes it was built
+# from (length + CRC of the bytes before its offset, columnar.log_check); otherwise it is rebuilt.
+#
+# The log does not record ratings, so fights indexed from it alone get ratings replayed from
+# DEFAULT_ELO. Those can differ from the ratings the app held (after replay_elo.py with another
+# engine, a reset_elo restore, or imported starting ratings). The rating service therefore hands
+# the index the before / after ratings of the fights it is about to log (note_live, taken from
+# its undo history); their records keep those values and are flagged 'live'. Later replayed
+# fights continue from them.
+
+RECORD = np.dtype([('a', '<i4'), ('b', '<i4'), ('prev_a', '<i4'), ('prev_b', '<i4'),
+                   ('before_a', '<i4'), ('before_b', '<i4'), ('after_a', '<i4'), ('after_b', '<i4'),
+                   ('score', '<f4'), ('live', 'u1')])
+INDEX_FORMAT = 2 # 2: records have the 'live' flag
+_CHUNK_ROWS = 1_000_000 # Log rows parsed and indexed per step
+_SMALL = 1_000 # Fewer new rows are replayed one by one (replay_elo copies the full rating arrays)
+_SMALL_BYTES = 64 * 1024 # Smaller tails of the log are parsed with the csv module (pandas' overhead dominates)
+
+_indexes = {} # Open indexes of this process by log path (see notify_append / notify_retract)
+
+
+def trajectory_dir(fights_csv):
+    return f"{os.path.splitext(fights_csv)[0]}.trajectory"
+
+
+def notify_append(fights_csv):
+    """Called after rows were appended to a fight log: its open index (if any) indexes them."""
+    index = _indexes.get(os.path.abspath(fights_csv))
+    if index is not None and index.ready:
+        index.update(wait=False)
+
+
+def notify_retract(fights_csv, old_size):
+    """Called after the last row of a fight log (then old_size bytes long) was removed."""
+    index = _indexes.get(os.path.abspath(fights_csv))
+    if index is not None and index.ready:
+        index.retract(old_size)
+
+
+class TrajectoryIndex:
+    """
+    The rating trajectory index of one fight log (see module comment).
+
+    Args:
+        fights_csv (str): The fight log.
+        directory (str, optional): Where the index is kept (default: next to the log).
+    """
+
+    def __init__(self, fights_csv=config.FIGHTS_CSV, directory=None):
+        self.fights_csv = fights_csv
+        self.directory = directory or trajectory_dir(fights_csv)
+        self.records_path = os.path.join(self.directory, 'fights.bin')
+        self.titles_path = os.path.join(self.directory, 'titles.bin')
+        self.state_path = os.path.join(self.directory, 'state.json')
+        self.lock = threading.Lock() # One update at a time; reads wait for a running one
+        self.thread = None
+        self.live = deque() # (title_a, title_b, score_a, before_a, before_b, after_a, after_b) of fights about to be logged
+        self.loaded = False
+        self.ready = False # Caught up with the log at least once (reads return None until then)
+        self._clear()
+        _indexes[os.path.abspath(fights_csv)] = self
+
+    def __len__(self):
+        return self.fights
+
+    def _clear(self):
+        self.titles = []
+        self.ids = {}
+        self.heads = np.empty(0, dtype=np.int64) # Last fight of each movie (-1: none)
+        self.counts = np.empty(0, dtype=np.int64) # Comparisons (for the K-factor)
+        self.ratings = np.empty(0, dtype=np.int64) # Rating after the last fight
+        self.fights = 0
+        self.offset = 0 # Bytes of the log indexed (0: nothing read yet)
+        self.check = 0 # CRC of the log bytes before offset
+
+    def _add_titles(self, titles):
+        for title in titles:
+            self.ids.setdefault(title, len(self.titles))
+            if len(self.ids) > len(self.titles):
+                self.titles.append(title)
+        missing = len(self.titles) - len(self.heads)
+        if missing > 0:
+            self.heads = np.concatenate([self.heads, np.full(missing, -1, dtype=np.int64)])
+            self.counts = np.concatenate([self.counts, np.zeros(missing, dtype=np.int64)])
+            self.ratings = np.concatenate([self.ratings, np.full(missing, config.DEFAULT_ELO, dtype=np.int64)])
+
+    # --- Files ---
+    def _valid(self, offset, check):
+        """Whether the log still starts with the bytes indexed up to offset."""
+        if offset > os.path.getsize(self.fights_csv):
+            return False
+        with open(self.fights_csv, 'rb') as f:
+            return log_check(f, offset) == check
+
+    def _write_state(self):
+        with open(self.fights_csv, 'rb') as f:
+            self.check = log_check(f, self.offset)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'format': INDEX_FORMAT, 'fights': self.fights, 'offset': self.offset, 'check': self.check,
+                       'titles': len(self.titles)}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _reset(self):
+        """Starts an empty index on disk."""
+        self._clear()
+        self.live.clear()
+        os.makedirs(self.directory, exist_ok=True)
+        for path in (self.records_path, self.titles_path):
+            open(path, 'wb').close()
+        self._write_state()
+
+    def _load(self):
+        """Reads the index from disk and rebuilds heads / counts / ratings. Returns False if it is missing or stale."""
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            if state.get('format') != INDEX_FORMAT or not self._valid(state['offset'], state['check']):
+                return False
+            fights = state['fights']
+            if os.path.getsize(self.records_path) < fights * RECORD.itemsize:
+                return False
+            with open(self.titles_path, 'rb') as f:
+                parts = f.read().split(b'\0')[:state['titles']]
+        except (OSError, ValueError, KeyError):
+            return False
+        if len(parts) < state['titles']:
+            return False
+        # Drop whatever an interrupted append left past the recorded state
+        os.truncate(self.records_path, fights * RECORD.itemsize)
+        os.truncate(self.titles_path, sum(len(part) + 1 for part in parts))
+        self._clear()
+        self._add_titles([part.decode('utf-8') for part in parts])
+        if fights:
+            records = np.memmap(self.records_path, dtype=RECORD, mode='r', shape=(fights,))
+            a, b = records['a'].astype(np.int64), records['b'].astype(np.int64)
+            n = len(self.titles)
+            numbers = np.arange(fights, dtype=np.int64)
+            np.maximum.at(self.heads, a, numbers)
+            np.maximum.at(self.heads, b, numbers)
+            self.counts = np.bincount(a, minlength=n) + np.bincount(b, minlength=n)
+            seen = np.flatnonzero(self.heads >= 0)
+            last = records[self.heads[seen]]
+            self.ratings[seen] = np.where(last['a'] == seen, last['after_a'], last['after_b'])
+        self.fights, self.offset, self.check = fights, state['offset'], state['check']
+        return True
+
+    # --- Indexing ---
+    def note_live(self, fights):
+        """
+        Ratings the app held for fights it is about to log, as (title_a, title_b, score_a, before_a,
+        before_b, after_a, after_b) tuples in log order. Their records take these values.
+        """
+        if self.ready:
+            self.live.extend(fights)
+
+    def drop_live(self):
+        """Forgets noted fights that were not logged after all (their write failed)."""
+        self.live.clear()
+
+    def _take_live(self, i, j, s):
+        """The noted ratings of the next fight, if it is this one."""
+        if not self.live:
+            return None
+        title_a, title_b, score_a, *values = self.live[0]
+        if (title_a, title_b, float(score_a)) != (self.titles[i], self.titles[j], s):
+            return None # Not a noted fight (e.g. appended by another process): replayed
+        self.live.popleft()
+        return values
+
+    def _replay_few(self, a, b, score):
+        """Per-fight ratings of a few fights, with the live path's elo_logic functions (or as noted, see note_live)."""
+        before_a, before_b, after_a, after_b = (np.empty(len(a), dtype=np.int64) for _ in range(4))
+        live = np.zeros(len(a), dtype=bool)
+        ratings, counts = self.ratings, self.counts
+        for n, (i, j, s) in enumerate(zip(a.tolist(), b.tolist(), score.tolist())):
+            values = self._take_live(i, j, s)
+            if values is not None:
+                before_a[n], before_b[n], ratings[i], ratings[j] = values
+                live[n] = True
+            else:
+                before_a[n], before_b[n] = ratings[i], ratings[j]
+                k = get_k_factor(counts[i], counts[j])
+                ratings[i], ratings[j] = update_elo(int(ratings[i]), int(ratings[j]), s, k)
+            counts[i] += 1
+            counts[j] += 1
+            after_a[n], after_b[n] = ratings[i], ratings[j]
+        return before_a, before_b, after_a, after_b, live
+
+    def _chunk_ids(self, chunk):
+        """Movie ids and scores of parsed log rows (see replay.read_fight_rows), adding new titles."""
+        chunk = chunk.dropna(subset=['Movie A', 'Movie B']) # Rows replay.load_fight_log skips too
+        m = len(chunk)
+        codes, uniques = pd.factorize(pd.concat([chunk['Movie A'], chunk['Movie B']], ignore_index=True))
+        self._add_titles(uniques)
+        codes = np.array([self.ids[t] for t in uniques], dtype=np.int64)[codes]
+        score = pd.to_numeric(chunk['Score A'], errors='coerce').fillna(0.5).to_numpy(dtype=np.float64)
+        return codes[:m], codes[m:], score
+
+    def _row_ids(self, header, data):
+        """Same as _chunk_ids for a few raw log lines, parsed with the csv module."""
+        columns = next(csv.reader(io.StringIO(header.decode('utf-8'))))
+        col_a, col_b, col_score = (columns.index(col) for col in FIGHT_COLS)
+        a, b, score = [], [], []
+        for row in csv.reader(io.StringIO(data.decode('utf-8'))):
+            if len(row) < len(columns) or not row[col_a] or not row[col_b]:
+                continue
+            self._add_titles((row[col_a], row[col_b]))
+            a.append(self.ids[row[col_a]])
+            b.append(self.ids[row[col_b]])
+            try:
+                value = float(row[col_score])
+            except ValueError:
+                value = float('nan')
+            score.append(0.5 if value != value else value)
+        return np.array(a, dtype=np.int64), np.array(b, dtype=np.int64), np.array(score, dtype=np.float64)
+
+    def _index(self, a, b, score, known):
+        """Appends the records of new fights (movie ids; titles from id `known` on are new)."""
+        m = len(a)
+        if not m:
+            return
+        if m < _SMALL:
+            before_a, before_b, after_a, after_b, live = self._replay_few(a, b, score)
+        else:
+            live = False
+            result = replay_elo(a, b, score, len(self.titles), initial_ratings=self.ratings,
+                                initial_comparisons=self.counts, per_fight=True)
+            self.ratings, self.counts = result['Rating'], result['Comparisons']
+            before_a, before_b, after_a, after_b = (result[col] for col in ('Before A', 'Before B', 'After A', 'After B'))
+
+        # Link each fight to the previous fight of both its movies (in this chunk, or the movie's head)
+        numbers = np.tile(self.fights + np.arange(m, dtype=np.int64), 2)
+        movies = np.concatenate([a, b])
+        order = np.lexsort((numbers, movies))
+        first = np.ones(2 * m, dtype=bool)
+        first[1:] = movies[order[1:]] != movies[order[:-1]]
+        prev = np.empty(2 * m, dtype=np.int64)
+        prev[order[1:]] = numbers[order[:-1]]
+        prev[order[first]] = self.heads[movies[order[first]]]
+        last = np.roll(first, -1) # Last fight of its movie in this chunk
+        self.heads[movies[order[last]]] = numbers[order[last]]
+
+        records = np.empty(m, dtype=RECORD)
+        records['a'], records['b'] = a, b
+        records['prev_a'], records['prev_b'] = prev[:m], prev[m:]
+        records['before_a'], records['before_b'] = before_a, before_b
+        records['after_a'], records['after_b'] = after_a, after_b
+        records['score'] = score
+        records['live'] = live
+        with open(self.titles_path, 'ab') as f:
+            f.write(''.join(f"{title}\0" for title in self.titles[known:]).encode('utf-8'))
+        with open(self.records_path, 'ab') as f:
+            f.write(records.tobytes())
+        self.fights += m
+
+    def _catch_up(self):
+        """Indexes the log rows after self.offset."""
+        with open(self.fights_csv, 'rb') as f:
+            header = f.readline()
+            f.seek(max(self.offset, len(header)))
+            self.offset = f.tell()
+            if os.fstat(f.fileno()).st_size - self.offset <= _SMALL_BYTES: # Usually the rows of one commit
+                data = f.read()
+                data = data[:data.rfind(b'\n') + 1] # Not a half-written last row
+                if data:
+                    known = len(self.titles)
+                    self._index(*self._row_ids(header, data), known)
+                    self.offset += len(data)
+                    self._write_state()
+                return
+            while True:
+                chunk, rows, consumed = read_fight_rows(f, header, _CHUNK_ROWS)
+                if rows:
+                    known = len(self.titles)
+                    self._index(*self._chunk_ids(chunk), known)
+                    self.offset += consumed
+                    self._write_state()
+                if rows < _CHUNK_ROWS:
+                    return
+
+    def update(self, wait=True):
+        """
+        Indexes the rows appended to the log since the last update (the whole log the first
+        time, or after the log was cut or rewritten). With wait=False, returns at once if
+        another update is running, and leaves a rebuild to a background update.
+        """
+        if not os.path.exists(self.fights_csv):
+            return
+        if not self.lock.acquire(blocking=wait):
+            return
+        rebuild_later = False
+        try:
+            if not self.loaded:
+                self.loaded = self._load()
+            elif not self._valid(self.offset, self.check): # The log was cut or rewritten
+                self.loaded = False
+            if not self.loaded and not wait:
+                rebuild_later = True
+                return
+            if not self.loaded:
+                self.ready = False
+                self._reset()
+                self.loaded = True
+            self._catch_up()
+            self.ready = True
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error indexing rating trajectories of '{self.fights_csv}': {e}")
+            self.loaded = self.ready = False
+        finally:
+            self.lock.release()
+            if rebuild_later:
+                self.update_async()
+
+    def update_async(self):
+        """Runs update() in a background thread (unless one is still running)."""
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.update, name='trajectory-index', daemon=True)
+            self.thread.start()
+
+    def retract(self, old_size):
+        """Drops the last fight's record after its row was cut off the log (then old_size bytes long)."""
+        with self.lock:
+            if self.offset != old_size or not self.fights:
+                return # Not indexed yet, or already out of step: the next update checks the log
+            fight = self.fights - 1
+            record = np.fromfile(self.records_path, dtype=RECORD, count=1, offset=fight * RECORD.itemsize)[0]
+            a, b = int(record['a']), int(record['b'])
+            self.heads[a], self.heads[b] = record['prev_a'], record['prev_b']
+            self.ratings[a], self.ratings[b] = record['before_a'], record['before_b']
+            self.counts[a] -= 1
+            self.counts[b] -= 1
+            os.truncate(self.records_path, fight * RECORD.itemsize)
+            self.fights = fight
+            self.offset = os.path.getsize(self.fights_csv)
+            self._write_state()
+
+    # --- Reads ---
+    def trajectory(self, title):
+        """
+        A movie's fights in log order, found by following its posting list (cost follows its own
+        fight count, not the length of the log).
+
+        Returns:
+            pd.DataFrame: 'Fight' (1 = first fight in the log), 'Opponent', 'Score' (the movie's
+                side: 1.0 = much better ... 0.0 = much worse), 'Rating Before', 'Rating After',
+                'Opponent Rating' (before the fight), 'Live' (True: the ratings the app held; False:
+                replayed from the log, see module comment). None while the index is being built.
+        """
+        if not self.ready:
+            return None
+        with self.lock:
+            i = self.ids.get(title)
+            fight = -1 if i is None else int(self.heads[i])
+            numbers = []
+            if fight >= 0:
+                records = np.memmap(self.records_path, dtype=RECORD, mode='r', shape=(self.fights,))
+                while fight >= 0:
+                    numbers.append(fight)
+                    record = records[fight]
+                    fight = int(record['prev_a'] if record['a'] == i else record['prev_b'])
+                rows = records[np.array(numbers[::-1], dtype=np.int64)]
+            else:
+                rows = np.empty(0, dtype=RECORD)
+            titles = self.titles
+        is_a = rows['a'] == i
+        return pd.DataFrame({
+            'Fight': np.array(numbers[::-1], dtype=np.int64) + 1,
+            'Opponent': [titles[j] for j in np.where(is_a, rows['b'], rows['a']).tolist()],
+            'Score': np.where(is_a, rows['score'], 1.0 - rows['score']).astype(np.float64),
+            'Rating Before': np.where(is_a, rows['before_a'], rows['before_b']).astype(np.int64),
+            'Rating After': np.where(is_a, rows['after_a'], rows['after_b']).astype(np.int64),
+            'Opponent Rating': np.where(is_a, rows['before_b'], rows['before_a']).astype(np.int64),
+            'Live': rows['live'].astype(bool),
+        })
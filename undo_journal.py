@@ -0,0 +1,140 @@
+import json
+import os
+from collections import deque
+import config
+
+# Undo / redo history of committed votes (a reverse-delta journal).
+# Each vote is appended as one JSON line holding the exact values both movies had before and
+# after it, and the K factor it was applied with:
+#   {"seq": n, "a": title, "b": title, "outcome": ..., "score": ..., "k": 32,
+#    "before": [[Rating, Comparisons, Wins, Losses, Draws] of a, [...] of b], "after": [[...], [...]],
+#    "session": id of the app session that cast it (null for votes from scripts)}
+# Undoing a vote sets the "before" values back, redoing it sets the "after" values again, so
+# each costs O(1) whatever the size of the catalog or the fight log. Undo / redo are appended
+# as {"undo": seq} / {"redo": seq} lines; loading replays them to rebuild both stacks. A new
+# vote discards the redo stack. Only the last `depth` votes can be undone; older lines are
+# dropped when the file is compacted. An entry is only undone while both movies still
+# hold its "after" values and the fight log still ends with its row (and redone while they
+# hold its "before" values); history that no longer matches, e.g. after utils/reset_elo.py, is dropped.
+
+STATE_COLS = ['Rating', 'Comparisons', 'Wins', 'Losses', 'Draws']
+
+
+def undo_journal_path(fights_csv):
+    """The undo journal of a fight log (head_to_head.undo.jsonl next to head_to_head.csv)."""
+    return f"{os.path.splitext(fights_csv)[0]}.undo.jsonl"
+
+
+class UndoJournal:
+    """
+    Undo and redo stacks of votes, persisted as an append-only JSONL file (see module comment).
+
+    Args:
+        path (str): The journal file.
+        depth (int): Max votes that can be undone.
+    """
+
+    def __init__(self, path, depth=config.UNDO_DEPTH):
+        self.path = path
+        self.depth = depth
+        self.undo_stack = deque(maxlen=depth) # Oldest first; the top is the last vote
+        self.redo_stack = [] # The top is the last undone vote
+        self.seq = 0
+        self.lines = self._load()
+        if self.lines is None: # Drop the torn line, so the next append starts on a line of its own
+            self._rewrite()
+        self._compact()
+
+    def _load(self):
+        """Rebuilds the stacks from the file. Returns its number of lines (None if the last one is torn)."""
+        if not os.path.exists(self.path):
+            return 0
+        lines = 0
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    return None # Only the final line can be incomplete
+                lines += 1
+                if 'undo' in record:
+                    if self.undo_stack and self.undo_stack[-1]['seq'] == record['undo']:
+                        self.redo_stack.append(self.undo_stack.pop())
+                elif 'redo' in record:
+                    if self.redo_stack and self.redo_stack[-1]['seq'] == record['redo']:
+                        self.undo_stack.append(self.redo_stack.pop())
+                else:
+                    self.undo_stack.append(record)
+                    self.redo_stack = []
+                    self.seq = max(self.seq, record['seq'])
+        return lines
+
+    def _append(self, records):
+        # Not fsync'd: a line lost in a crash only shortens the history (entries are checked
+        # against the tables and the fight log before they are undone or redone)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(record) + '\n' for record in records))
+        self.lines += len(records)
+
+    def _compact(self):
+        # At most 2 * depth lines survive a rewrite, so rewrites stay O(1) per vote amortized
+        if self.lines > 4 * self.depth:
+            self._rewrite()
+
+    def _rewrite(self):
+        """Compacts the file to the current stacks: their votes in vote order, then the undo markers."""
+        votes = list(self.undo_stack) + self.redo_stack[::-1]
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(entry) + '\n' for entry in votes))
+            f.write(''.join(json.dumps({'undo': entry['seq']}) + '\n' for entry in self.redo_stack))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.lines = len(votes) + len(self.redo_stack)
+
+    def record(self, votes):
+        """
+        Appends committed votes (dicts with a, b, outcome, score, k, before, after, session) and
+        discards the redo stack. Returns the entries written (each with its 'seq').
+        """
+        entries = []
+        for vote in votes:
+            self.seq += 1
+            entries.append({'seq': self.seq, **vote})
+        self._append(entries)
+        self.undo_stack.extend(entries)
+        self.redo_stack = []
+        self._compact()
+        return entries
+
+    def last_done(self):
+        """The vote undo() would take back next (None if there is none)."""
+        return self.undo_stack[-1] if self.undo_stack else None
+
+    def last_undone(self):
+        """The vote redo() would apply again next (None if there is none)."""
+        return self.redo_stack[-1] if self.redo_stack else None
+
+    def mark_undone(self, entries):
+        """Records that the last len(entries) votes were undone (entries: newest first)."""
+        self._append([{'undo': entry['seq']} for entry in entries])
+        for _ in entries:
+            self.redo_stack.append(self.undo_stack.pop())
+
+    def mark_redone(self, entries):
+        """Records that the last len(entries) undone votes were redone (entries: in redo order)."""
+        self._append([{'redo': entry['seq']} for entry in entries])
+        for _ in entries:
+            self.undo_stack.append(self.redo_stack.pop())
+
+    def drop_done(self, keep=0):
+        """Forgets all but the last `keep` votes of the undo stack (the older ones no longer match the tables)."""
+        while len(self.undo_stack) > keep:
+            self.undo_stack.popleft()
+        self._rewrite()
+
+    def drop_undone(self, keep=0):
+        """Forgets all but the next `keep` votes of the redo stack."""
+        self.redo_stack = self.redo_stack[len(self.redo_stack) - keep:]
+        self._rewrite()
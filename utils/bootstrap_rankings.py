@@ -0,0 +1,43 @@
+import os
+import sys
+import argparse
+import time
+
+# --- Configuration ---
+# Construct paths relative to the script's *parent* directory
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__)) # utils directory
+BASE_DIR = os.path.dirname(SCRIPT_DIR) # Parent directory (Movie_Elo)
+sys.path.insert(0, BASE_DIR) # Make the app modules (config, storage, ...) importable
+
+import config
+from bootstrap import RankIntervals
+from storage import get_storage
+
+# --- Main Logic ---
+# Computes the bootstrap rating / rank intervals of the catalog (see bootstrap.py) and caches them
+# next to the fight log, where the dashboard's rankings table picks them up. Same job as the
+# dashboard's "Compute intervals" button, without keeping the app busy while it runs.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute bootstrap rating and rank intervals for the rankings.")
+    parser.add_argument('--replicates', type=int, default=config.BOOTSTRAP_REPLICATES, help="Resampled replays of the fight log.")
+    parser.add_argument('--level', type=float, default=config.BOOTSTRAP_LEVEL, help="Interval coverage (e.g. 0.95).")
+    parser.add_argument('--workers', type=int, default=config.BOOTSTRAP_WORKERS, help="Worker processes (default: one per CPU core).")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print("--- Bootstrapping Rankings ---")
+    movies_df = get_storage().load_movies()
+    if movies_df.empty:
+        print("Error: movie data could not be loaded.")
+        sys.exit(1)
+
+    print(f"Replaying {args.replicates} resamples of {config.FIGHTS_CSV} on {args.workers or os.cpu_count()} workers...")
+    start = time.perf_counter()
+    intervals = RankIntervals(config.FIGHTS_CSV).compute(movies_df.index.tolist(), replicates=args.replicates,
+                                                        level=args.level, workers=args.workers, seed=args.seed)
+    if intervals is None:
+        sys.exit(1)
+    print(f"Done in {time.perf_counter() - start:.1f} s.")
+    top = intervals.join(movies_df['Rating']).sort_values('Rating', ascending=False).head(10)
+    print(top[['Rating', 'Rating Low', 'Rating High', 'Rank Best', 'Rank Worst']].to_string())
+    print("--- Intervals Cached ---")
@@ -0,0 +1,52 @@
+import os
+import sys
+import argparse
+
+# --- Configuration ---
+# Construct paths relative to the script's *parent* directory
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__)) # utils directory
+BASE_DIR = os.path.dirname(SCRIPT_DIR) # Parent directory (Movie_Elo)
+sys.path.insert(0, BASE_DIR) # Make the app modules (config, storage, ...) importable
+
+import config
+import columnar
+from storage import ArrowStorage
+
+# --- Main Logic ---
+# 'import' builds the Arrow files from the CSVs: the catalog / metadata tables of the 'arrow'
+# storage backend and the fight log's columnar mirror. 'export' writes the CSVs back from them.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import/export the Arrow (columnar) storage from/to the CSV layout.")
+    parser.add_argument('action', choices=['import', 'export'],
+                        help="'import' builds the Arrow files from the CSVs, 'export' writes the CSVs from the Arrow files.")
+    parser.add_argument('--fights-out', help="With export: also write the mirrored fight log to this CSV.")
+    args = parser.parse_args()
+
+    if not columnar.available():
+        print("Error: pyarrow is not installed.")
+        sys.exit(1)
+    storage = ArrowStorage()
+    if args.action == 'import':
+        print(f"Importing {config.MOVIES_CSV} and {config.MOVIE_DATA_CSV} into {config.MOVIES_ARROW} and {config.MOVIE_DATA_ARROW}...")
+        storage.import_csv()
+        if os.path.exists(config.FIGHTS_CSV):
+            print(f"Mirroring {config.FIGHTS_CSV} to {columnar.fight_mirror_path(config.FIGHTS_CSV)}...")
+            config.FIGHTS_ARROW_MIRROR = True # Build it even if reads through the mirror are turned off
+            rows = columnar.sync_fight_mirror(config.FIGHTS_CSV)
+            if rows is None:
+                print("Error: the fight log could not be mirrored.")
+                sys.exit(1)
+            print(f"Mirrored {rows} fights.")
+    else:
+        if not (os.path.exists(config.MOVIES_ARROW) and os.path.exists(config.MOVIE_DATA_ARROW)):
+            print("Error: Arrow files not found. Nothing to export.")
+            sys.exit(1)
+        print(f"Exporting {config.MOVIES_ARROW} and {config.MOVIE_DATA_ARROW} to {config.MOVIES_CSV} and {config.MOVIE_DATA_CSV}...")
+        storage.export_csv()
+        if args.fights_out:
+            config.FIGHTS_ARROW_MIRROR = True
+            print(f"Exporting the fight log to {args.fights_out}...")
+            if not columnar.export_fights(config.FIGHTS_CSV, args.fights_out):
+                print("Error: the fight log could not be read.")
+                sys.exit(1)
+    print("Done!")
@@ -0,0 +1,32 @@
+import os
+import sys
+import argparse
+
+# --- Configuration ---
+# Construct paths relative to the script's *parent* directory
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__)) # utils directory
+BASE_DIR = os.path.dirname(SCRIPT_DIR) # Parent directory (Movie_Elo)
+sys.path.insert(0, BASE_DIR) # Make the app modules (config, storage, ...) importable
+
+import config
+from storage import SqliteStorage
+
+# --- Main Logic ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import/export the SQLite storage from/to the CSV layout.")
+    parser.add_argument('action', choices=['import', 'export'],
+                        help="'import' rebuilds the database from the CSVs, 'export' writes the CSVs from the database.")
+    parser.add_argument('--db', default=config.STORAGE_DB, help="SQLite database path.")
+    args = parser.parse_args()
+
+    storage = SqliteStorage(db_path=args.db)
+    if args.action == 'import':
+        print(f"Importing {config.MOVIES_CSV} and {config.MOVIE_DATA_CSV} into {args.db}...")
+        storage.import_csv()
+    else:
+        if not os.path.exists(args.db):
+            print(f"Error: database '{args.db}' not found. Nothing to export.")
+            sys.exit(1)
+        print(f"Exporting {args.db} to {config.MOVIES_CSV} and {config.MOVIE_DATA_CSV}...")
+        storage.export_csv()
+    print("Done!")
@@ -2,9 +2,18 @@ import pandas as pd
 import requests
 import time
 import os
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 import numpy as np # To check for NaN values properly
 import sys # To exit gracefully
+try:
+    from tmdb_cache import TmdbCache # Run as a script from utils/
+except ImportError:
+    from utils.tmdb_cache import TmdbCache # Imported as utils.fetch_poster
 
 # --- Configuration ---
 # Construct paths relative to the script's *parent* directory
@@ -20,17 +29,29 @@ TARGET_CSV = os.path.join(DATA_DIR, 'movies_with_posters.csv')
 TMDB_API_KEY = 'YOUR_TMDB_API_KEY_HERE' # Placeholder - DO NOT COMMIT YOUR ACTUAL KEY
 
 # --- TMDb API Settings ---
+TMDB_API_BASE_URL = 'https://api.themoviedb.org/3'
 TMDB_POSTER_BASE_URL = 'https://image.tmdb.org/t/p/w500' # w500 is a common poster size
 REQUEST_DELAY = 0.5 # Delay between API requests (in seconds) - be respectful!
 RETRY_ATTEMPTS = 2    # How many times to retry on connection errors
 RETRY_DELAY = 3       # How many seconds to wait before retrying connection errors
 API_TIMEOUT = 10      # Seconds to wait for API response
 
-# --- Script Settings ---
-SAVE_INTERVAL = 20    # Save progress every X movies processed
+# --- Concurrent Mode Settings (--workers > 1) ---
+DEFAULT_WORKERS = 8          # Max requests in flight at once
+RATE_LIMIT = 20.0            # Max API requests per second across all workers (token bucket)
+MAX_BACKOFF = 30             # Cap for exponential backoff between retries (seconds)
+CONCURRENT_RETRY_ATTEMPTS = 4 # Retries per request (connection errors, timeouts, 429, 5xx)
+
+# --- Lookup Cache Settings ---
+# Every search/details result (including 'not found') is stored as soon as it arrives,
+# so re-runs and resumed runs skip network work for anything already known.
+CACHE_PATH = os.path.join(DATA_DIR, 'tmdb_cache.db')
+CACHE_TTL_DAYS = 30           # How long found posters stay valid
+CACHE_NEGATIVE_TTL_DAYS = 7   # How long 'no result' / 'no poster' stays valid before re-checking
+CACHE_MAX_ENTRIES = 500_000   # Per table; least recently used entries are evicted beyond this
 
 # --- Helper Function to Get Poster URL (with retries) ---
-def get_poster_url(movie_title, api_key):
+def get_poster_url(movie_title, api_key, base_url=None, cache=None):
     """
     Fetches the movie poster URL from TMDb based on the title.
     Includes retries for connection errors.
@@ -38,6 +59,9 @@ def get_poster_url(movie_title, api_key):
     Args:
         movie_title (str): The title of the movie to search for.
         api_key (str): Your TMDb API key (v3 auth).
+        base_url (str, optional): API base URL (defaults to TMDB_API_BASE_URL).
+        cache (TmdbCache, optional): Lookup cache; cached steps skip their API call and
+            definitive results (found / not found / no poster) are stored.
 
     Returns:
         str or None: The full URL to the poster image (w500 size) or None if not found/error.
@@ -48,40 +72,54 @@ def get_poster_url(movie_title, api_key):
         return None
     if not api_key or api_key == 'YOUR_TMDB_API_KEY_HERE':
         # Don't proceed without a valid API key placeholder being replaced
-        if attempts == 0: # Only print this warning once per movie title
-             print(f"  Skipping '{movie_title}': API key is missing or still set to placeholder.")
+        print(f"  Skipping '{movie_title}': API key is missing or still set to placeholder.")
         return None
 
-    search_url = f"https://api.themoviedb.org/3/search/movie"
+    base_url = base_url or TMDB_API_BASE_URL
+    search_url = f"{base_url}/search/movie"
     params = {'api_key': api_key, 'query': movie_title}
     attempts = 0
 
+    have_movie_id, movie_id = cache.get_search(movie_title) if cache else (False, None)
+    if have_movie_id and movie_id is None:
+        return None # Cached 'no results'
+
     while attempts <= RETRY_ATTEMPTS:
         try:
             # --- Search for movie ID ---
-            response = requests.get(search_url, params=params, timeout=API_TIMEOUT)
-            response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-            data = response.json()
-
-            if not data.get('results'): # Check if 'results' key exists and is not empty
-                # print(f"  No TMDb results found for '{movie_title}'") # Optional: uncomment for more detail
-                return None # No results found, don't retry
-
-            # Assume the first result is the most relevant
-            first_result = data['results'][0]
-            movie_id = first_result.get('id')
-            if not movie_id:
-                 print(f"  Found result for '{movie_title}' but missing movie ID.")
-                 return None # Cannot proceed without ID
+            if not have_movie_id:
+                response = requests.get(search_url, params=params, timeout=API_TIMEOUT)
+                response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+                data = response.json()
+
+                if not data.get('results'): # Check if 'results' key exists and is not empty
+                    # print(f"  No TMDb results found for '{movie_title}'") # Optional: uncomment for more detail
+                    if cache: cache.put_search(movie_title, None)
+                    return None # No results found, don't retry
+
+                # Assume the first result is the most relevant
+                first_result = data['results'][0]
+                movie_id = first_result.get('id')
+                if not movie_id:
+                     print(f"  Found result for '{movie_title}' but missing movie ID.")
+                     return None # Cannot proceed without ID
+                if cache: cache.put_search(movie_title, movie_id)
+                have_movie_id = True # Don't repeat the search if the details call needs a retry
 
             # --- Get movie details for poster path ---
-            details_url = f"https://api.themoviedb.org/3/movie/{movie_id}"
-            details_params = {'api_key': api_key}
-            details_response = requests.get(details_url, params=details_params, timeout=API_TIMEOUT)
-            details_response.raise_for_status()
-            details_data = details_response.json()
+            have_poster_path, poster_path = cache.get_details(movie_id) if cache else (False, None)
+            if not have_poster_path:
+                details_url = f"{base_url}/movie/{movie_id}"
+                details_params = {'api_key': api_key}
+                details_response = requests.get(details_url, params=details_params, timeout=API_TIMEOUT)
+                details_response.raise_for_status()
+                details_data = details_response.json()
+
+                poster_path = details_data.get('poster_path')
+                if not isinstance(poster_path, str) or not poster_path:
+                    poster_path = None
+                if cache: cache.put_details(movie_id, poster_path)
 
-            poster_path = details_data.get('poster_path')
             if poster_path and isinstance(poster_path, str):
                 # Successfully found poster path
                 return f"{TMDB_POSTER_BASE_URL}{poster_path}"
@@ -123,8 +161,161 @@ def get_poster_url(movie_title, api_key):
     return None
 
 
+# --- Concurrent Fetching ---
+class TokenBucket:
+    """Thread-safe token bucket: allows `rate` acquisitions per second, with bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available, then takes it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(pool_size=DEFAULT_WORKERS):
+    """requests.Session with a connection pool big enough for all workers (keep-alive reuse)."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _retry_after(response):
+    """Seconds from a numeric Retry-After header, or None."""
+    try:
+        return min(MAX_BACKOFF, float(response.headers.get('Retry-After', '')))
+    except ValueError:
+        return None
+
+
+def _get_json(session, url, params, limiter):
+    """
+    Rate-limited GET with retries. Connection errors, timeouts, 429 and 5xx are
+    retried with exponential backoff and jitter (429 honours Retry-After).
+
+    Returns:
+        dict or None: The JSON body, or None for other HTTP errors / when retries run out.
+    """
+    for attempt in range(CONCURRENT_RETRY_ATTEMPTS + 1):
+        limiter.acquire()
+        delay = None
+        try:
+            response = session.get(url, params=params, timeout=API_TIMEOUT)
+            if response.status_code == 429 or response.status_code >= 500:
+                delay = _retry_after(response)
+            elif not response.ok:
+                return None # Other 4xx (bad key, not found): not retryable
+            else:
+                return response.json()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            pass # Retry
+        except (requests.exceptions.RequestException, ValueError):
+            return None
+        if attempt < CONCURRENT_RETRY_ATTEMPTS:
+            backoff = min(MAX_BACKOFF, RETRY_DELAY * 2 ** attempt) * random.uniform(0.5, 1.0) # Jitter spreads retries out
+            time.sleep(delay if delay is not None else backoff)
+    return None
+
+
+def fetch_poster_concurrent(session, movie_title, api_key, limiter, base_url=None, cache=None):
+    """Same lookup as get_poster_url (search, then details), over a shared session and rate limiter."""
+    base_url = base_url or TMDB_API_BASE_URL
+    have_movie_id, movie_id = cache.get_search(movie_title) if cache else (False, None)
+    if not have_movie_id:
+        data = _get_json(session, f"{base_url}/search/movie", {'api_key': api_key, 'query': movie_title}, limiter)
+        if data is None:
+            return None # Request failed: nothing to cache
+        movie_id = data['results'][0].get('id') if data.get('results') else None
+        if cache and (movie_id or not data.get('results')): cache.put_search(movie_title, movie_id)
+    if not movie_id:
+        return None
+    have_poster_path, poster_path = cache.get_details(movie_id) if cache else (False, None)
+    if not have_poster_path:
+        details_data = _get_json(session, f"{base_url}/movie/{movie_id}", {'api_key': api_key}, limiter)
+        if details_data is None:
+            return None
+        poster_path = details_data.get('poster_path')
+        if not isinstance(poster_path, str) or not poster_path:
+            poster_path = None
+        if cache: cache.put_details(movie_id, poster_path)
+    if poster_path:
+        return f"{TMDB_POSTER_BASE_URL}{poster_path}"
+    return None
+
+
+def fetch_posters_concurrent(titles, api_key, workers=DEFAULT_WORKERS, rate=RATE_LIMIT, base_url=None, on_result=None, cache=None):
+    """
+    Fetches posters for many titles with a thread pool, a shared pooled session
+    and a global token-bucket rate limit.
+
+    Args:
+        titles (list): Movie titles to look up.
+        api_key (str): TMDb API key.
+        workers (int): Max concurrent lookups.
+        rate (float): Max API requests per second across all workers.
+        base_url (str, optional): API base URL (defaults to TMDB_API_BASE_URL).
+        on_result (callable, optional): Called as on_result(title, url_or_None) from the
+            calling thread as each lookup completes (e.g. to record progress).
+        cache (TmdbCache, optional): Lookup cache; titles fully resolved by it never hit the network.
+
+    Returns:
+        tuple: (results dict title -> url or None, stats dict with 'elapsed' and 'titles_per_sec').
+    """
+    limiter = TokenBucket(rate)
+    results = {}
+    start = time.perf_counter()
+    to_fetch = []
+    for title in titles:
+        hit, poster_path = cache.poster_path(title) if cache else (False, None)
+        if not hit:
+            to_fetch.append(title)
+            continue
+        results[title] = f"{TMDB_POSTER_BASE_URL}{poster_path}" if poster_path else None
+        if on_result is not None:
+            on_result(title, results[title])
+    with make_session(workers) as session, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_poster_concurrent, session, title, api_key, limiter, base_url, cache): title for title in to_fetch}
+        try:
+            for future in tqdm(as_completed(futures), total=len(futures), desc=f"Fetching posters ({workers} workers)"):
+                title = futures[future]
+                try:
+                    results[title] = future.result()
+                except Exception as e:
+                    print(f"  An unexpected error occurred processing '{title}': {e}")
+                    results[title] = None
+                if on_result is not None:
+                    on_result(title, results[title])
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True) # Don't wait for queued lookups
+            raise
+    elapsed = time.perf_counter() - start
+    return results, {'elapsed': elapsed, 'titles_per_sec': len(titles) / elapsed if elapsed > 0 else 0.0}
+
 # --- Main Script Logic ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch missing poster URLs from TMDb.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f"Concurrent lookups. 1 = original sequential mode; try {DEFAULT_WORKERS} for large catalogs.")
+    parser.add_argument('--rate', type=float, default=RATE_LIMIT, help="Max API requests per second in concurrent mode.")
+    parser.add_argument('--cache', default=CACHE_PATH, help="TMDb lookup cache database.")
+    parser.add_argument('--no-cache', action='store_true', help="Ignore the lookup cache (always query TMDb).")
+    args = parser.parse_args()
+
     print("--- Movie Poster Fetcher ---")
     print(f"Looking for movie list in: {TARGET_CSV}")
 
@@ -182,40 +373,60 @@ if __name__ == "__main__":
         print("No missing poster URLs found. Exiting.")
         sys.exit(0)
 
+    # --- Lookup Cache ---
+    # Progress is recorded per lookup in the cache (not by rewriting the CSV), so an
+    # interrupted run resumes without repeating any API calls.
+    cache = None
+    if not args.no_cache:
+        cache = TmdbCache(args.cache, ttl=CACHE_TTL_DAYS * 86400, negative_ttl=CACHE_NEGATIVE_TTL_DAYS * 86400,
+                          max_entries=CACHE_MAX_ENTRIES)
+        print(f"Using lookup cache: {args.cache}")
+
     # --- Fetching Loop ---
     fetched_count = 0
     update_count = 0
-    # Use tqdm for a progress bar only on the movies we need to fetch
-    for index in tqdm(movies_to_fetch_indices, desc="Fetching missing posters"):
-        # Get title safely
+    indices_by_title = {}
+    for index in movies_to_fetch_indices:
         title = df.loc[index, 'Title']
         if not isinstance(title, str) or not title.strip():
             print(f"  Skipping row index {index}: Missing or invalid title.")
             continue
+        indices_by_title.setdefault(title, []).append(index)
 
-        # Fetch the URL
-        fetched_url = get_poster_url(title, TMDB_API_KEY)
+    def record_result(title, fetched_url):
+        global fetched_count, update_count
         fetched_count += 1
-
-        # Update DataFrame only if a valid URL was fetched
+        # Update DataFrame only if a valid URL was fetched (otherwise keep the existing empty/non-URL value)
         if fetched_url:
-            df.loc[index, 'PosterURL'] = fetched_url
+            df.loc[indices_by_title[title], 'PosterURL'] = fetched_url
             update_count += 1
+
+    try:
+        if args.workers > 1:
+            # Concurrent mode: thread pool + shared session + token-bucket rate limit (no fixed sleep)
+            _, stats = fetch_posters_concurrent(list(indices_by_title), TMDB_API_KEY, workers=args.workers,
+                                                rate=args.rate, on_result=record_result, cache=cache)
+            print(f"\nThroughput: {stats['titles_per_sec']:.1f} titles/s ({stats['elapsed']:.1f} s for {fetched_count} titles)")
         else:
-            # Keep existing value (which should be empty or non-URL)
-            pass
-
-        # Add a small delay between API calls
-        time.sleep(REQUEST_DELAY)
-
-        # Save progress periodically
-        if fetched_count > 0 and fetched_count % SAVE_INTERVAL == 0:
-            print(f"\n--- Saving progress ({fetched_count}/{len(movies_to_fetch_indices)} fetched attempts) ---")
-            try:
-                df.to_csv(TARGET_CSV, index=False)
-                print(f"Progress saved to {TARGET_CSV}")
-            except Exception as e:
-                print(f"  Error saving intermediate progress: {e}")
+            # Use tqdm for a progress bar only on the movies we need to fetch
+            for title in tqdm(list(indices_by_title), desc="Fetching missing posters"):
+                # Titles already resolved in the cache need no API call (and no delay)
+                hit, poster_path = cache.poster_path(title) if cache else (False, None)
+                if hit:
+                    record_result(title, f"{TMDB_POSTER_BASE_URL}{poster_path}" if poster_path else None)
+                    continue
+
+                # Fetch the URL
+                record_result(title, get_poster_url(title, TMDB_API_KEY, cache=cache))
+
+                # Add a small delay between API calls
+                time.sleep(REQUEST_DELAY)
+    except KeyboardInterrupt:
+        print("\nInterrupted. Lookups so far are kept in the cache; re-run to resume.")
+
+    if cache:
+        print(f"Cache hits: {cache.hits}, misses: {cache.misses}")
+        cache.close()
 
     # --- Final Summary and Save ---
     print(f"\nFinished fetching attempts.")
@@ -0,0 +1,52 @@
+import os
+import sys
+import argparse
+
+# --- Configuration ---
+# Construct paths relative to the script's *parent* directory
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__)) # utils directory
+BASE_DIR = os.path.dirname(SCRIPT_DIR) # Parent directory (Movie_Elo)
+sys.path.insert(0, BASE_DIR) # Make the app modules (config, storage, ...) importable
+
+import config
+from replay import replay_fights
+from rating_engines import ENGINES, fit_ratings
+from storage import get_storage
+
+# --- Main Logic ---
+# Re-derives every rating and W/L/D count from head_to_head.csv, starting all movies at DEFAULT_ELO.
+# Use after changing K_TIERS or to repair corrupted metadata. Ratings come from --engine
+# (default config.RATING_ENGINE, see rating_engines.py); W/L/D counts are the same for every engine.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild ratings and metadata by replaying the fight log.")
+    parser.add_argument('--dry-run', action='store_true', help="Print the rebuilt top 10 without saving.")
+    parser.add_argument('--engine', choices=ENGINES, default=config.RATING_ENGINE, help="Rating engine to fit with.")
+    args = parser.parse_args()
+
+    print("--- Replaying Fight Log ---")
+    storage = get_storage()
+    movies_df = storage.load_movies()
+    if movies_df.empty:
+        print("Error: movie data could not be loaded.")
+        sys.exit(1)
+    meta_df = storage.load_metadata(movie_titles=movies_df.index.tolist())
+
+    print(f"Replaying {config.FIGHTS_CSV} ({args.engine})...")
+    ratings, new_meta_df = replay_fights(config.FIGHTS_CSV, movie_titles=movies_df.index.tolist())
+    if args.engine != 'elo':
+        fitted = fit_ratings(config.FIGHTS_CSV, movie_titles=movies_df.index.tolist(), engine=args.engine)
+        ratings = fitted['Rating']
+    changed = int((movies_df['Rating'] != ratings).sum())
+    print(f"Replayed {int(new_meta_df['Comparisons'].sum()) // 2} fights. {changed} of {len(movies_df)} ratings differ from the stored values.")
+
+    if args.dry_run:
+        top = ratings.sort_values(ascending=False).head(10)
+        if args.engine == 'glicko2': # Show how certain each rating is
+            top = fitted.loc[top.index, ['Rating', 'RD']].round({'RD': 0})
+        print(top.to_string())
+        sys.exit(0)
+
+    movies_df['Rating'] = ratings
+    storage.save_all(movies_df, new_meta_df)
+    print(f"Saved rebuilt ratings and metadata ({storage.name} storage).")
+    print("--- Replay Complete ---")
@@ -1,82 +1,173 @@
-import pandas as pd
 import os
 import sys
+import shutil
+import argparse
+from datetime import datetime
 
 # --- Configuration ---
 # Construct paths relative to the script's *parent* directory
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__)) # utils directory
 BASE_DIR = os.path.dirname(SCRIPT_DIR) # Parent directory (Movie_Elo)
-DATA_DIR = os.path.join(BASE_DIR, 'data') # Path to data directory
+sys.path.insert(0, BASE_DIR) # Make the app modules (config, storage, ...) importable
 
-MOVIES_CSV = os.path.join(DATA_DIR, 'movies_with_posters.csv') # File with ratings to reset
-MOVIE_DATA_CSV = os.path.join(DATA_DIR, 'movie_metadata.csv')   # Metadata file to reset/clear
-FIGHTS_CSV = os.path.join(DATA_DIR, 'head_to_head.csv')       # History file to clear
-DEFAULT_ELO = 1200
+import config
+import columnar
+from checkpoints import Checkpoints
+from data_handler import save_movie_data, save_movie_metadata
+from storage import get_storage, META_COLS
+from trajectory import trajectory_dir
+from undo_journal import undo_journal_path
+from bootstrap import bootstrap_path
 
-# --- Main Reset Logic ---
+# Nothing is deleted: the tables being replaced, the fight log rows being dropped and the
+# write-behind vote journal are moved to a new folder under config.ARCHIVE_DIR first. Stop the app before resetting or restoring.
+#   python utils/reset_elo.py                       # all ratings back to DEFAULT_ELO, empty fight log
+#   python utils/reset_elo.py --to-fight 5000       # ratings + W/L/D as of fight #5000, later fights archived
+#   python utils/reset_elo.py --show 5000           # print the top 10 as of fight #5000, change nothing
+#   python utils/reset_elo.py --show --before 2026-10-01   # ... as of the last dated checkpoint before a date
+#   python utils/reset_elo.py --list                # list the checkpoints
+
+
+def archive_dir():
+    path = os.path.join(config.ARCHIVE_DIR, datetime.now().strftime('%Y%m%d-%H%M%S'))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def archive_tables(movies_df, meta_df, folder):
+    """Saves the current tables (whatever the storage backend) as CSVs in the archive folder."""
+    save_movie_data(movies_df, os.path.join(folder, os.path.basename(config.MOVIES_CSV)))
+    save_movie_metadata(meta_df, os.path.join(folder, os.path.basename(config.MOVIE_DATA_CSV)))
+
+
+def archive_vote_journal(folder):
+    """
+    Moves the write-behind vote journal and its flushed marker to the archive folder. Loading the
+    storage has already written its pending votes to the tables being replaced, so they must not be
+    replayed onto the new ones at the next start.
+    """
+    for path in (config.VOTE_JOURNAL, config.VOTE_JOURNAL + '.flushed'):
+        if os.path.exists(path):
+            shutil.move(path, os.path.join(folder, os.path.basename(path)))
+
+
+def fight_at_date(checkpoints, before):
+    """Fight count of the last dated checkpoint (see checkpoints.py) written before the given date."""
+    cutoff = datetime.fromisoformat(before).timestamp()
+    infos = [checkpoints.info(fights) for fights in checkpoints.list()]
+    earlier = [info['fights'] for info in infos if info['dated'] and info['time'] < cutoff]
+    if not earlier:
+        print(f"Error: no dated checkpoint before {before} (checkpoints written over an existing log, "
+              f"e.g. at the first start, have no vote date; see --list).")
+        sys.exit(1)
+    return earlier[-1]
+
+
+def show(checkpoints, fights, movie_titles):
+    state = checkpoints.state_at(fights)
+    ratings, meta_df = state.frames(movie_titles)
+    print(f"Top 10 as of fight #{state.fights}:")
+    top = ratings.sort_values(ascending=False).head(10).to_frame().join(meta_df)
+    print(top.to_string())
+
+
+def reset(storage, movies_df, meta_df):
+    """Archives the tables, the fight log and its checkpoints / mirror, then starts over."""
+    folder = archive_dir()
+    archive_tables(movies_df, meta_df, folder)
+    archive_vote_journal(folder)
+    if os.path.exists(config.FIGHTS_CSV):
+        with open(config.FIGHTS_CSV, 'rb') as f:
+            header = f.readline() or b"Movie A,Movie B,Outcome,Score A\n"
+        # Moved together, so the archived log keeps its checkpoints, columnar mirror, trajectory index,
+        # undo history and bootstrap intervals
+        for path in (config.FIGHTS_CSV, columnar.fight_mirror_path(config.FIGHTS_CSV), Checkpoints().directory,
+                     trajectory_dir(config.FIGHTS_CSV), undo_journal_path(config.FIGHTS_CSV),
+                     bootstrap_path(config.FIGHTS_CSV)):
+            if os.path.exists(path):
+                shutil.move(path, os.path.join(folder, os.path.basename(path)))
+        with open(config.FIGHTS_CSV, 'wb') as f:
+            f.write(header)
+        print(f"{config.FIGHTS_CSV} archived and cleared (header kept).")
+
+    movies_df['Rating'] = config.DEFAULT_ELO
+    meta_df[META_COLS] = 0
+    storage.save_all(movies_df, meta_df)
+    print(f"Ratings reset to {config.DEFAULT_ELO} and counts cleared ({storage.name} storage). Previous data in {folder}")
+
+
+def restore(storage, movies_df, meta_df, state):
+    """Sets the tables to a replayed state (see Checkpoints.state_at) and archives the later fights."""
+    folder = archive_dir()
+    archive_tables(movies_df, meta_df, folder)
+    archive_vote_journal(folder)
+    with open(config.FIGHTS_CSV, 'rb') as f:
+        header = f.readline()
+        f.seek(state.offset)
+        later = f.read()
+    with open(os.path.join(folder, os.path.basename(config.FIGHTS_CSV)), 'wb') as f:
+        f.write(header + later)
+    with open(config.FIGHTS_CSV, 'r+b') as f:
+        f.truncate(state.offset) # Checkpoints past this point no longer match and are dropped on the next sync
+    undo_path = undo_journal_path(config.FIGHTS_CSV) # Its votes are among the archived ones
+    if os.path.exists(undo_path):
+        shutil.move(undo_path, os.path.join(folder, os.path.basename(undo_path)))
+
+    ratings, new_meta_df = state.frames(movies_df.index.tolist())
+    movies_df['Rating'] = ratings
+    storage.save_all(movies_df, new_meta_df)
+    n_later = later.count(b'\n')
+    print(f"Restored ratings and counts as of fight #{state.fights} ({storage.name} storage). "
+          f"{n_later} later fights archived in {folder}")
+
+
+# --- Main Logic ---
 if __name__ == "__main__":
-    print("--- Starting ELO Reset ---")
-    print(f"Looking for data files in: {DATA_DIR}")
-
-    # 1. Reset Ratings in Main Movie File
-    if os.path.exists(MOVIES_CSV):
-        try:
-            print(f"Reading {MOVIES_CSV} to reset ratings...")
-            df = pd.read_csv(MOVIES_CSV)
-            if 'Rating' in df.columns:
-                df['Rating'] = DEFAULT_ELO
-                df.to_csv(MOVIES_CSV, index=False)
-                print(f"Ratings in {MOVIES_CSV} reset to {DEFAULT_ELO}.")
-            else:
-                print(f"Warning: 'Rating' column not found in {MOVIES_CSV}. Cannot reset ratings.")
-        except Exception as e:
-            print(f"Error processing {MOVIES_CSV}: {e}")
-    else:
-        print(f"Warning: {MOVIES_CSV} not found. Skipping rating reset.")
-
-    # 2. Reset/Clear Metadata File
-    if os.path.exists(MOVIE_DATA_CSV):
-        try:
-            print(f"Resetting data in {MOVIE_DATA_CSV}...")
-            # Re-initialize with 0s based on main movie file
-            if os.path.exists(MOVIES_CSV) and 'Title' in pd.read_csv(MOVIES_CSV, nrows=0).columns:
-                 movies_df = pd.read_csv(MOVIES_CSV)
-                 titles = movies_df['Title'].drop_duplicates().tolist()
-                 meta_df = pd.DataFrame(0, index=titles, columns=['Comparisons', 'Wins', 'Losses', 'Draws'])
-                 meta_df.index.name = 'Title'
-                 meta_df.reset_index().to_csv(MOVIE_DATA_CSV, index=False)
-                 print(f"{MOVIE_DATA_CSV} re-initialized with 0 counts.")
-            else:
-                 # Fallback: Just clear the file if main movie file isn't available
-                 print(f"Warning: Cannot read titles from {MOVIES_CSV}. Clearing {MOVIE_DATA_CSV} instead.")
-                 with open(MOVIE_DATA_CSV, 'w') as f:
-                     f.write("Title,Comparisons,Wins,Losses,Draws\n") # Write header only
-
-        except Exception as e:
-            print(f"Error processing {MOVIE_DATA_CSV}: {e}")
-    else:
-        print(f"Info: {MOVIE_DATA_CSV} not found. Nothing to reset.")
-
-    # 3. Clear Fights History File
-    if os.path.exists(FIGHTS_CSV):
-        try:
-            print(f"Clearing {FIGHTS_CSV}...")
-            # Try to get header
-            try:
-                header = pd.read_csv(FIGHTS_CSV, nrows=0).columns.tolist()
-                header_line = ','.join(header) + '\n'
-            except Exception:
-                print("Warning: Could not read header from fights file. Using default.")
-                header_line = "Movie A,Movie B,Outcome,Score A\n" # Assume default header
-
-            # Write only the header back
-            with open(FIGHTS_CSV, 'w') as f:
-                f.write(header_line)
-            print(f"{FIGHTS_CSV} cleared (header kept).")
-        except Exception as e:
-            print(f"Could not clear {FIGHTS_CSV}: {e}")
-    else:
-        print(f"Info: {FIGHTS_CSV} not found. Nothing to clear.")
+    parser = argparse.ArgumentParser(description="Reset ratings, or show / restore them as of an earlier fight.")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--to-fight', type=int, metavar='K', help="Restore the state after the first K fights.")
+    group.add_argument('--show', type=int, nargs='?', const=-1, metavar='K', help="Print the top 10 after the first K fights.")
+    group.add_argument('--list', action='store_true', help="List the checkpoints.")
+    parser.add_argument('--before', metavar='DATE', help="With --to-fight/--show: use the last checkpoint before DATE (YYYY-MM-DD[ HH:MM]). "
+                        "Only checkpoints written by the app as votes were logged are dated; ones built over an "
+                        "existing log (first start, rebuilds, --list) are skipped.")
+    args = parser.parse_args()
+    if args.to_fight is not None and args.to_fight < 0:
+        parser.error(f"--to-fight: K must be 0 or more (got {args.to_fight}).")
 
-    print("--- Reset Complete ---")
+    checkpoints = Checkpoints()
+    if args.list:
+        checkpoints.sync()
+        for fights in checkpoints.list():
+            info = checkpoints.info(fights)
+            when = f"{datetime.fromtimestamp(info['time']):%Y-%m-%d %H:%M}" if info['dated'] else 'undated'
+            print(f"fight #{fights:>10}  {when:<16}  {'full' if info['full'] else 'delta'}")
+        sys.exit(0)
 
+    fights = args.to_fight if args.to_fight is not None else args.show
+    if args.before:
+        fights = fight_at_date(checkpoints, args.before)
+    if args.to_fight is not None:
+        # Checked before anything is archived
+        if not os.path.exists(config.FIGHTS_CSV):
+            parser.error(f"--to-fight: there is no fight log at '{config.FIGHTS_CSV}' to restore from.")
+        state = checkpoints.state_at(fights)
+        if state.fights < fights:
+            parser.error(f"--to-fight: the fight log only has {state.fights} fights (got {fights}).")
+
+    storage = get_storage()
+    movies_df = storage.load_movies()
+    if movies_df.empty:
+        print("Error: movie data could not be loaded.")
+        sys.exit(1)
+    meta_df = storage.load_metadata(movie_titles=movies_df.index.tolist())
+
+    if args.show is not None or (args.before and args.to_fight is None):
+        show(checkpoints, None if fights == -1 else fights, movies_df.index.tolist())
+    elif fights is not None:
+        print("--- Restoring ---")
+        restore(storage, movies_df, meta_df, state)
+    else:
+        print("--- Starting ELO Reset ---")
+        reset(storage, movies_df, meta_df)
+    print("--- Done ---")
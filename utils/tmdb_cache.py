@@ -0,0 +1,125 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+# Persistent on-disk cache for TMDb lookups used by fetch_poster.py.
+# Two tables mirror the two API calls:
+#   searches: normalized title -> movie id (NULL = search returned no results)
+#   details:  movie id -> poster path     (NULL = movie has no poster)
+# Negative results are cached too (with their own, shorter TTL), so re-runs skip titles
+# already known to have no poster. Every put is committed immediately, so an interrupted
+# run loses nothing and a resumed run only does network work for titles not yet seen.
+
+
+def normalize_title(title):
+    """Cache key for a title: Unicode-normalized, case-folded, whitespace collapsed."""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', str(title))).strip().casefold()
+
+
+class TmdbCache:
+    """
+    SQLite-backed TMDb lookup cache with TTL expiry and LRU eviction.
+
+    Args:
+        path (str): Database file.
+        ttl (float): Seconds a positive result stays valid.
+        negative_ttl (float): Seconds a negative result (no match / no poster) stays valid.
+        max_entries (int): Max rows per table; least recently used rows are evicted beyond this.
+    """
+
+    def __init__(self, path, ttl=30 * 86400, negative_ttl=7 * 86400, max_entries=500_000):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self.lock = threading.Lock() # One shared connection; fetch workers call in from several threads
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS searches (title TEXT PRIMARY KEY, movie_id INTEGER, '
+                              'fetched_at REAL NOT NULL, last_used REAL NOT NULL)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS details (movie_id INTEGER PRIMARY KEY, poster_path TEXT, '
+                              'fetched_at REAL NOT NULL, last_used REAL NOT NULL)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_searches_used ON searches(last_used)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_details_used ON details(last_used)')
+        self.evict()
+
+    def _get(self, table, key_col, value_col, key):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(f'SELECT {value_col}, fetched_at FROM {table} WHERE {key_col} = ?', (key,)).fetchone()
+            if row is not None:
+                value, fetched_at = row
+                ttl = self.ttl if value is not None else self.negative_ttl
+                if now - fetched_at <= ttl:
+                    with self.conn:
+                        self.conn.execute(f'UPDATE {table} SET last_used = ? WHERE {key_col} = ?', (now, key))
+                    self.hits += 1
+                    return True, value
+            self.misses += 1
+            return False, None
+
+    def _put(self, table, key_col, value_col, key, value):
+        now = time.time()
+        with self.lock:
+            with self.conn:
+                self.conn.execute(f'INSERT OR REPLACE INTO {table} ({key_col}, {value_col}, fetched_at, last_used) '
+                                  'VALUES (?, ?, ?, ?)', (key, value, now, now))
+            self._puts += 1
+        if self._puts % 1000 == 0:
+            self.evict()
+
+    def get_search(self, title):
+        """Returns (hit, movie_id); movie_id is None for a cached 'no results'."""
+        return self._get('searches', 'title', 'movie_id', normalize_title(title))
+
+    def put_search(self, title, movie_id):
+        self._put('searches', 'title', 'movie_id', normalize_title(title), movie_id)
+
+    def get_details(self, movie_id):
+        """Returns (hit, poster_path); poster_path is None for a cached 'no poster'."""
+        return self._get('details', 'movie_id', 'poster_path', int(movie_id))
+
+    def put_details(self, movie_id, poster_path):
+        self._put('details', 'movie_id', 'poster_path', int(movie_id), poster_path)
+
+    def poster_path(self, title):
+        """
+        Resolves a title entirely from the cache.
+
+        Returns:
+            tuple: (hit, poster_path). hit is False if any step would need the network.
+        """
+        hit, movie_id = self.get_search(title)
+        if not hit:
+            return False, None
+        if movie_id is None:
+            return True, None
+        return self.get_details(movie_id)
+
+    def evict(self):
+        """Drops expired rows, then trims each table to max_entries by least recent use."""
+        now = time.time()
+        with self.lock:
+            with self.conn:
+                self.conn.execute('DELETE FROM searches WHERE fetched_at < ? - (CASE WHEN movie_id IS NULL THEN ? ELSE ? END)',
+                                  (now, self.negative_ttl, self.ttl))
+                self.conn.execute('DELETE FROM details WHERE fetched_at < ? - (CASE WHEN poster_path IS NULL THEN ? ELSE ? END)',
+                                  (now, self.negative_ttl, self.ttl))
+                for table in ('searches', 'details'):
+                    excess = self.conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] - self.max_entries
+                    if excess > 0:
+                        self.conn.execute(f'DELETE FROM {table} WHERE rowid IN '
+                                          f'(SELECT rowid FROM {table} ORDER BY last_used LIMIT ?)', (excess,))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,105 @@
+import json
+import os
+import config
+
+# Write-behind vote journal.
+# Each committed vote is appended as one JSON line and fsync'd before the voter is answered.
+# Entries hold the absolute post-vote values (ratings and W/L/D counts of both movies), so
+# replaying an entry twice is harmless. A small marker file next to the journal records the
+# last entry already written to the tables and the fight log's size at that point:
+#   <journal>.flushed = {"seq": last flushed entry, "fights_bytes": fight log size after that flush}
+# Entries after the marker are "pending": they are replayed into the tables (and appended to the
+# fight log, after cutting off any rows of an interrupted flush) when the storage is next loaded.
+
+STAT_COLS = ['Comparisons', 'Wins', 'Losses', 'Draws']
+
+
+def fsync_file(filename):
+    """Forces a file's written data to disk."""
+    with open(filename, 'ab') as f:
+        os.fsync(f.fileno())
+
+
+class VoteJournal:
+    """Append-only, fsync'd journal of committed votes (see module comment)."""
+
+    def __init__(self, path=config.VOTE_JOURNAL):
+        self.path = path
+        self.marker_path = path + '.flushed'
+        self.flushed_seq, self.fights_bytes = self._read_marker()
+        entries = self.read()
+        self.seq = max([self.flushed_seq] + [entry['seq'] for entry in entries])
+
+    def _read_marker(self):
+        try:
+            with open(self.marker_path) as f:
+                marker = json.load(f)
+            return int(marker['seq']), marker.get('fights_bytes')
+        except (OSError, ValueError, KeyError):
+            return 0, None
+
+    def read(self):
+        """All entries in the journal file. A torn last line (crash mid-append) is ignored."""
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break # Only the final line can be incomplete
+        return entries
+
+    def pending(self):
+        """Entries not yet written to the tables, in vote order."""
+        return [entry for entry in self.read() if entry['seq'] > self.flushed_seq]
+
+    def append(self, votes):
+        """
+        Durably appends committed votes.
+
+        Args:
+            votes (list): Dicts with keys a, b, outcome, score, rating_a, rating_b, meta_a, meta_b
+                (meta_* = [Comparisons, Wins, Losses, Draws] after the vote).
+
+        Returns:
+            list: The entries written (each with its 'seq').
+        """
+        entries = []
+        for vote in votes:
+            self.seq += 1
+            entries.append({'seq': self.seq, **vote})
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+            f.flush()
+            os.fsync(f.fileno())
+        return entries
+
+    def mark_flushed(self, seq, fights_bytes):
+        """Records that entries up to `seq` are in the tables, then drops them from the journal."""
+        tmp_path = self.marker_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'seq': seq, 'fights_bytes': fights_bytes}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.marker_path)
+        self.flushed_seq, self.fights_bytes = seq, fights_bytes
+        remaining = [entry for entry in self.read() if entry['seq'] > seq]
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(entry) + '\n' for entry in remaining))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def apply_entries(movies_df, meta_df, entries):
+    """Sets the post-vote Rating / stats of every movie in `entries` (later entries win)."""
+    for entry in entries:
+        for title, rating, stats in ((entry['a'], entry['rating_a'], entry['meta_a']), (entry['b'], entry['rating_b'], entry['meta_b'])):
+            if title in movies_df.index:
+                movies_df.at[title, 'Rating'] = rating
+            if title in meta_df.index:
+                for col, value in zip(STAT_COLS, stats):
+                    meta_df.at[title, col] = value